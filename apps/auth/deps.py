@@ -1,14 +1,39 @@
+import time
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status, Request
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
 from database import get_session
 from apps.auth.models import User
+from apps.core.cache import TTLCache
+from config import settings
+
+# Per-worker cache of User column values keyed by id. Invalidated on profile and subscription changes;
+# the TTL bounds staleness for changes made by other workers.
+user_cache = TTLCache(ttl=settings.USER_CACHE_SECONDS, maxsize=4096)
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.delete(user_id)
+
+def _load_user(session: Session, user_id: int) -> User | None:
+    data = user_cache.get(user_id)
+    if data is None:
+        user = session.get(User, user_id)
+        if user:
+            user_cache.set(user_id, user.model_dump())
+        return user
+
+    # Rebuild from cached columns and attach without a SELECT; later writes still UPDATE the real row
+    user = User(**data)
+    make_transient_to_detached(user)
+    return session.merge(user, load=False)
 
 def get_current_user(request: Request, session: Session = Depends(get_session)) -> User | None:
     user_id = request.session.get("user_id")
     if not user_id:
         return None
-    
-    user = session.get(User, user_id)
+
+    user = _load_user(session, user_id)
     return user
 
 def require_user(user: User | None = Depends(get_current_user)) -> User:
@@ -18,3 +43,58 @@ def require_user(user: User | None = Depends(get_current_user)) -> User:
             headers={"Location": "/auth/login"}
         )
     return user
+
+def require_api_user(user: User | None = Depends(get_current_user)) -> User:
+    """
+    Like require_user, but JSON clients get a 401 instead of a redirect to the login page.
+    """
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return user
+
+# --- Session Claim ---
+
+@dataclass(frozen=True)
+class UserClaim:
+    """
+    Minimal identity carried in the session cookie (signed by SessionMiddleware), enough for
+    partials that only need the user id.
+    """
+    id: int
+    email: str
+
+def store_user_claim(request: Request, user: User) -> None:
+    if settings.USER_SESSION_CLAIM:
+        request.session["user_claim"] = {"id": user.id, "email": user.email, "iat": int(time.time())}
+
+def get_user_claim(request: Request, session: Session = Depends(get_session)) -> UserClaim | None:
+    """
+    Resolves the user from the session claim without touching the DB; falls back to a (cached)
+    user lookup when claims are disabled, missing, stale or belong to another session user.
+    """
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return None
+
+    claim = request.session.get("user_claim")
+    if (
+        settings.USER_SESSION_CLAIM
+        and claim
+        and claim.get("id") == user_id
+        and time.time() - claim.get("iat", 0) < settings.USER_CLAIM_MAX_AGE
+    ):
+        return UserClaim(id=claim["id"], email=claim["email"])
+
+    user = _load_user(session, user_id)
+    if not user:
+        return None
+    store_user_claim(request, user)
+    return UserClaim(id=user.id, email=user.email)
+
+def require_user_claim(claim: UserClaim | None = Depends(get_user_claim)) -> UserClaim:
+    if not claim:
+        raise HTTPException(
+            status_code=status.HTTP_303_SEE_OTHER,
+            headers={"Location": "/auth/login"}
+        )
+    return claim
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Form, Request, Response, status, UploadFile, File
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from apps.core.templating import templates
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session
 from database import get_session
 from apps.auth.services import AuthService
@@ -20,7 +21,6 @@ def get_tracker_service(session: Session = Depends(get_session)) -> TrackerServi
         raise e
 
 router = APIRouter(prefix="/auth", tags=["auth"])
-templates = Jinja2Templates(directory="templates")
 
 def get_service(session: Session = Depends(get_session)) -> AuthService:
     return AuthService(session)
@@ -79,9 +79,11 @@ async def auth_callback(request: Request, service: AuthService = Depends(get_ser
         service.session.refresh(user)
     
     # Set Session
+    invalidate_user(user.id)
     request.session['user_id'] = user.id
     request.session['user_email'] = user.email
-    request.session['user_image'] = user.profile_image or user.picture
+    request.session['user_image'] = AuthService.avatar_url(user.profile_image) or picture
+    store_user_claim(request, user)
     
     return RedirectResponse(url="/tracker/")
 
@@ -111,7 +113,7 @@ def register():
     return RedirectResponse(url="/auth/login")
 
 from apps.auth.subscription_service import SubscriptionService
-from apps.auth.deps import get_current_user, require_user
+from apps.auth.deps import get_current_user, require_user, invalidate_user, store_user_claim
 from apps.tracker.services import TrackerService # Added import for TrackerService
 
 # --- PROFILE ROUTES ---
@@ -152,7 +154,7 @@ def edit_profile_page(request: Request, user: User = Depends(get_current_user)):
     })
 
 @router.post("/profile")
-def update_profile(
+async def update_profile(
     request: Request,
     full_name: str = Form(default=None),
     phone: str = Form(default=None),
@@ -161,13 +163,23 @@ def update_profile(
     country: str = Form(default=None),
     profile_image: UploadFile = File(default=None),
     service: AuthService = Depends(get_service),
+    tracker: TrackerService = Depends(get_tracker_service),
     user: User = Depends(require_user)
 ):
-    updated_user = service.update_profile(user, full_name, phone, city, state, country, profile_image)
+    # Stream + resize off the event loop before touching the DB
+    image_path = None
+    if profile_image and profile_image.filename:
+        image_path = await service.save_profile_image(user, profile_image)
+
+    updated_user = await run_in_threadpool(
+        service.update_profile, user, full_name, phone, city, state, country, image_path
+    )
+    # Cached tracker pages embed the navbar avatar
+    await run_in_threadpool(tracker.touch_user, user.id)
     
-    # Update Session with new image if changed
+    # Update Session with new image if changed (small navbar variant)
     if updated_user.profile_image:
-        request.session['user_image'] = updated_user.profile_image
+        request.session['user_image'] = AuthService.avatar_url(updated_user.profile_image)
         
     return RedirectResponse(url="/auth/profile", status_code=303)
 
@@ -1,18 +1,27 @@
 from typing import Optional, List
 from sqlmodel import Session, select
 from datetime import timedelta
-from fastapi import Response, status, UploadFile
+from fastapi import Response, status, UploadFile, HTTPException
 from fastapi.responses import RedirectResponse
-import shutil
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import os
 import uuid
 from pathlib import Path
 
 from apps.auth.models import User
-from apps.auth.models import User
-# from config import settings # Config not needed here anymore for token
+from apps.auth.deps import invalidate_user
+from apps.images.services import get_executor, render_avatars
+from config import settings
 
 from apps.core.base_service import BaseService
 
+# Originals are kept out of the static mount; only the resized avatars are served.
+PROFILE_ORIGINALS_DIR = Path(settings.DATA_DIR) / "uploads" / "profiles"
+PROFILE_AVATARS_DIR = Path("static/uploads/profiles")
+AVATAR_SIZES = (64, 256) # Navbar, profile credential
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 class AuthService(BaseService):
 
     def get_user_by_email(self, email: str) -> Optional[User]:
@@ -22,35 +31,120 @@ class AuthService(BaseService):
     # We keep profile management here.
     # --- PROFILE MANAGEMENT ---
 
+    @staticmethod
+    def avatar_url(profile_image: Optional[str], size: int = AVATAR_SIZES[0]) -> Optional[str]:
+        """
+        Browser URL for a stored profile image at the given avatar size.
+        External (Auth0) pictures and legacy uploads are returned as-is.
+        """
+        if not profile_image:
+            return None
+        if profile_image.startswith("http"):
+            return profile_image
+
+        path = profile_image
+        for candidate in AVATAR_SIZES:
+            suffix = f"_{candidate}.webp"
+            if path.endswith(suffix):
+                path = path[: -len(suffix)] + f"_{size}.webp"
+                break
+        return "/" + path.lstrip("/")
+
+    async def save_profile_image(self, user: User, upload: UploadFile) -> str:
+        """
+        Streams the upload to disk in chunks (rejecting it once it exceeds PROFILE_IMAGE_MAX_BYTES),
+        then builds the avatar sizes in the image worker pool. Returns the stored profile_image path.
+        BodySizeLimitMiddleware has already refused bodies far over the limit before they were received;
+        this check enforces the exact limit on the file itself.
+        """
+        token = f"user_{user.id}_{uuid.uuid4().hex}"
+        extension = Path(upload.filename or "").suffix.lower()[:10] or ".img"
+        original = PROFILE_ORIGINALS_DIR / f"{token}{extension}"
+        original.parent.mkdir(parents=True, exist_ok=True)
+        PROFILE_AVATARS_DIR.mkdir(parents=True, exist_ok=True)
+
+        written = 0
+        try:
+            with open(original, "wb") as buffer:
+                while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > settings.PROFILE_IMAGE_MAX_BYTES:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Profile image must be under {settings.PROFILE_IMAGE_MAX_BYTES // (1024 * 1024)} MB"
+                        )
+                    await run_in_threadpool(buffer.write, chunk)
+
+            loop = asyncio.get_running_loop()
+            avatars = await loop.run_in_executor(
+                get_executor(), render_avatars,
+                str(original), str(PROFILE_AVATARS_DIR), token, AVATAR_SIZES
+            )
+        except ValueError as e:
+            original.unlink(missing_ok=True)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except Exception:
+            original.unlink(missing_ok=True)
+            raise
+
+        return Path(avatars[AVATAR_SIZES[-1]]).as_posix()
+
+    def delete_profile_image(self, profile_image: Optional[str]) -> None:
+        """
+        Removes every stored variant (and the original) of a previously uploaded profile image.
+        """
+        if not profile_image or profile_image.startswith("http"):
+            return
+
+        path = Path(profile_image)
+        if path.parent != PROFILE_AVATARS_DIR:
+            return
+
+        token = path.stem
+        for size in AVATAR_SIZES:
+            suffix = f"_{size}"
+            if token.endswith(suffix):
+                token = token[: -len(suffix)]
+                break
+
+        candidates = [path]
+        candidates += [PROFILE_AVATARS_DIR / f"{token}_{size}.webp" for size in AVATAR_SIZES]
+        candidates += list(PROFILE_ORIGINALS_DIR.glob(f"{token}.*")) if PROFILE_ORIGINALS_DIR.exists() else []
+        for candidate in candidates:
+            try:
+                candidate.unlink(missing_ok=True)
+            except OSError as e:
+                print(f"[WARN] Could not remove old profile image {candidate}: {e}")
+
     def update_profile(
-        self, 
-        user: User, 
+        self,
+        user: User,
         full_name: Optional[str] = None,
         phone: Optional[str] = None,
         city: Optional[str] = None,
         state: Optional[str] = None,
         country: Optional[str] = None,
-        profile_image: Optional[UploadFile] = None
+        profile_image: Optional[str] = None
     ) -> User:
+        """
+        `profile_image` is the stored path returned by save_profile_image; the replaced image is cleaned up.
+        """
         if full_name: user.full_name = full_name
         if phone: user.phone = phone
         if city: user.city = city
         if state: user.state = state
         if country: user.country = country
-        
-        if profile_image and profile_image.filename:
-            # Reusing the logic from HumidorService - ideally this should be a shared utility
-            extensao = profile_image.filename.split(".")[-1]
-            nome_arquivo = f"user_{user.id}_{uuid.uuid4()}.{extensao}"
-            caminho_destino = Path(f"static/uploads/profiles/{nome_arquivo}")
-            caminho_destino.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(caminho_destino, "wb") as buffer:
-                shutil.copyfileobj(profile_image.file, buffer)
-            
-            user.profile_image = str(caminho_destino)
-            
+
+        previous_image = None
+        if profile_image:
+            previous_image = user.profile_image
+            user.profile_image = profile_image
+
         self.session.add(user)
         self.session.commit()
         self.session.refresh(user)
+        invalidate_user(user.id)
+
+        if previous_image and previous_image != profile_image:
+            self.delete_profile_image(previous_image)
         return user
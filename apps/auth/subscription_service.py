@@ -3,6 +3,7 @@ import stripe
 from fastapi import Request
 from sqlmodel import Session, select
 from apps.auth.models import User
+from apps.auth.deps import invalidate_user
 from config import settings
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -70,3 +71,4 @@ class SubscriptionService:
                 user.subscription_status = 'active'
                 self.session.add(user)
                 self.session.commit()
+                invalidate_user(user.id)
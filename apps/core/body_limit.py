@@ -0,0 +1,46 @@
+from typing import Dict
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Multipart boundaries and the other form fields sent along with the file
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+class BodySizeLimitMiddleware:
+    """
+    Caps request bodies per path before anything parses them. Starlette spools a whole multipart body to
+    disk before the handler runs, so a size check in the handler only fires after the upload was received.
+    Declared oversized bodies are answered with a 413 without reading them; undeclared (chunked) ones
+    are cut off as soon as they pass the limit.
+    """
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body must be under {limit // (1024 * 1024)} MB"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": detail}, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the handler's body parsing, so it becomes the usual 413 response
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
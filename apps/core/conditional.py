@@ -0,0 +1,53 @@
+import hashlib
+from pathlib import Path
+from typing import Any
+from fastapi import Request, Response
+from config import settings
+
+# Everything that shapes a rendered response besides the data versions in the ETag
+BUILD_SOURCES = (("apps", "*.py"), ("templates", "*"), ("static", "*"))
+
+def code_fingerprint(root: Path = Path(".")) -> str:
+    """
+    Hash of the application code, templates and static files: identical in every worker and across restarts
+    of the same release, different as soon as any of them changes.
+    """
+    digest = hashlib.sha256()
+    for directory, pattern in BUILD_SOURCES:
+        for path in sorted((root / directory).rglob(pattern)):
+            if path.is_file() and "__pycache__" not in path.parts and "uploads" not in path.parts:
+                digest.update(path.relative_to(root).as_posix().encode())
+                digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+# Same value in every worker, so revalidations hit the 304 whichever worker answers; new on every release
+BUILD_ID = settings.BUILD_ID or code_fingerprint()
+
+# Private: responses are per user. no-cache: always revalidate, which is cheap thanks to the 304 path.
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts: Any) -> str:
+    """
+    Weak ETag derived from the version parts a response depends on.
+    """
+    raw = ":".join(str(part) for part in (BUILD_ID, *parts))
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    # Weak comparison: ignore the W/ prefix on both sides
+    target = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == target for candidate in header.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
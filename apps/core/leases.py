@@ -0,0 +1,100 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Sequence
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import SQLModel, Field, Session, select
+from database import engine
+from config import settings
+
+# Held by the worker that runs the background jobs started in main.py's lifespan
+BACKGROUND_JOBS_LEASE = "background-jobs"
+
+# Identifies this process among all uvicorn workers and containers sharing the database
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class LeaseLost(Exception):
+    """
+    Raised by a fenced write when this worker no longer holds the lease it was started under.
+    """
+
+class Lease(SQLModel, table=True):
+    """
+    A named lock row: `holder` owns it until `expires_at` and renews it while alive. Lives in the shared
+    database so it is exclusive across every worker process, not just within one.
+    """
+    name: str = Field(primary_key=True)
+    holder: str
+    expires_at: datetime
+
+def acquire_lease(name: str, holder: str = WORKER_ID, ttl: float = settings.BACKGROUND_LEASE_SECONDS) -> bool:
+    """
+    Takes the lease if it is free or expired, or renews it if `holder` already has it. One upsert, so two
+    processes racing for an expired lease can't both win.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    statement = sqlite_insert(Lease).values(name=name, holder=holder, expires_at=expires_at)
+    statement = statement.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"holder": holder, "expires_at": expires_at},
+        where=(Lease.holder == holder) | (Lease.expires_at < now)
+    )
+    with Session(engine) as session:
+        session.exec(statement)
+        session.commit()
+        return session.exec(select(Lease.holder).where(Lease.name == name)).one() == holder
+
+def release_lease(name: str, holder: str = WORKER_ID) -> None:
+    with Session(engine) as session:
+        session.exec(delete(Lease).where(Lease.name == name, Lease.holder == holder))
+        session.commit()
+
+def holds_lease(session: Session, name: str, holder: str = WORKER_ID) -> bool:
+    """
+    Fencing check for writes that must come from the lease holder; run it inside the writing transaction.
+    """
+    lease = session.get(Lease, name)
+    return lease is not None and lease.holder == holder and lease.expires_at > datetime.utcnow()
+
+async def _cancel(tasks: List[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run_as_leader(
+    name: str, jobs: Sequence[Callable[[], Awaitable[None]]], ttl: float = settings.BACKGROUND_LEASE_SECONDS
+) -> None:
+    """
+    Started by every worker; only the one holding lease `name` runs `jobs`. The lease is renewed every
+    ttl / 3 and the jobs are cancelled as soon as a renewal fails, well before another worker can take over,
+    so the jobs never run twice at once. A worker that dies is replaced within `ttl` seconds.
+    """
+    tasks: List[asyncio.Task] = []
+    try:
+        while True:
+            try:
+                held = await asyncio.to_thread(acquire_lease, name, WORKER_ID, ttl)
+            except Exception as e:
+                print(f"[WARN] Could not renew the {name} lease: {e}")
+                held = False
+
+            if held and not tasks:
+                print(f"[INFO] Worker {WORKER_ID} is running the {name} jobs")
+                tasks = [asyncio.create_task(job()) for job in jobs]
+            elif not held and tasks:
+                print(f"[WARN] Worker {WORKER_ID} lost the {name} lease; stopping its jobs")
+                await _cancel(tasks)
+                tasks = []
+            await asyncio.sleep(ttl / 3)
+    finally:
+        if tasks:
+            await _cancel(tasks)
+            try:
+                # Lets the next worker take over immediately on a clean shutdown
+                await asyncio.to_thread(release_lease, name)
+            except Exception as e:
+                print(f"[WARN] Could not release the {name} lease: {e}")
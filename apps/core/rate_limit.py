@@ -0,0 +1,19 @@
+import asyncio
+import time
+
+class RateLimiter:
+    """
+    Spaces out calls to at most `rate` per second across every task sharing the limiter.
+    Used by background jobs so they leave most of the TMDB quota to user requests.
+    """
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next_slot = 0.0
+
+    async def wait(self) -> None:
+        # Reserving the slot involves no await, so concurrent tasks on the loop can't interleave here
+        now = time.monotonic()
+        delay = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
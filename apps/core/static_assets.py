@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import uuid
+from pathlib import Path
+from typing import Dict
+from starlette.datastructures import Headers
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+from apps.core.compression import choose_encoding
+from config import settings
+
+try:
+    import brotli
+except ImportError: # Optional: only .gz variants are produced without it
+    brotli = None
+
+SOURCE_DIR = Path("static")
+BUILD_DIR = Path(settings.DATA_DIR) / "static_build"
+ASSETS_URL = "/assets"
+# User uploads change at runtime and are not fingerprinted
+SKIP_DIRS = {"uploads"}
+PRECOMPRESS_SUFFIXES = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_manifest: Dict[str, str] = {}
+
+def _write_atomic(target: Path, content: bytes) -> None:
+    # Every worker builds at startup: write to a private temp file and rename, so a concurrent reader
+    # (or builder) sees either no file or the complete one, never a partial write
+    temp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        temp.write_bytes(content)
+        os.replace(temp, target)
+    finally:
+        temp.unlink(missing_ok=True)
+
+def build_static_assets(source: Path = SOURCE_DIR, output: Path = BUILD_DIR) -> Dict[str, str]:
+    """
+    Copies every static file to `output` under a content-hashed name (css/layout.3f2a9c1b.css),
+    writes .gz/.br siblings for text assets and a manifest.json mapping logical -> hashed paths.
+    Safe to run at startup or as a build step, and from several workers at once: unchanged files are not
+    rewritten and every file appears atomically.
+    """
+    manifest = {}
+    for path in sorted(source.rglob("*")):
+        relative = path.relative_to(source)
+        if not path.is_file() or relative.parts[0] in SKIP_DIRS:
+            continue
+
+        content = path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        hashed = relative.with_name(f"{path.stem}.{digest}{path.suffix}")
+        target = output / hashed
+        manifest[relative.as_posix()] = hashed.as_posix()
+
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Compressed siblings first: once the asset itself exists, its variants are complete too
+        if path.suffix in PRECOMPRESS_SUFFIXES:
+            _write_atomic(target.with_name(target.name + ".gz"), gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_atomic(target.with_name(target.name + ".br"), brotli.compress(content, quality=11))
+        _write_atomic(target, content)
+
+    output.mkdir(parents=True, exist_ok=True)
+    _write_atomic(output / "manifest.json", json.dumps(manifest, indent=2).encode())
+    load_manifest(output)
+    return manifest
+
+def load_manifest(output: Path = BUILD_DIR) -> Dict[str, str]:
+    global _manifest
+    manifest_path = output / "manifest.json"
+    _manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    return _manifest
+
+def static_url(path: str) -> str:
+    """
+    Template helper: fingerprinted URL for a static file, falling back to the plain /static mount.
+    """
+    path = path.lstrip("/")
+    hashed = _manifest.get(path)
+    if hashed:
+        return f"{ASSETS_URL}/{hashed}"
+    return f"/static/{path}"
+
+# Pick up a manifest from a previous build so static_url() works before the startup build runs
+load_manifest()
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Serves fingerprinted assets with immutable caching, preferring a .br/.gz sibling when the client accepts it.
+    Negotiates with the same choose_encoding as the dynamic CompressionMiddleware.
+    """
+    async def get_response(self, path: str, scope: Scope):
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        suffix = {"br": ".br", "gzip": ".gz"}.get(encoding)
+        full_path, stat_result = self.lookup_path(path + suffix) if suffix else ("", None)
+        if stat_result is not None:
+            response = self.file_response(full_path, stat_result, scope)
+            # Content type comes from the original name, not the .br/.gz suffix
+            media_type = mimetypes.guess_type(full_path[: -len(suffix)])[0] or "application/octet-stream"
+            if media_type.startswith("text/"):
+                media_type += "; charset=utf-8"
+            response.headers["Content-Type"] = media_type
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Vary"] = "Accept-Encoding"
+            response.headers["Cache-Control"] = IMMUTABLE
+            return response
+
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = IMMUTABLE
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+if __name__ == "__main__":
+    built = build_static_assets()
+    print(f"Fingerprinted {len(built)} static files into {BUILD_DIR}")
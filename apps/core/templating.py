@@ -0,0 +1,51 @@
+from pathlib import Path
+from typing import Any
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, nodes
+from jinja2.ext import Extension
+from apps.core.cache import TTLCache
+from apps.core.static_assets import static_url
+from config import settings
+
+# Rendered fragments for expensive, rarely changing blocks (catalog data only, never per-user state)
+fragment_cache = TTLCache(ttl=settings.FRAGMENT_CACHE_SECONDS, maxsize=4096)
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache ("cast", media_type, media.id, catalog_version) %} ... {% endcache %}
+
+    Caches the rendered body under the given key. Keys should include the catalog version so a
+    catalog refresh (which bumps it) invalidates fragments in every worker.
+    """
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render_cached", [key]), [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, key: Any, caller) -> str:
+        key = tuple(key) if isinstance(key, (list, tuple)) else (key,)
+        rendered = fragment_cache.get(key)
+        if rendered is None:
+            rendered = caller()
+            fragment_cache.set(key, rendered)
+        return rendered
+
+def clear_fragment_cache() -> None:
+    fragment_cache.clear()
+
+BYTECODE_CACHE_DIR = Path(settings.DATA_DIR) / "jinja_cache"
+BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# One environment per worker: templates compile once and the bytecode survives restarts
+env = Environment(
+    loader=FileSystemLoader("templates"),
+    autoescape=True,
+    bytecode_cache=FileSystemBytecodeCache(str(BYTECODE_CACHE_DIR)),
+    extensions=[FragmentCacheExtension],
+)
+env.globals["static_url"] = static_url
+
+templates = Jinja2Templates(env=env)
@@ -1,12 +1,31 @@
+import asyncio
 import httpx
+from datetime import date
 from typing import Optional, Dict, Any, List
+from apps.core.tmdb_fixtures import canonical_query, save_fixture
 from config import settings
 
 class TMDBService:
     def __init__(self):
         self.api_key = settings.TMDB_API_KEY
         self.base_url = settings.TMDB_BASE_URL
-        self.client = httpx.AsyncClient(base_url=self.base_url, params={"api_key": self.api_key, "language": "en-US"})
+        event_hooks = {"response": [self._record_response]} if settings.TMDB_RECORD_DIR else {}
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url, params={"api_key": self.api_key, "language": "en-US"}, event_hooks=event_hooks
+        )
+
+    async def _record_response(self, response: httpx.Response) -> None:
+        """Record mode: saves successful and 404 responses as fixtures for the replay stand-in."""
+        # Auth failures, 429s and 5xx are transient; recording them would overwrite a good fixture
+        if not (response.is_success or response.status_code == 404):
+            return
+        await response.aread()
+        base_path = self.client.base_url.path.rstrip("/")
+        path = response.request.url.path[len(base_path):] or "/"
+        await asyncio.to_thread(
+            save_fixture, settings.TMDB_RECORD_DIR, path, canonical_query(response.request.url.params.multi_items()),
+            response.status_code, response.content
+        )
 
     async def close(self):
         await self.client.aclose()
@@ -41,6 +60,21 @@ class TMDBService:
         response.raise_for_status()
         return response.json()
     
+    async def find_by_imdb_id(self, imdb_id: str) -> Dict[str, Any]:
+        """Resolve an IMDb id (tt...) to TMDB movie/tv/episode results."""
+        response = await self.client.get(f"/find/{imdb_id}", params={"external_source": "imdb_id"})
+        response.raise_for_status()
+        return response.json()
+
+    async def search_title(self, media_type: str, query: str, year: Optional[int] = None) -> Dict[str, Any]:
+        """Search movies or TV shows by title, optionally narrowed to a release year."""
+        params = {"query": query}
+        if year:
+            params["year" if media_type == 'movie' else "first_air_date_year"] = year
+        response = await self.client.get(f"/search/{media_type}", params=params)
+        response.raise_for_status()
+        return response.json()
+
     async def get_season_details(self, tv_id: int, season_number: int) -> Dict[str, Any]:
         """Get details for a specific season."""
         response = await self.client.get(f"/tv/{tv_id}/season/{season_number}")
@@ -51,6 +85,14 @@ class TMDBService:
         response.raise_for_status()
         return response.json()
 
+    async def get_changes(self, media_type: str, start_date: date, end_date: date, page: int = 1) -> Dict[str, Any]:
+        """IDs of movies or TV shows edited between two dates (inclusive, at most 14 days apart)."""
+        response = await self.client.get(f"/{media_type}/changes", params={
+            "start_date": start_date.isoformat(), "end_date": end_date.isoformat(), "page": page
+        })
+        response.raise_for_status()
+        return response.json()
+
     def get_image_url(self, path: Optional[str], size: str = "w500") -> Optional[str]:
         if not path:
             return None
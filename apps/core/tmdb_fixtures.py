@@ -0,0 +1,49 @@
+import hashlib
+import os
+import re
+from typing import Dict, Iterable, Tuple
+import orjson
+
+# Sent on every request but irrelevant to the response we replay
+IGNORED_PARAMS = {"api_key", "language"}
+
+# {(path, canonical query): (status, body)}
+FixtureIndex = Dict[Tuple[str, str], Tuple[int, bytes]]
+
+def canonical_query(params: Iterable[Tuple[str, str]]) -> str:
+    """
+    Query string that identifies a fixture: sorted, without credentials or locale.
+    """
+    return "&".join(f"{key}={value}" for key, value in sorted(set(params)) if key not in IGNORED_PARAMS)
+
+def fixture_filename(path: str, query: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    digest = hashlib.sha1(query.encode()).hexdigest()[:10]
+    return f"{slug}__{digest}.json"
+
+def save_fixture(directory: str, path: str, query: str, status: int, body: bytes) -> str:
+    """
+    Writes one recorded TMDB response; re-recording the same request overwrites it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, fixture_filename(path, query))
+    try:
+        payload = orjson.loads(body) if body else None
+    except orjson.JSONDecodeError:
+        payload = body.decode(errors="replace")
+    with open(filename, "wb") as f:
+        f.write(orjson.dumps({"path": path, "query": query, "status": status, "body": payload}, option=orjson.OPT_INDENT_2))
+    return filename
+
+def load_fixtures(directory: str) -> FixtureIndex:
+    """
+    Reads every recorded response in `directory` into memory, keyed for replay.
+    """
+    fixtures: FixtureIndex = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            fixture = orjson.loads(f.read())
+        fixtures[(fixture["path"], fixture["query"])] = (fixture["status"], orjson.dumps(fixture["body"]))
+    return fixtures
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import FileResponse
+from apps.images.services import image_service, IMAGE_SIZES, TMDB_PATH
+
+router = APIRouter(prefix="/img", tags=["images"])
+
+# Stored files are content-addressed and never change for a given URL
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+@router.get("/{size}/{path}")
+async def tmdb_image(request: Request, size: str, path: str):
+    if size not in IMAGE_SIZES or not TMDB_PATH.match(path):
+        return Response(status_code=404)
+
+    fmt, media_type = image_service.negotiate_format(request.headers.get("accept", ""))
+    try:
+        file_path = await image_service.get_thumbnail(size, path, fmt)
+    except Exception as e:
+        print(f"[ERROR] Image proxy failed for {size}/{path}: {e}")
+        return Response(status_code=502)
+
+    if file_path is None:
+        return Response(status_code=404)
+
+    if file_path.suffix == ".svg":
+        media_type = "image/svg+xml"
+
+    return FileResponse(file_path, media_type=media_type, headers={
+        "Cache-Control": IMMUTABLE,
+        "Vary": "Accept"
+    })
@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+import httpx
+from config import settings
+
+# Sizes the templates request -> (max width, max height). None keeps that dimension proportional.
+# "original" is only used for hero backdrops, which never render wider than a large screen.
+IMAGE_SIZES: Dict[str, Tuple[Optional[int], Optional[int]]] = {
+    "h30": (None, 30),
+    "w200": (200, None),
+    "w300": (300, None),
+    "w500": (500, None),
+    "original": (1280, None),
+}
+
+# Served formats, best first, with their Accept header mime types
+OUTPUT_FORMATS = [
+    ("avif", "image/avif"),
+    ("webp", "image/webp"),
+]
+FALLBACK_FORMAT = ("jpeg", "image/jpeg")
+
+TMDB_PATH = re.compile(r"^[A-Za-z0-9_\-]+\.(jpg|jpeg|png|webp|svg)$")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def render_thumbnail(source: str, destination: str, max_width: Optional[int], max_height: Optional[int], fmt: str) -> str:
+    """
+    Resizes `source` into `destination` in the given format. Runs inside a worker process.
+    """
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.mode in ("LA", "PA") or "transparency" in image.info else "RGB")
+        if fmt == "jpeg" and image.mode == "RGBA":
+            image = image.convert("RGB")
+
+        width, height = image.size
+        scale = min(
+            (max_width / width) if max_width else 1,
+            (max_height / height) if max_height else 1,
+            1,
+        )
+        if scale < 1:
+            image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+
+        tmp_path = f"{destination}.{os.getpid()}.tmp"
+        options = {"quality": 80}
+        if fmt == "webp":
+            options["method"] = 4
+        image.save(tmp_path, format=fmt.upper(), **options)
+
+    # Atomic publish so concurrent readers never see a half-written file
+    os.replace(tmp_path, destination)
+    return destination
+
+def render_avatars(source: str, destination_dir: str, stem: str, sizes: Tuple[int, ...]) -> Dict[int, str]:
+    """
+    Validates an uploaded photo and writes square WebP avatars ({stem}_{size}.webp) for each size.
+    Runs inside a worker process; raises ValueError if the upload is not a readable image.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source) as image:
+            image.load()
+            # Phone photos carry their rotation in EXIF; bake it in before cropping
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.mode in ("LA", "PA", "RGBA") or "transparency" in image.info else "RGB")
+
+            written = {}
+            for size in sizes:
+                avatar = ImageOps.fit(image, (size, size), Image.LANCZOS)
+                destination = os.path.join(destination_dir, f"{stem}_{size}.webp")
+                tmp_path = f"{destination}.{os.getpid()}.tmp"
+                avatar.save(tmp_path, format="WEBP", quality=85, method=4)
+                os.replace(tmp_path, destination)
+                written[size] = destination
+            return written
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise ValueError("Uploaded file is not a valid image")
+
+class ImageService:
+    """
+    Local proxy for TMDB images: each upstream file is fetched once, stored under a content-addressed
+    name and resized into the sizes the templates actually use.
+    """
+    def __init__(self, root: Optional[Path] = None, origin: Optional[str] = None):
+        self.root = Path(root or Path(settings.DATA_DIR) / "images")
+        self.origin = (origin or settings.TMDB_IMAGE_BASE_URL).rstrip("/")
+        self._locks: Dict[str, list] = {} # key -> [lock, holders and waiters]
+
+    @staticmethod
+    def negotiate_format(accept: str) -> Tuple[str, str]:
+        accept = accept or ""
+        for fmt, mime in OUTPUT_FORMATS:
+            if mime in accept:
+                return fmt, mime
+        return FALLBACK_FORMAT
+
+    @asynccontextmanager
+    async def _lock(self, key: str) -> AsyncIterator[None]:
+        # Per-key lock, dropped once nobody holds or waits for it so the dict only holds in-flight keys
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def _pointer_path(self, path: str) -> Path:
+        return self.root / "paths" / path
+
+    def _read_pointer(self, path: str) -> Optional[Path]:
+        # Blocking; an empty or dangling pointer counts as missing so the original is fetched again
+        try:
+            name = self._pointer_path(path).read_text().strip()
+        except FileNotFoundError:
+            return None
+        original = self.root / "originals" / name
+        return original if name and original.is_file() else None
+
+    def _store_original(self, path: str, content: bytes) -> Path:
+        """
+        Writes a fetched file under its content hash and points `path` at it. Blocking; run it in a thread.
+        Both files are published with os.replace, so readers never see a partial original or pointer.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        original = self.root / "originals" / f"{digest}{Path(path).suffix.lower()}"
+        original.parent.mkdir(parents=True, exist_ok=True)
+        if not original.exists():
+            tmp = original.with_suffix(f"{original.suffix}.{os.getpid()}.tmp")
+            tmp.write_bytes(content)
+            os.replace(tmp, original)
+
+        pointer = self._pointer_path(path)
+        pointer.parent.mkdir(parents=True, exist_ok=True)
+        tmp = pointer.with_name(f"{pointer.name}.{os.getpid()}.tmp")
+        tmp.write_text(original.name)
+        os.replace(tmp, pointer)
+        return original
+
+    async def _fetch_original(self, path: str) -> Optional[bytes]:
+        # Streamed so an oversized upstream file is refused before it is buffered
+        limit = settings.IMAGE_ORIGIN_MAX_BYTES
+        async with httpx.AsyncClient(timeout=30) as client:
+            async with client.stream("GET", f"{self.origin}/original/{path}") as response:
+                if response.status_code == 404:
+                    return None
+                response.raise_for_status()
+
+                content_length = response.headers.get("content-length")
+                if content_length and content_length.isdigit() and int(content_length) > limit:
+                    raise ValueError(f"Upstream image is {content_length} bytes (limit {limit})")
+                chunks = []
+                received = 0
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+                    if received > limit:
+                        raise ValueError(f"Upstream image exceeds {limit} bytes")
+                    chunks.append(chunk)
+        if not received:
+            raise ValueError("Upstream image is empty")
+        return b"".join(chunks)
+
+    async def get_original(self, path: str) -> Optional[Path]:
+        """
+        Returns the stored original for a TMDB file name, fetching it from the origin the first time.
+        """
+        original = await asyncio.to_thread(self._read_pointer, path)
+        if original is not None:
+            return original
+
+        async with self._lock(f"original:{path}"):
+            original = await asyncio.to_thread(self._read_pointer, path)
+            if original is not None:
+                return original
+
+            content = await self._fetch_original(path)
+            if content is None:
+                return None
+            return await asyncio.to_thread(self._store_original, path, content)
+
+    async def get_thumbnail(self, size: str, path: str, fmt: str) -> Optional[Path]:
+        """
+        Returns a resized copy of `path` in `fmt`, generating it in the process pool on first request.
+        SVGs are returned untouched.
+        """
+        original = await self.get_original(path)
+        if original is None or original.suffix == ".svg":
+            return original
+
+        max_width, max_height = IMAGE_SIZES[size]
+        thumbnail = self.root / "thumbs" / original.stem / f"{size}.{fmt}"
+        if thumbnail.exists():
+            return thumbnail
+
+        async with self._lock(f"thumb:{thumbnail}"):
+            if not thumbnail.exists():
+                thumbnail.parent.mkdir(parents=True, exist_ok=True)
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(
+                    get_executor(), render_thumbnail,
+                    str(original), str(thumbnail), max_width, max_height, fmt
+                )
+        return thumbnail
+
+image_service = ImageService()
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field, Index
+
+class ImportJob(SQLModel, table=True):
+    """
+    One uploaded history export being (or having been) imported. Counters are updated after every batch
+    so the progress partial can poll them.
+    """
+    __table_args__ = (
+        Index("ix_importjob_user_id_created_at", "user_id", "created_at"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    source: str # trakt, letterboxd, imdb
+    filename: str
+    upload_path: Optional[str] = None # Stored upload, removed once the job ends
+    status: str = Field(default="queued") # queued, running, done, failed
+
+    rows_processed: int = 0
+    rows_imported: int = 0
+    rows_unmatched: int = 0 # No TMDB match for the title/id
+    rows_failed: int = 0 # The TMDB lookup or details request errored
+    message: Optional[str] = None
+
+    worker_id: Optional[str] = None # Process running the job (apps.core.leases.WORKER_ID)
+    heartbeat_at: Optional[datetime] = None # Touched while the job runs; goes stale when its process dies
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+# Parsers turn an export file into a stream of ImportRecords without loading the whole file.
+
+@dataclass
+class ImportRecord:
+    """
+    One history entry, before TMDB resolution. media_type is "movie", "tv" or "episode"
+    (an episode known only by its IMDb id; resolution turns it into a tv record with season/episode numbers).
+    """
+    media_type: str
+    tmdb_id: Optional[int] = None
+    imdb_id: Optional[str] = None
+    title: Optional[str] = None
+    year: Optional[int] = None
+    status: Optional[str] = None # None: watched for movies, watching for shows
+    rating: Optional[float] = None # 0-10
+    watched_at: Optional[datetime] = None
+    season_number: Optional[int] = None
+    episode_number: Optional[int] = None
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """
+    ISO dates/datetimes (with or without a zone) as naive UTC, like every other timestamp in the DB.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def parse_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+def parse_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+def iter_json_items(fp: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Yields the elements of a top-level JSON array (or the lines of a JSON Lines file) one at a time,
+    keeping only the current chunk and the element being decoded in memory.
+    """
+    decoder = json.JSONDecoder()
+    reader = io.TextIOWrapper(fp, encoding="utf-8-sig")
+    buffer = ""
+    position = 0
+    eof = False
+
+    while True:
+        # Skip separators between elements
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            position += 1
+
+        if position < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("File is not valid JSON")
+                item = None
+            else:
+                # A number/literal cut at the chunk edge decodes "successfully"; only trust it with more data behind
+                if end < len(buffer) or eof:
+                    yield item
+                    position = end
+                    continue
+
+        if eof:
+            return
+        chunk = reader.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def parse_trakt(fp: BinaryIO, filename: str = "") -> Iterator[ImportRecord]:
+    """
+    Trakt JSON exports: history, ratings, watchlist (items with type + movie/show/episode) and
+    watched-shows (show + seasons[].episodes[]).
+    """
+    watchlist = "watchlist" in filename.lower()
+    for item in iter_json_items(fp):
+        if not isinstance(item, dict):
+            continue
+
+        show = item.get("show") or {}
+        show_ids = show.get("ids") or {}
+
+        if "seasons" in item and show:
+            for season in item.get("seasons") or []:
+                for episode in season.get("episodes") or []:
+                    yield ImportRecord(
+                        media_type="tv", tmdb_id=show_ids.get("tmdb"), imdb_id=show_ids.get("imdb"),
+                        title=show.get("title"), year=show.get("year"),
+                        watched_at=parse_datetime(episode.get("last_watched_at")),
+                        season_number=parse_int(season.get("number")), episode_number=parse_int(episode.get("number"))
+                    )
+            continue
+
+        kind = item.get("type") or next((key for key in ("episode", "movie", "show") if key in item), None)
+        watched_at = parse_datetime(item.get("watched_at") or item.get("last_watched_at") or item.get("rated_at"))
+        rating = parse_float(item.get("rating"))
+        status = "wishlist" if watchlist else None
+
+        if kind == "movie":
+            movie = item.get("movie") or {}
+            ids = movie.get("ids") or {}
+            yield ImportRecord(
+                media_type="movie", tmdb_id=ids.get("tmdb"), imdb_id=ids.get("imdb"),
+                title=movie.get("title"), year=movie.get("year"),
+                status=status, rating=rating, watched_at=watched_at
+            )
+        elif kind == "show":
+            yield ImportRecord(
+                media_type="tv", tmdb_id=show_ids.get("tmdb"), imdb_id=show_ids.get("imdb"),
+                title=show.get("title"), year=show.get("year"),
+                status=status, rating=rating, watched_at=watched_at
+            )
+        elif kind == "episode" and show:
+            episode = item.get("episode") or {}
+            yield ImportRecord(
+                media_type="tv", tmdb_id=show_ids.get("tmdb"), imdb_id=show_ids.get("imdb"),
+                title=show.get("title"), year=show.get("year"),
+                rating=rating, watched_at=watched_at,
+                season_number=parse_int(episode.get("season")), episode_number=parse_int(episode.get("number"))
+            )
+
+def _csv_rows(fp: BinaryIO) -> Iterator[Dict[str, str]]:
+    reader = csv.DictReader(io.TextIOWrapper(fp, encoding="utf-8-sig", errors="replace", newline=""))
+    for row in reader:
+        yield {(key or "").strip(): (value or "").strip() for key, value in row.items()}
+
+def parse_letterboxd(fp: BinaryIO, filename: str = "") -> Iterator[ImportRecord]:
+    """
+    Letterboxd CSV exports (diary, watched, ratings, watchlist). Ratings are 0.5-5 stars.
+    """
+    watchlist = "watchlist" in filename.lower()
+    for row in _csv_rows(fp):
+        if not row.get("Name"):
+            continue
+        stars = parse_float(row.get("Rating"))
+        yield ImportRecord(
+            media_type="movie", title=row["Name"], year=parse_int(row.get("Year")),
+            status="wishlist" if watchlist else None,
+            rating=stars * 2 if stars is not None else None,
+            watched_at=parse_datetime(row.get("Watched Date") or row.get("Date"))
+        )
+
+IMDB_TITLE_TYPES = {
+    "movie": "movie", "tvMovie": "movie", "video": "movie", "short": "movie", "tvShort": "movie", "tvSpecial": "movie",
+    "tvSeries": "tv", "tvMiniSeries": "tv",
+    "tvEpisode": "episode",
+}
+
+def parse_imdb(fp: BinaryIO, filename: str = "") -> Iterator[ImportRecord]:
+    """
+    IMDb ratings/watchlist CSV exports, keyed by the tt... id in "Const".
+    """
+    watchlist = "watchlist" in filename.lower()
+    for row in _csv_rows(fp):
+        imdb_id = row.get("Const")
+        media_type = IMDB_TITLE_TYPES.get(row.get("Title Type", ""), "movie")
+        if not imdb_id:
+            continue
+        yield ImportRecord(
+            media_type=media_type, imdb_id=imdb_id, title=row.get("Title"), year=parse_int(row.get("Year")),
+            status="wishlist" if watchlist else None,
+            rating=parse_float(row.get("Your Rating")),
+            watched_at=parse_datetime(row.get("Date Rated") or row.get("Created"))
+        )
+
+PARSERS = {
+    "trakt": parse_trakt,
+    "letterboxd": parse_letterboxd,
+    "imdb": parse_imdb,
+}
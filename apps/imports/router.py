@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, File, Form, Request, UploadFile
+from fastapi.responses import HTMLResponse
+from sqlmodel import Session
+from apps.auth.deps import require_user, require_user_claim, UserClaim
+from apps.auth.models import User
+from apps.core.templating import templates
+from apps.imports.services import ImportService, start_import
+from apps.tracker.exports import available_formats
+from database import get_session
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+def get_service(session: Session = Depends(get_session)) -> ImportService:
+    return ImportService(session)
+
+@router.get("/", response_class=HTMLResponse)
+def import_page(
+    request: Request,
+    user: User = Depends(require_user),
+    service: ImportService = Depends(get_service)
+):
+    return templates.TemplateResponse("imports/index.html", {
+        "request": request,
+        "user": user,
+        "jobs": service.get_recent_jobs(user.id),
+        "export_formats": available_formats()
+    })
+
+@router.post("/", response_class=HTMLResponse)
+async def upload_import(
+    request: Request,
+    source: str = Form(...),
+    file: UploadFile = File(...),
+    user: UserClaim = Depends(require_user_claim),
+    service: ImportService = Depends(get_service)
+):
+    # has_active_job skips the upload in the common case; create_job re-checks atomically when it inserts the job
+    job = None if service.has_active_job(user.id) else await service.create_job(user.id, source, file)
+    if job is None:
+        return templates.TemplateResponse("imports/partials_job.html", {
+            "request": request, "job": None, "error": "An import is already running. Wait for it to finish first."
+        })
+
+    start_import(job)
+    return templates.TemplateResponse("imports/partials_job.html", {"request": request, "job": job})
+
+@router.get("/{job_id}", response_class=HTMLResponse)
+def import_progress(
+    request: Request,
+    job_id: int,
+    user: UserClaim = Depends(require_user_claim),
+    service: ImportService = Depends(get_service)
+):
+    job = service.get_job(user.id, job_id)
+    return templates.TemplateResponse("imports/partials_job.html", {
+        "request": request, "job": job, "error": None if job else "Import not found."
+    })
@@ -0,0 +1,405 @@
+import asyncio
+import itertools
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import exists, func, insert, literal, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from apps.core.base_service import BaseService
+from apps.core.cache import TTLCache
+from apps.core.leases import WORKER_ID
+from apps.core.tmdb import TMDBService
+from apps.imports.models import ImportJob
+from apps.imports.parsers import PARSERS, ImportRecord
+from apps.tracker.models import Media, UserMedia, EpisodeActivity
+from apps.tracker.services import TrackerService
+from apps.tracker.analytics import ActivityLedger, watch_time, stamp_watch_time
+from database import engine
+from config import settings
+
+UPLOADS_DIR = Path(settings.DATA_DIR) / "uploads" / "imports"
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# TMDB lookups shared by every import: ("imdb", id) / ("search", type, title, year) -> (media_type, tmdb_id, season, episode).
+# Misses are cached too (as False) so a history full of the same unknown title costs one request.
+resolution_cache = TTLCache(ttl=24 * 3600, maxsize=20000)
+
+# Keeps running import tasks referenced until they finish
+_running_jobs: Set[asyncio.Task] = set()
+
+# Returned for a TMDB request that errored, as opposed to None for "TMDB has no match"
+LOOKUP_FAILED = object()
+
+MediaKey = Tuple[str, int] # (media_type, tmdb_id)
+
+class ImportService(BaseService):
+
+    def get_job(self, user_id: int, job_id: int) -> Optional[ImportJob]:
+        job = self.session.get(ImportJob, job_id)
+        return job if job and job.user_id == user_id else None
+
+    def get_recent_jobs(self, user_id: int, limit: int = 10) -> List[ImportJob]:
+        return self.session.exec(
+            select(ImportJob).where(ImportJob.user_id == user_id).order_by(ImportJob.created_at.desc()).limit(limit)
+        ).all()
+
+    def has_active_job(self, user_id: int) -> bool:
+        return self.session.exec(
+            select(ImportJob.id).where(ImportJob.user_id == user_id, ImportJob.status.in_(["queued", "running"]))
+        ).first() is not None
+
+    async def create_job(self, user_id: int, source: str, upload: UploadFile) -> Optional[ImportJob]:
+        """
+        Streams the upload to disk in chunks (rejecting it past IMPORT_MAX_BYTES) and queues a job for it.
+        Returns None, discarding the upload, when the user already has an import queued or running.
+        """
+        if source not in PARSERS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown import source: {source}")
+
+        UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+        path = UPLOADS_DIR / f"{uuid.uuid4().hex}{Path(upload.filename or '').suffix.lower()[:10]}"
+        written = 0
+        try:
+            with open(path, "wb") as buffer:
+                while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > settings.IMPORT_MAX_BYTES:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Import files must be under {settings.IMPORT_MAX_BYTES // (1024 * 1024)} MB"
+                        )
+                    await run_in_threadpool(buffer.write, chunk)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+
+        job_id = self.claim_job_slot(ImportJob(
+            user_id=user_id, source=source, filename=upload.filename or path.name, upload_path=str(path),
+            worker_id=WORKER_ID, heartbeat_at=datetime.utcnow()
+        ))
+        if job_id is None:
+            path.unlink(missing_ok=True)
+            return None
+        return self.session.get(ImportJob, job_id)
+
+    def claim_job_slot(self, job: ImportJob) -> Optional[int]:
+        """
+        Inserts `job` only if its user has no queued or running import, as one statement, so two uploads
+        racing past has_active_job (on any worker) can't both start. Returns the new job id, or None.
+        """
+        columns = [column for column in ImportJob.__table__.columns if column.name != "id"]
+        values = select(*(literal(getattr(job, column.name), column.type) for column in columns)).where(~exists().where(
+            ImportJob.user_id == job.user_id, ImportJob.status.in_(["queued", "running"])
+        ))
+        job_id = self.session.exec(
+            insert(ImportJob).from_select([column.name for column in columns], values).returning(ImportJob.id)
+        ).first()
+        self.session.commit()
+        return job_id[0] if job_id else None
+
+    # --- Writing ---
+
+    def existing_media(self, keys: List[MediaKey]) -> Dict[MediaKey, int]:
+        if not keys:
+            return {}
+        rows = self.session.exec(
+            select(Media.media_type, Media.tmdb_id, Media.id).where(
+                tuple_(Media.media_type, Media.tmdb_id).in_(keys)
+            )
+        ).all()
+        return {(media_type, tmdb_id): media_id for media_type, tmdb_id, media_id in rows}
+
+    def write_batch(self, job_id: int, user_id: int, resolved: List[Tuple[ImportRecord, Optional[MediaKey]]],
+                    details: Dict[MediaKey, Dict[str, Any]], lookup_failed: int = 0) -> None:
+        """
+        Writes one batch of resolved records in a single transaction: missing Media rows, the user's
+        UserMedia rows (never downgrading a status or overwriting a rating the user already set) and
+        watched episodes, then the job counters. `lookup_failed` counts the batch's rows whose TMDB
+        lookup errored; they are reported as failed.
+        """
+        tracker = TrackerService(self.session)
+        keys = list({key for _, key in resolved if key})
+        media_ids = self.existing_media(keys)
+        for key in keys:
+            if key not in media_ids and key in details:
+                media_ids[key] = tracker.cache_media(details[key], key[0]).id
+
+        user_medias = {
+            user_media.media_id: user_media
+            for user_media in self.session.exec(
+                select(UserMedia).where(UserMedia.user_id == user_id, UserMedia.media_id.in_(list(media_ids.values())))
+            ).all()
+        } if media_ids else {}
+
+        # Existing entries leave the activity aggregates as they were and re-enter as they end up
+        ledger = ActivityLedger(self.session)
+        touched = set()
+        imported = unmatched = 0
+        failed = lookup_failed
+        episodes = {}
+        for record, key in resolved:
+            if key is None:
+                unmatched += 1
+                continue
+            media_id = media_ids.get(key)
+            if media_id is None:
+                failed += 1
+                continue
+
+            is_episode = record.season_number is not None and record.episode_number is not None
+            record_status = record.status or ("watched" if key[0] == "movie" else "watching")
+            when = record.watched_at or datetime.utcnow()
+
+            user_media = user_medias.get(media_id)
+            if user_media is None:
+                user_media = UserMedia(
+                    user_id=user_id, media_id=media_id, status=record_status,
+                    rating=None if is_episode else record.rating, created_at=when, updated_at=when
+                )
+                stamp_watch_time(user_media, None, when)
+                user_medias[media_id] = user_media
+            else:
+                if media_id not in touched:
+                    ledger.remove_title(user_media)
+                previous = watch_time(user_media)
+                if user_media.status == "wishlist" and record_status != "wishlist":
+                    user_media.status = record_status
+                if not is_episode and record.rating is not None and user_media.rating is None:
+                    user_media.rating = record.rating
+                user_media.updated_at = max(user_media.updated_at, when)
+                stamp_watch_time(user_media, previous, when)
+            self.session.add(user_media)
+            touched.add(media_id)
+
+            if is_episode:
+                episodes.setdefault((media_id, record.season_number, record.episode_number), (when, record.rating))
+            imported += 1
+
+        for media_id in touched:
+            ledger.add_title(user_medias[media_id])
+
+        self.session.flush()
+        if episodes:
+            statement = sqlite_insert(EpisodeActivity).values([
+                {
+                    "user_media_id": user_medias[media_id].id, "user_id": user_id, "season_number": season_number,
+                    "episode_number": episode_number, "status": "watched", "watched_at": when, "rating": rating
+                }
+                for (media_id, season_number, episode_number), (when, rating) in episodes.items()
+            ])
+            # Episodes the user already tracked keep their existing activity; only inserted rows come back
+            inserted = self.session.exec(statement.on_conflict_do_nothing(
+                index_elements=["user_media_id", "season_number", "episode_number"]
+            ).returning(EpisodeActivity.user_media_id, EpisodeActivity.status, EpisodeActivity.watched_at)).all()
+            media_by_user_media = {user_media.id: media_id for media_id, user_media in user_medias.items()}
+            for user_media_id, episode_status, watched_at in inserted:
+                ledger.add_episode(user_id, media_by_user_media[user_media_id], episode_status, watched_at)
+        ledger.apply()
+
+        job = self.session.get(ImportJob, job_id)
+        job.rows_processed += len(resolved) + lookup_failed
+        job.rows_imported += imported
+        job.rows_unmatched += unmatched
+        job.rows_failed += failed
+        self.session.add(job)
+        if imported:
+            tracker.bump_user_version(user_id)
+        self.session.commit()
+
+    def set_job_status(self, job_id: int, job_status: str, message: Optional[str] = None) -> None:
+        job = self.session.get(ImportJob, job_id)
+        job.status = job_status
+        job.message = message
+        if job_status == "running":
+            job.started_at = datetime.utcnow()
+        elif job_status in ("done", "failed"):
+            job.finished_at = datetime.utcnow()
+        self.session.add(job)
+        self.session.commit()
+
+    def touch_job(self, job_id: int) -> bool:
+        """
+        Heartbeat from the worker running the job. False when the job is no longer this worker's to run
+        (it was failed as interrupted meanwhile).
+        """
+        result = self.session.exec(
+            update(ImportJob).where(
+                ImportJob.id == job_id, ImportJob.worker_id == WORKER_ID, ImportJob.status.in_(["queued", "running"])
+            ).values(heartbeat_at=datetime.utcnow())
+        )
+        self.session.commit()
+        return result.rowcount > 0
+
+# --- Resolution ---
+
+async def resolve_record(tmdb: TMDBService, record: ImportRecord) -> Optional[Tuple[str, int, Optional[int], Optional[int]]]:
+    """
+    Maps a record to (media_type, tmdb_id, season, episode) using, in order: its TMDB id,
+    its IMDb id (/find), or a title + year search. None when TMDB has no match.
+    """
+    if record.tmdb_id and record.media_type in ("movie", "tv"):
+        return record.media_type, int(record.tmdb_id), record.season_number, record.episode_number
+
+    if record.imdb_id:
+        key = ("imdb", record.imdb_id)
+        match = resolution_cache.get(key)
+        if match is None:
+            data = await tmdb.find_by_imdb_id(record.imdb_id)
+            match = False
+            if data.get("tv_episode_results"):
+                episode = data["tv_episode_results"][0]
+                match = ("tv", episode["show_id"], episode.get("season_number"), episode.get("episode_number"))
+            elif record.media_type == "tv" and data.get("tv_results"):
+                match = ("tv", data["tv_results"][0]["id"], None, None)
+            elif data.get("movie_results"):
+                match = ("movie", data["movie_results"][0]["id"], None, None)
+            elif data.get("tv_results"):
+                match = ("tv", data["tv_results"][0]["id"], None, None)
+            resolution_cache.set(key, match)
+        if match:
+            media_type, tmdb_id, season_number, episode_number = match
+            if season_number is None:
+                season_number, episode_number = record.season_number, record.episode_number
+            return media_type, tmdb_id, season_number, episode_number
+
+    if record.title and record.media_type in ("movie", "tv"):
+        key = ("search", record.media_type, record.title.lower(), record.year)
+        tmdb_id = resolution_cache.get(key)
+        if tmdb_id is None:
+            results = (await tmdb.search_title(record.media_type, record.title, record.year)).get("results", [])
+            tmdb_id = results[0]["id"] if results else False
+            resolution_cache.set(key, tmdb_id)
+        if tmdb_id:
+            return record.media_type, tmdb_id, record.season_number, record.episode_number
+
+    return None
+
+def _lookup_key(record: ImportRecord) -> Tuple:
+    """
+    Records sharing this key resolve identically, so each batch resolves every distinct key once.
+    """
+    if record.tmdb_id and record.media_type in ("movie", "tv"):
+        return ("tmdb", record.media_type, record.tmdb_id)
+    if record.imdb_id:
+        return ("imdb", record.imdb_id, record.media_type)
+    return ("search", record.media_type, (record.title or "").lower(), record.year)
+
+async def process_import(job_id: int, user_id: int, source: str, path: Path, filename: str) -> None:
+    """
+    Streams the file through its parser in IMPORT_BATCH_SIZE chunks. For each chunk: resolve the distinct
+    titles and fetch details for titles not cached yet (at most IMPORT_CONCURRENCY TMDB requests in flight),
+    then write the chunk in one transaction.
+    """
+    tmdb = TMDBService()
+    semaphore = asyncio.Semaphore(settings.IMPORT_CONCURRENCY)
+
+    async def limited(coro):
+        async with semaphore:
+            try:
+                return await coro
+            except Exception as e:
+                print(f"[WARN] Import lookup failed: {e}")
+                return LOOKUP_FAILED
+
+    def run(method, *args):
+        with Session(engine) as session:
+            return getattr(ImportService(session), method)(*args)
+
+    async def heartbeat(import_task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(settings.IMPORT_HEARTBEAT_SECONDS)
+            try:
+                alive = await run_in_threadpool(run, "touch_job", job_id)
+            except Exception as e:
+                print(f"[WARN] Import {job_id} heartbeat failed: {e}")
+                continue
+            if not alive:
+                print(f"[WARN] Import {job_id} was failed as interrupted; stopping it")
+                import_task.cancel()
+                return
+
+    heartbeat_task = asyncio.create_task(heartbeat(asyncio.current_task()))
+    try:
+        await run_in_threadpool(run, "set_job_status", job_id, "running")
+        with open(path, "rb") as fp:
+            records = PARSERS[source](fp, filename)
+            while batch := await run_in_threadpool(lambda: list(itertools.islice(records, settings.IMPORT_BATCH_SIZE))):
+                lookups = {_lookup_key(record): record for record in batch}
+                matches = await asyncio.gather(*(limited(resolve_record(tmdb, record)) for record in lookups.values()))
+                matched = dict(zip(lookups, matches))
+
+                resolved = []
+                lookup_failed = 0
+                for record in batch:
+                    match = matched[_lookup_key(record)]
+                    if match is LOOKUP_FAILED:
+                        lookup_failed += 1
+                        continue
+                    if match is None:
+                        resolved.append((record, None))
+                        continue
+                    media_type, tmdb_id, season_number, episode_number = match
+                    record.season_number, record.episode_number = season_number, episode_number
+                    resolved.append((record, (media_type, tmdb_id)))
+
+                keys = list({key for _, key in resolved if key})
+                existing = await run_in_threadpool(run, "existing_media", keys)
+                missing = [key for key in keys if key not in existing]
+                fetched = await asyncio.gather(*(limited(tmdb.get_details(*key)) for key in missing))
+                details = {key: data for key, data in zip(missing, fetched) if data is not LOOKUP_FAILED}
+
+                await run_in_threadpool(run, "write_batch", job_id, user_id, resolved, details, lookup_failed)
+
+        await run_in_threadpool(run, "set_job_status", job_id, "done")
+    except Exception as e:
+        print(f"[ERROR] Import {job_id} failed: {e}")
+        await run_in_threadpool(run, "set_job_status", job_id, "failed", str(e)[:500])
+    finally:
+        heartbeat_task.cancel()
+        await tmdb.close()
+        path.unlink(missing_ok=True)
+
+def start_import(job: ImportJob) -> None:
+    path = Path(job.upload_path)
+    task = asyncio.create_task(process_import(job.id, job.user_id, job.source, path, job.filename))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+
+def fail_interrupted_imports() -> int:
+    """
+    Fails jobs whose process stopped heartbeating (crashed or restarted worker). Jobs of live workers keep
+    running, whichever worker started first. Returns the number of jobs failed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.IMPORT_STALE_SECONDS)
+    with Session(engine) as session:
+        jobs = session.exec(select(ImportJob).where(
+            ImportJob.status.in_(["queued", "running"]),
+            func.coalesce(ImportJob.heartbeat_at, ImportJob.created_at) < cutoff
+        )).all()
+        for job in jobs:
+            if job.upload_path:
+                Path(job.upload_path).unlink(missing_ok=True)
+            job.status = "failed"
+            job.message = "Interrupted by a server restart; please upload the file again."
+            job.finished_at = datetime.utcnow()
+            session.add(job)
+        session.commit()
+        return len(jobs)
+
+async def import_reaper(interval: int = settings.IMPORT_HEARTBEAT_SECONDS) -> None:
+    """
+    Background job (lease holder only, see main.py). Fails imports left behind by dead workers, so their
+    users aren't blocked by has_active_job forever.
+    """
+    while True:
+        try:
+            failed = await asyncio.to_thread(fail_interrupted_imports)
+            if failed:
+                print(f"[WARN] Failed {failed} interrupted imports")
+        except Exception as e:
+            print(f"[ERROR] Import reaper: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+class Recommendation(SQLModel, table=True):
+    """
+    Precomputed top-N titles per user, written by the recommendation job and read as-is by the page.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    rank: int = Field(primary_key=True)
+    media_id: int = Field(foreign_key="media.id")
+    score: float
+
+class RecommendationState(SQLModel, table=True):
+    """
+    Which library version a user's recommendations were computed from, so the job only redoes stale users.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    user_version: int = 0
+    computed_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
+from fastapi.responses import HTMLResponse
+from sqlmodel import Session
+from apps.auth.deps import require_user
+from apps.auth.models import User
+from apps.core.templating import templates
+from apps.recommendations.services import RecommendationService
+from apps.recommendations.tasks import claim_first_refresh, run_first_refresh
+from database import get_session
+
+router = APIRouter(prefix="/recommendations", tags=["recommendations"])
+
+def get_service(session: Session = Depends(get_session)) -> RecommendationService:
+    return RecommendationService(session)
+
+@router.get("/", response_class=HTMLResponse)
+def recommendations(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user: User = Depends(require_user),
+    service: RecommendationService = Depends(get_service)
+):
+    # Served from the table the background job fills; a brand new user gets a one-off computation
+    ready = service.has_recommendations(user.id)
+    if not ready:
+        token = claim_first_refresh(user.id)
+        if token:
+            background_tasks.add_task(run_first_refresh, user.id, token)
+
+    return templates.TemplateResponse("recommendations/index.html", {
+        "request": request,
+        "user": user,
+        "ready": ready,
+        "items": service.get_recommendations(user.id) if ready else []
+    })
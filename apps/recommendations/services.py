@@ -0,0 +1,258 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+from sqlalchemy import String, cast, delete, literal, union_all
+from sqlmodel import select
+from apps.core.base_service import BaseService
+from apps.recommendations.models import Recommendation, RecommendationState
+from apps.tracker.models import (
+    Media, UserMedia, DataVersion, MediaGenre, MediaKeyword, MediaCredit, MediaCountry
+)
+from config import settings
+
+# Relative weight of each feature family before IDF: sharing a keyword or genre says more than sharing a country
+FEATURE_WEIGHTS = {"genre": 1.0, "keyword": 1.0, "cast": 0.7, "country": 0.4}
+
+# Profile weight of a tracked title without a rating; rated titles use (rating - 5) / 5
+STATUS_WEIGHTS = {
+    "watched": 0.6,
+    "finished": 0.6,
+    "watching": 0.5,
+    "awaiting_episodes": 0.3,
+    "wishlist": 0.3,
+    "abandoned": -0.6,
+}
+DEFAULT_STATUS_WEIGHT = 0.3
+
+# Users scored per matrix product; bounds the dense (titles x users) score block
+USER_BATCH_SIZE = 64
+
+@dataclass
+class FeatureMatrix:
+    """
+    One row per cached title (sorted by Media.id), one column per feature, rows L2-normalized.
+    """
+    media_ids: np.ndarray
+    matrix: sparse.csr_matrix
+
+    def rows_for(self, media_ids: Sequence[int]) -> np.ndarray:
+        """
+        Row indexes of the given Media ids; ids without any features are dropped.
+        """
+        media_ids = np.asarray(media_ids, dtype=np.int64)
+        if not len(self.media_ids) or not len(media_ids):
+            return np.empty(0, dtype=np.int64)
+        rows = np.searchsorted(self.media_ids, media_ids)
+        rows = np.minimum(rows, len(self.media_ids) - 1)
+        return rows[self.media_ids[rows] == media_ids]
+
+def build_feature_matrix(media_ids: np.ndarray, feature_keys: np.ndarray, facets: np.ndarray) -> FeatureMatrix:
+    """
+    Builds the title x feature matrix from parallel arrays of (Media.id, feature key, feature family).
+    Each cell is FEATURE_WEIGHTS[family] * idf(feature), so rare keywords and actors count more than "Drama".
+    """
+    if not len(media_ids):
+        return FeatureMatrix(np.empty(0, dtype=np.int64), sparse.csr_matrix((0, 0), dtype=np.float32))
+
+    row_ids, rows = np.unique(np.asarray(media_ids, dtype=np.int64), return_inverse=True)
+    _, cols = np.unique(feature_keys, return_inverse=True)
+    family_names, families = np.unique(facets, return_inverse=True)
+    family_weights = np.array([FEATURE_WEIGHTS.get(name, 0.0) for name in family_names], dtype=np.float32)
+
+    n_rows, n_cols = len(row_ids), int(cols.max()) + 1
+    document_frequency = np.bincount(cols, minlength=n_cols)
+    idf = (np.log((1 + n_rows) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    values = family_weights[families] * idf[cols]
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(n_rows, n_cols), dtype=np.float32)
+    return FeatureMatrix(row_ids, normalize_rows(matrix))
+
+def normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1), dtype=np.float32).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+def score_profiles(
+    features: FeatureMatrix,
+    profiles: sparse.csr_matrix,
+    exclude: List[np.ndarray],
+    top_k: int
+) -> List[List[Tuple[int, float]]]:
+    """
+    Scores every title against a batch of user profiles at once.
+    `profiles` is (users x titles) with the rating weights of each user's library; a user's taste vector is
+    profiles @ X, and the cosine score of every title for every user is X @ tastes.T.
+    Returns, per user, up to `top_k` (Media.id, score) pairs, skipping `exclude` rows and non-positive scores.
+    """
+    matrix = features.matrix
+    tastes = normalize_rows(profiles.dot(matrix))
+    scores = matrix.dot(tastes.T).toarray()
+
+    results = []
+    for user_index, excluded_rows in enumerate(exclude):
+        column = scores[:, user_index]
+        column[excluded_rows] = -np.inf
+        k = min(top_k, len(column))
+        if k == 0:
+            results.append([])
+            continue
+        top = np.argpartition(-column, k - 1)[:k]
+        top = top[np.argsort(-column[top])]
+        results.append([
+            (int(features.media_ids[row]), float(column[row])) for row in top if column[row] > 0
+        ])
+    return results
+
+class RecommendationService(BaseService):
+
+    def load_feature_matrix(self) -> FeatureMatrix:
+        """
+        Reads every (title, feature) pair of the catalog in one UNION ALL query.
+        """
+        def pairs(family: str, media_id, value):
+            return select(
+                media_id.label("media_id"),
+                (literal(f"{family}:") + cast(value, String)).label("feature"),
+                literal(family).label("family")
+            )
+
+        query = union_all(
+            pairs("genre", MediaGenre.media_id, MediaGenre.genre_id),
+            pairs("keyword", MediaKeyword.media_id, MediaKeyword.keyword_id),
+            pairs("cast", MediaCredit.media_id, MediaCredit.person_id),
+            pairs("country", MediaCountry.media_id, MediaCountry.country_code),
+        )
+        rows = self.session.connection().execute(query).all()
+        if not rows:
+            return build_feature_matrix(np.empty(0), np.empty(0), np.empty(0))
+
+        media_ids, feature_keys, families = zip(*rows)
+        return build_feature_matrix(
+            np.fromiter(media_ids, dtype=np.int64, count=len(media_ids)),
+            np.array(feature_keys),
+            np.array(families)
+        )
+
+    @staticmethod
+    def library_weight(status: str, rating: Optional[float]) -> float:
+        if rating is not None:
+            return (rating - 5) / 5
+        return STATUS_WEIGHTS.get(status, DEFAULT_STATUS_WEIGHT)
+
+    def load_libraries(self, user_ids: Sequence[int]) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        {user_id: [(Media.id, profile weight), ...]} for the given users.
+        """
+        libraries = {user_id: [] for user_id in user_ids}
+        rows = self.session.exec(
+            select(UserMedia.user_id, UserMedia.media_id, UserMedia.status, UserMedia.rating).where(
+                UserMedia.user_id.in_(list(user_ids))
+            )
+        ).all()
+        for user_id, media_id, status, rating in rows:
+            libraries[user_id].append((media_id, self.library_weight(status, rating)))
+        return libraries
+
+    def stale_user_ids(self) -> Dict[int, int]:
+        """
+        Users whose recommendations are missing, older than RECOMMENDATION_MAX_AGE_SECONDS, or computed from an
+        older library version. Returns {user_id: current library version}.
+        """
+        user_ids = self.session.exec(select(UserMedia.user_id).distinct()).all()
+        versions = {
+            int(key.split(":", 1)[1]): version
+            for key, version in self.session.exec(
+                select(DataVersion.key, DataVersion.version).where(DataVersion.key.like("user:%"))
+            ).all()
+        }
+        states = {state.user_id: state for state in self.session.exec(select(RecommendationState)).all()}
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.RECOMMENDATION_MAX_AGE_SECONDS)
+
+        stale = {}
+        for user_id in user_ids:
+            version = versions.get(user_id, 0)
+            state = states.get(user_id)
+            if state is None or state.user_version != version or state.computed_at < cutoff:
+                stale[user_id] = version
+        return stale
+
+    def refresh(self, user_ids: Optional[Sequence[int]] = None) -> int:
+        """
+        Recomputes and stores recommendations for `user_ids` (default: every stale user). Returns users updated.
+        """
+        if user_ids is not None:
+            stale = {user_id: self._user_version(user_id) for user_id in user_ids}
+        else:
+            stale = self.stale_user_ids()
+        if not stale:
+            return 0
+
+        features = self.load_feature_matrix()
+        pending = list(stale)
+        for start in range(0, len(pending), USER_BATCH_SIZE):
+            batch = pending[start:start + USER_BATCH_SIZE]
+            libraries = self.load_libraries(batch)
+            results = self.score_libraries(features, [libraries[user_id] for user_id in batch])
+            for user_id, recommendations in zip(batch, results):
+                self.store(user_id, recommendations, stale[user_id])
+            self.session.commit()
+        return len(pending)
+
+    def score_libraries(self, features: FeatureMatrix, libraries: List[List[Tuple[int, float]]]) -> List[List[Tuple[int, float]]]:
+        n_rows = len(features.media_ids)
+        if n_rows == 0:
+            return [[] for _ in libraries]
+
+        data, rows, cols, exclude = [], [], [], []
+        for user_index, library in enumerate(libraries):
+            media_ids = [media_id for media_id, _ in library]
+            weights = dict(library)
+            matched = features.rows_for(media_ids)
+            exclude.append(matched)
+            for row in matched:
+                data.append(weights[int(features.media_ids[row])])
+                rows.append(user_index)
+                cols.append(row)
+
+        profiles = sparse.csr_matrix((data, (rows, cols)), shape=(len(libraries), n_rows), dtype=np.float32)
+        return score_profiles(features, profiles, exclude, settings.RECOMMENDATIONS_PER_USER)
+
+    def store(self, user_id: int, recommendations: List[Tuple[int, float]], user_version: int) -> None:
+        """
+        Replaces a user's stored recommendations inside the current transaction; the caller commits.
+        """
+        self.session.exec(delete(Recommendation).where(Recommendation.user_id == user_id))
+        self.session.add_all([
+            Recommendation(user_id=user_id, rank=rank, media_id=media_id, score=score)
+            for rank, (media_id, score) in enumerate(recommendations)
+        ])
+
+        state = self.session.get(RecommendationState, user_id) or RecommendationState(user_id=user_id)
+        state.user_version = user_version
+        state.computed_at = datetime.utcnow()
+        self.session.add(state)
+
+    def _user_version(self, user_id: int) -> int:
+        row = self.session.get(DataVersion, f"user:{user_id}")
+        return row.version if row else 0
+
+    def has_recommendations(self, user_id: int) -> bool:
+        return self.session.get(RecommendationState, user_id) is not None
+
+    def get_recommendations(self, user_id: int, limit: int = settings.RECOMMENDATIONS_PER_USER) -> List[Dict[str, Any]]:
+        """
+        Stored recommendations, best first, still excluding anything added to the library since they were computed.
+        """
+        tracked = select(UserMedia.media_id).where(UserMedia.user_id == user_id)
+        rows = self.session.exec(
+            select(
+                Media.tmdb_id, Media.media_type, Media.title, Media.poster_path, Media.release_year,
+                Media.genres, Recommendation.score
+            ).join(Media, Media.id == Recommendation.media_id).where(
+                Recommendation.user_id == user_id,
+                Recommendation.media_id.not_in(tracked)
+            ).order_by(Recommendation.rank).limit(limit)
+        ).all()
+        return [dict(row._mapping) for row in rows]
@@ -0,0 +1,46 @@
+import asyncio
+import uuid
+from typing import Optional, Sequence
+from sqlmodel import Session
+from database import engine
+from apps.core.leases import acquire_lease, release_lease
+from apps.recommendations.services import RecommendationService
+from config import settings
+
+def refresh_recommendations(user_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Recomputes stored recommendations (all stale users, or just `user_ids`) in its own session.
+    CPU-bound; call it from a thread.
+    """
+    with Session(engine) as session:
+        return RecommendationService(session).refresh(user_ids)
+
+# How long a queued first computation blocks others for the same user if its worker dies before finishing
+FIRST_REFRESH_CLAIM_SECONDS = 300
+
+def claim_first_refresh(user_id: int) -> Optional[str]:
+    """
+    Claims the one-off computation for a user who has no recommendations yet. Returns the claim token, or None
+    when a request on any worker already queued it, so repeat visits while it runs don't queue more work.
+    """
+    token = uuid.uuid4().hex
+    return token if acquire_lease(f"recommendations:{user_id}", token, FIRST_REFRESH_CLAIM_SECONDS) else None
+
+def run_first_refresh(user_id: int, token: str) -> None:
+    try:
+        refresh_recommendations([user_id])
+    finally:
+        release_lease(f"recommendations:{user_id}", token)
+
+async def recommendation_refresher(interval: int = settings.RECOMMENDATION_REFRESH_SECONDS) -> None:
+    """
+    Background job (lease holder only, see main.py). Picks up users whose library changed every `interval` seconds.
+    """
+    while True:
+        try:
+            updated = await asyncio.to_thread(refresh_recommendations)
+            if updated:
+                print(f"[INFO] Recomputed recommendations for {updated} users")
+        except Exception as e:
+            print(f"[ERROR] Recommendation refresher: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,143 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import case, delete, func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+from apps.core.base_service import BaseService
+from apps.tracker.models import Media, UserMedia, EpisodeActivity, UpcomingEpisode
+from apps.tracker.services import TrackerService
+from config import settings
+
+# TMDB statuses of shows that can still get new episodes; everything else (Ended, Canceled) is left alone
+AIRING_STATUSES = ("Returning Series", "In Production", "Planned", "Pilot")
+
+# Recently aired episodes stay on the calendar for a week
+UPCOMING_KEEP_DAYS = 7
+
+# (Media.id, tmdb_id, details payload or None when TMDB no longer has the show, season payload or None)
+ShowRefresh = Tuple[int, int, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+class AiringService(BaseService):
+
+    def due_shows(self, limit: int, now: Optional[datetime] = None) -> List[Tuple[int, int]]:
+        """
+        (Media.id, tmdb_id) of the tracked, still-running shows that need a refresh, most urgent first:
+        shows whose next episode has aired, then by number of trackers, then by how soon the next episode airs.
+        Due when never refreshed, older than the max age, or the announced next episode has aired since the
+        last refresh.
+        """
+        now = now or datetime.utcnow()
+        today = now.date()
+        trackers = select(
+            UserMedia.media_id, func.count().label("trackers")
+        ).where(UserMedia.status != "abandoned").group_by(UserMedia.media_id).subquery()
+
+        aired = Media.next_episode_air_date <= today
+        rows = self.session.exec(
+            select(Media.id, Media.tmdb_id).join(trackers, trackers.c.media_id == Media.id).where(
+                Media.media_type == "tv",
+                or_(Media.tmdb_status.is_(None), Media.tmdb_status.in_(AIRING_STATUSES)),
+                or_(
+                    Media.refreshed_at.is_(None),
+                    Media.refreshed_at < now - timedelta(seconds=settings.AIRING_REFRESH_MAX_AGE_SECONDS),
+                    aired & (Media.refreshed_at < datetime.combine(today, time.min)),
+                )
+            ).order_by(
+                case((aired, 0), else_=1),
+                trackers.c.trackers.desc(),
+                Media.next_episode_air_date.asc().nulls_last(),
+                Media.refreshed_at.asc().nulls_first()
+            ).limit(limit)
+        ).all()
+        return [tuple(row) for row in rows]
+
+    def store_refreshes(self, refreshes: Sequence[ShowRefresh], today: Optional[date] = None) -> int:
+        """
+        Writes a batch of fetched shows in one transaction: Media columns, the episode catalog of the
+        fetched season and the show's upcoming episodes. Returns the number of shows whose Media row changed.
+        """
+        today = today or datetime.utcnow().date()
+        tracker = TrackerService(self.session)
+        changed = 0
+        for media_id, _, details, season in refreshes:
+            media = self.session.get(Media, media_id)
+            if media is None:
+                continue
+            if details is None:
+                # Gone from TMDB: wait a full max-age period before asking again
+                media.refreshed_at = datetime.utcnow()
+                self.session.add(media)
+                continue
+            if tracker.refresh_media(media, details):
+                changed += 1
+            if season:
+                tracker.sync_season_catalog(media_id, season)
+            self.replace_upcoming(media_id, details, season, today)
+
+        self.prune_upcoming(today)
+        if changed:
+            tracker.bump_catalog_version()
+        self.session.commit()
+        return changed
+
+    def replace_upcoming(
+        self, media_id: int, details: Dict[str, Any], season: Optional[Dict[str, Any]], today: date
+    ) -> None:
+        """
+        Replaces a show's UpcomingEpisode rows with the episodes of the fetched season, plus TMDB's
+        last/next episode, that air from UPCOMING_KEEP_DAYS ago onward; the caller commits.
+        """
+        cutoff = today - timedelta(days=UPCOMING_KEEP_DAYS)
+        candidates = list((season or {}).get("episodes") or [])
+        candidates += [details[key] for key in ("last_episode_to_air", "next_episode_to_air") if details.get(key)]
+
+        episodes: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        for episode in candidates:
+            air_date = TrackerService._parse_air_date(episode.get("air_date"))
+            season_number, episode_number = episode.get("season_number"), episode.get("episode_number")
+            if air_date is None or air_date < cutoff or season_number is None or episode_number is None:
+                continue
+            episodes[(season_number, episode_number)] = {
+                "media_id": media_id,
+                "season_number": season_number,
+                "episode_number": episode_number,
+                "name": episode.get("name"),
+                "air_date": air_date,
+                "still_path": episode.get("still_path"),
+            }
+
+        self.session.exec(delete(UpcomingEpisode).where(UpcomingEpisode.media_id == media_id))
+        if episodes:
+            self.session.exec(sqlite_insert(UpcomingEpisode).values(list(episodes.values())))
+
+    def prune_upcoming(self, today: date) -> None:
+        self.session.exec(
+            delete(UpcomingEpisode).where(UpcomingEpisode.air_date < today - timedelta(days=UPCOMING_KEEP_DAYS))
+        )
+
+    def get_calendar(self, user_id: int, start: date, end: date) -> List[Dict[str, Any]]:
+        """
+        Episodes of the user's tracked shows airing in [start, end], in air order, flagged when already watched.
+        """
+        rows = self.session.exec(
+            select(
+                UpcomingEpisode.air_date, UpcomingEpisode.season_number, UpcomingEpisode.episode_number,
+                UpcomingEpisode.name, UpcomingEpisode.still_path,
+                Media.tmdb_id, Media.title, Media.poster_path,
+                EpisodeActivity.id.is_not(None).label("watched")
+            ).join(
+                UserMedia, UserMedia.media_id == UpcomingEpisode.media_id
+            ).join(Media, Media.id == UpcomingEpisode.media_id).outerjoin(
+                EpisodeActivity,
+                (EpisodeActivity.user_media_id == UserMedia.id)
+                & (EpisodeActivity.season_number == UpcomingEpisode.season_number)
+                & (EpisodeActivity.episode_number == UpcomingEpisode.episode_number)
+                & (EpisodeActivity.status == "watched")
+            ).where(
+                UserMedia.user_id == user_id, UserMedia.status != "abandoned",
+                UpcomingEpisode.air_date >= start, UpcomingEpisode.air_date <= end
+            ).order_by(
+                UpcomingEpisode.air_date, Media.title, UpcomingEpisode.season_number, UpcomingEpisode.episode_number
+            )
+        ).all()
+        return [dict(row._mapping) for row in rows]
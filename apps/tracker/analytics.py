@@ -0,0 +1,309 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from apps.core.base_service import BaseService
+from apps.tracker.models import Media, UserMedia, EpisodeActivity, Genre, MediaGenre, ActivityDay, ActivityGenreMonth
+
+# What counts as watch activity, matching the dashboard totals:
+#  - an EpisodeActivity with status "watched", on the day of its watched_at
+#  - a movie whose UserMedia status is watched/managed/finished, on the day it became watched (watch_time)
+# Minutes are the title's runtime, or the dashboard's estimate when TMDB has none.
+MOVIE_WATCHED_STATUSES = ("watched", "managed", "finished")
+DEFAULT_RUNTIME = {"movie": 120, "tv": 45}
+
+# Heatmap color steps (upper bound of minutes per level 1..3; anything above is level 4)
+HEATMAP_LEVELS = (30, 90, 180)
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+GENRE_MIX_MONTHS = 12
+GENRE_MIX_TOP = 6
+
+MEDIA_CHUNK_SIZE = 500
+
+def watch_minutes(media_type: Optional[str], runtime: Optional[int]) -> int:
+    return runtime or DEFAULT_RUNTIME.get(media_type, 0)
+
+def watch_time(user_media: UserMedia) -> Optional[datetime]:
+    """
+    When a title counted as watched: its watched_at, or updated_at for rows written before that column existed.
+    """
+    if user_media.status not in MOVIE_WATCHED_STATUSES:
+        return None
+    return user_media.watched_at or user_media.updated_at
+
+def stamp_watch_time(user_media: UserMedia, previous: Optional[datetime], now: datetime) -> None:
+    """
+    Call after changing a row's status, with its watch_time() from before the change: a title that stays
+    watched keeps its original watch time, one that just became watched is dated `now`.
+    """
+    user_media.watched_at = (previous or now) if user_media.status in MOVIE_WATCHED_STATUSES else None
+
+class ActivityLedger:
+    """
+    Collects the watch-activity changes of one transaction and applies them to ActivityDay / ActivityGenreMonth
+    as additive upserts. A row's contribution depends only on its current state, so a write path calls
+    remove_*() with the row as it was and add_*() with the row as it is now.
+    """
+    def __init__(self, session: Session):
+        self.session = session
+        self._entries: List[Tuple[int, int, str, datetime, int]] = [] # (user_id, media_id, kind, watched_at, sign)
+
+    def add_title(self, user_media: UserMedia, sign: int = 1) -> None:
+        # Only movies count here (resolved in apply); shows count through their episodes
+        watched_at = watch_time(user_media)
+        if watched_at:
+            self._entries.append((user_media.user_id, user_media.media_id, "title", watched_at, sign))
+
+    def remove_title(self, user_media: UserMedia) -> None:
+        self.add_title(user_media, -1)
+
+    def add_episode(self, user_id: int, media_id: int, status: Optional[str], watched_at: Optional[datetime], sign: int = 1) -> None:
+        if status == "watched" and watched_at:
+            self._entries.append((user_id, media_id, "episode", watched_at, sign))
+
+    def remove_episode(self, user_id: int, media_id: int, status: Optional[str], watched_at: Optional[datetime]) -> None:
+        self.add_episode(user_id, media_id, status, watched_at, -1)
+
+    def add_media(self, media_id: int, sign: int = 1) -> None:
+        """
+        Every user's watch activity on one title. A metadata refresh that changes the runtime or genres
+        retracts it (applied against the old metadata) and adds it back afterwards, so later removals
+        subtract exactly what is stored.
+        """
+        for user_media in self.session.exec(
+            select(UserMedia).where(UserMedia.media_id == media_id, UserMedia.status.in_(MOVIE_WATCHED_STATUSES))
+        ).all():
+            self.add_title(user_media, sign)
+        for user_id, status, watched_at in self.session.exec(
+            select(UserMedia.user_id, EpisodeActivity.status, EpisodeActivity.watched_at).join(
+                UserMedia, UserMedia.id == EpisodeActivity.user_media_id
+            ).where(UserMedia.media_id == media_id, EpisodeActivity.status == "watched")
+        ).all():
+            self.add_episode(user_id, media_id, status, watched_at, sign)
+
+    def remove_media(self, media_id: int) -> None:
+        self.add_media(media_id, -1)
+
+    def _media_info(self, media_ids: List[int]) -> Tuple[Dict[int, Tuple[str, Optional[int]]], Dict[int, List[int]]]:
+        media, genres = {}, defaultdict(list)
+        for start in range(0, len(media_ids), MEDIA_CHUNK_SIZE):
+            chunk = media_ids[start:start + MEDIA_CHUNK_SIZE]
+            for media_id, media_type, runtime in self.session.exec(
+                select(Media.id, Media.media_type, Media.runtime).where(Media.id.in_(chunk))
+            ).all():
+                media[media_id] = (media_type, runtime)
+            for media_id, genre_id in self.session.exec(
+                select(MediaGenre.media_id, MediaGenre.genre_id).where(MediaGenre.media_id.in_(chunk))
+            ).all():
+                genres[media_id].append(genre_id)
+        return media, genres
+
+    def apply(self) -> None:
+        """
+        Writes the collected changes inside the current transaction; the caller commits.
+        """
+        if not self._entries:
+            return
+
+        media, genres = self._media_info(list({entry[1] for entry in self._entries}))
+        days: Dict[Tuple[int, date], List[int]] = defaultdict(lambda: [0, 0, 0]) # episodes, movies, minutes
+        months: Dict[Tuple[int, date, int], int] = defaultdict(int)
+
+        for user_id, media_id, kind, watched_at, sign in self._entries:
+            media_type, runtime = media.get(media_id, (None, None))
+            if kind == "title" and media_type != "movie":
+                continue
+            minutes = sign * watch_minutes(media_type, runtime)
+            day = watched_at.date()
+            bucket = days[(user_id, day)]
+            bucket[0 if kind == "episode" else 1] += sign
+            bucket[2] += minutes
+            for genre_id in genres.get(media_id, []):
+                months[(user_id, day.replace(day=1), genre_id)] += minutes
+        self._entries.clear()
+
+        days = {key: value for key, value in days.items() if any(value)}
+        months = {key: value for key, value in months.items() if value}
+
+        if days:
+            statement = sqlite_insert(ActivityDay).values([
+                {"user_id": user_id, "day": day, "episodes": episodes, "movies": movies, "minutes": minutes}
+                for (user_id, day), (episodes, movies, minutes) in days.items()
+            ])
+            self.session.exec(statement.on_conflict_do_update(index_elements=["user_id", "day"], set_={
+                "episodes": ActivityDay.episodes + statement.excluded.episodes,
+                "movies": ActivityDay.movies + statement.excluded.movies,
+                "minutes": ActivityDay.minutes + statement.excluded.minutes,
+            }))
+            self.session.exec(delete(ActivityDay).where(
+                tuple_(ActivityDay.user_id, ActivityDay.day).in_(list(days)),
+                ActivityDay.episodes <= 0, ActivityDay.movies <= 0
+            ))
+
+        if months:
+            statement = sqlite_insert(ActivityGenreMonth).values([
+                {"user_id": user_id, "month": month, "genre_id": genre_id, "minutes": minutes}
+                for (user_id, month, genre_id), minutes in months.items()
+            ])
+            self.session.exec(statement.on_conflict_do_update(index_elements=["user_id", "month", "genre_id"], set_={
+                "minutes": ActivityGenreMonth.minutes + statement.excluded.minutes,
+            }))
+            self.session.exec(delete(ActivityGenreMonth).where(
+                tuple_(ActivityGenreMonth.user_id, ActivityGenreMonth.month, ActivityGenreMonth.genre_id).in_(list(months)),
+                ActivityGenreMonth.minutes <= 0
+            ))
+
+def rebuild_user_activity(session: Session, user_id: int) -> None:
+    """
+    Recomputes a user's aggregates from EpisodeActivity/UserMedia through the same ledger the write paths use.
+    Runs inside the current transaction; the caller commits.
+    """
+    session.exec(delete(ActivityDay).where(ActivityDay.user_id == user_id))
+    session.exec(delete(ActivityGenreMonth).where(ActivityGenreMonth.user_id == user_id))
+
+    ledger = ActivityLedger(session)
+    for user_media in session.exec(
+        select(UserMedia).where(UserMedia.user_id == user_id, UserMedia.status.in_(MOVIE_WATCHED_STATUSES))
+    ).all():
+        ledger.add_title(user_media)
+    for media_id, status, watched_at in session.exec(
+        select(UserMedia.media_id, EpisodeActivity.status, EpisodeActivity.watched_at).join(
+            UserMedia, UserMedia.id == EpisodeActivity.user_media_id
+        ).where(UserMedia.user_id == user_id, EpisodeActivity.status == "watched")
+    ).all():
+        ledger.add_episode(user_id, media_id, status, watched_at)
+    ledger.apply()
+
+def _level(minutes: int) -> int:
+    if minutes <= 0:
+        return 0
+    return next((level for level, bound in enumerate(HEATMAP_LEVELS, 1) if minutes <= bound), len(HEATMAP_LEVELS) + 1)
+
+def watch_streaks(active_days: List[date], today: date) -> Tuple[int, int]:
+    """
+    (longest, current) runs of consecutive active days. The current streak survives until the end of today.
+    """
+    longest = run = 0
+    previous = None
+    for day in active_days:
+        run = run + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if previous and (today - previous).days <= 1 else 0
+    return longest, current
+
+class AnalyticsService(BaseService):
+
+    def get_summary(self, user_id: int, years: int = 3, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Everything the analytics page shows, built from the user's ActivityDay rows (one per active day)
+        and the last GENRE_MIX_MONTHS of ActivityGenreMonth rows.
+        """
+        today = today or datetime.utcnow().date()
+        rows = self.session.exec(
+            select(ActivityDay.day, ActivityDay.episodes, ActivityDay.movies, ActivityDay.minutes).where(
+                ActivityDay.user_id == user_id
+            ).order_by(ActivityDay.day)
+        ).all()
+        by_day = {day: minutes for day, _, _, minutes in rows}
+
+        # Heatmap: one grid per calendar year, columns are Monday-starting weeks
+        heatmap = []
+        for year in range(today.year - years + 1, today.year + 1):
+            first, last = date(year, 1, 1), date(year, 12, 31)
+            cursor = first - timedelta(days=first.weekday())
+            weeks = []
+            while cursor <= last:
+                week = []
+                for _ in range(7):
+                    minutes = by_day.get(cursor, 0)
+                    week.append({
+                        "day": cursor, "minutes": minutes, "level": _level(minutes),
+                        "in_year": cursor.year == year and cursor <= today
+                    })
+                    cursor += timedelta(days=1)
+                weeks.append(week)
+            heatmap.append({
+                "year": year, "weeks": weeks,
+                "minutes": sum(minutes for day, minutes in by_day.items() if day.year == year)
+            })
+
+        weekly: Dict[date, int] = defaultdict(int)
+        monthly: Dict[date, int] = defaultdict(int)
+        weekdays = [0] * 7
+        for day, _, _, minutes in rows:
+            weekly[day - timedelta(days=day.weekday())] += minutes
+            monthly[day.replace(day=1)] += minutes
+            weekdays[day.weekday()] += minutes
+
+        this_week = today - timedelta(days=today.weekday())
+        recent_weeks = [this_week - timedelta(weeks=offset) for offset in range(25, -1, -1)]
+        recent_months = self._recent_months(today, 24)
+        longest, current = watch_streaks([row[0] for row in rows], today)
+
+        return {
+            "totals": {
+                "minutes": sum(row[3] for row in rows),
+                "episodes": sum(row[1] for row in rows),
+                "movies": sum(row[2] for row in rows),
+                "active_days": len(rows),
+            },
+            "heatmap": heatmap,
+            "last_30_days": [
+                {"day": day, "minutes": by_day.get(day, 0)}
+                for day in (today - timedelta(days=offset) for offset in range(29, -1, -1))
+            ],
+            "weekly": [{"start": week, "minutes": weekly.get(week, 0)} for week in recent_weeks],
+            "monthly": [{"month": month, "minutes": monthly.get(month, 0)} for month in recent_months],
+            "weekdays": [{"name": name, "minutes": minutes} for name, minutes in zip(WEEKDAYS, weekdays)],
+            "streaks": {"longest": longest, "current": current},
+            "genre_mix": self.get_genre_mix(user_id, today),
+        }
+
+    @staticmethod
+    def _recent_months(today: date, count: int) -> List[date]:
+        months = []
+        month = today.replace(day=1)
+        for _ in range(count):
+            months.append(month)
+            month = (month - timedelta(days=1)).replace(day=1)
+        return months[::-1]
+
+    def get_genre_mix(self, user_id: int, today: date) -> Dict[str, Any]:
+        """
+        Share of watch minutes per genre for each of the last GENRE_MIX_MONTHS months;
+        genres outside the window's GENRE_MIX_TOP are grouped as "Other".
+        """
+        months = self._recent_months(today, GENRE_MIX_MONTHS)
+        rows = self.session.exec(
+            select(ActivityGenreMonth.month, Genre.name, ActivityGenreMonth.minutes).join(
+                Genre, Genre.id == ActivityGenreMonth.genre_id
+            ).where(ActivityGenreMonth.user_id == user_id, ActivityGenreMonth.month >= months[0])
+        ).all()
+
+        totals: Dict[str, int] = defaultdict(int)
+        for _, name, minutes in rows:
+            totals[name] += minutes
+        top = sorted(totals, key=totals.get, reverse=True)[:GENRE_MIX_TOP]
+
+        per_month: Dict[date, Dict[str, int]] = {month: defaultdict(int) for month in months}
+        for month, name, minutes in rows:
+            if month in per_month:
+                per_month[month][name if name in top else "Other"] += minutes
+
+        genres = top + (["Other"] if len(totals) > len(top) else [])
+        return {
+            "genres": genres,
+            "months": [
+                {
+                    "month": month,
+                    "shares": [
+                        (name, round(100 * per_month[month][name] / (sum(per_month[month].values()) or 1), 1))
+                        for name in genres
+                    ],
+                }
+                for month in months
+            ],
+        }
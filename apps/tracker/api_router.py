@@ -0,0 +1,183 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Literal, Optional, Set, Tuple
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from apps.auth.deps import require_api_user
+from apps.auth.models import User
+from apps.tracker.services import TrackerService
+from apps.tracker.router import get_service
+
+# JSON surface over TrackerService for the mobile wrapper and scripts.
+# Every read endpoint accepts fields=a,b,c so clients only pull what they render.
+router = APIRouter(prefix="/api/v1", tags=["api"], default_response_class=ORJSONResponse)
+
+LIBRARY_FIELDS = {
+    "id", "tmdb_id", "media_type", "title", "poster_path", "genres", "origin_country", "runtime",
+    "number_of_episodes", "number_of_seasons", "cast", "status", "rating", "comment",
+    "episodes_watched", "created_at", "updated_at",
+}
+STATS_FIELDS = {
+    "total_titles", "movies_watched", "series_finished", "total_minutes", "total_hours", "total_days",
+}
+EPISODE_FIELDS = {
+    "episode_number", "name", "air_date", "runtime", "still_path", "vote_average",
+    "watched", "status", "rating", "comment",
+}
+
+PERSON_FIELDS = {
+    "tmdb_id", "media_type", "title", "poster_path", "release_year", "character", "status", "rating",
+}
+
+class EpisodeAction(BaseModel):
+    action: Literal["watched", "watching", "skipped", "unwatch", "rate", "comment"]
+    rating: Optional[float] = None
+    comment: Optional[str] = None
+
+def parse_fields(fields: Optional[str], allowed: Set[str]) -> Optional[Set[str]]:
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - allowed
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+def project(item: Dict[str, Any], fields: Optional[Set[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return item
+    return {key: value for key, value in item.items() if key in fields}
+
+def project_all(items: Iterable[Dict[str, Any]], fields: Optional[Set[str]]) -> List[Dict[str, Any]]:
+    return [project(item, fields) for item in items]
+
+def encode_cursor(cursor: Optional[Tuple[datetime, int]]) -> Optional[str]:
+    if not cursor:
+        return None
+    updated_at, row_id = cursor
+    return base64.urlsafe_b64encode(orjson.dumps([updated_at.isoformat(), row_id])).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, row_id = orjson.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(updated_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/library")
+def library(
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    media_type: Optional[Literal["movie", "tv"]] = None,
+    status: Optional[str] = None,
+    user: User = Depends(require_api_user),
+    service: TrackerService = Depends(get_service)
+):
+    selected = parse_fields(fields, LIBRARY_FIELDS)
+    page = service.get_library_page(user.id, limit, decode_cursor(cursor), media_type, status)
+    return {
+        "items": project_all(page["items"], selected),
+        "next_cursor": encode_cursor(page["next_cursor"])
+    }
+
+@router.get("/stats")
+def stats(
+    fields: Optional[str] = None,
+    media_type: Optional[Literal["movie", "tv"]] = None,
+    user: User = Depends(require_api_user),
+    service: TrackerService = Depends(get_service)
+):
+    selected = parse_fields(fields, STATS_FIELDS)
+    dashboard = service.get_dashboard_stats(user.id, media_type_filter=media_type, include_facets=False)
+    return project({key: dashboard[key] for key in STATS_FIELDS}, selected)
+
+@router.get("/people/{person_tmdb_id}/library")
+def person_library(
+    person_tmdb_id: int,
+    fields: Optional[str] = None,
+    user: User = Depends(require_api_user),
+    service: TrackerService = Depends(get_service)
+):
+    selected = parse_fields(fields, PERSON_FIELDS)
+    context = service.get_person_library(user.id, person_tmdb_id)
+    person = context["person"]
+    return {
+        "tmdb_id": person_tmdb_id,
+        "name": person.name if person else None,
+        "profile_path": person.profile_path if person else None,
+        "items": project_all(context["items"], selected)
+    }
+
+def serialize_episode(episode: Dict[str, Any]) -> Dict[str, Any]:
+    tmdb = episode["tmdb"]
+    activity = episode["user_activity"]
+    return {
+        "episode_number": tmdb.get("episode_number"),
+        "name": tmdb.get("name"),
+        "air_date": tmdb.get("air_date"),
+        "runtime": tmdb.get("runtime"),
+        "still_path": tmdb.get("still_path"),
+        "vote_average": tmdb.get("vote_average"),
+        "watched": activity["watched"],
+        "status": activity["status"],
+        "rating": activity["rating"],
+        "comment": activity["comment"],
+    }
+
+@router.get("/series/{tmdb_id}/seasons/{season_number}")
+async def season_progress(
+    tmdb_id: int,
+    season_number: int,
+    fields: Optional[str] = None,
+    user: User = Depends(require_api_user),
+    service: TrackerService = Depends(get_service)
+):
+    selected = parse_fields(fields, EPISODE_FIELDS)
+    try:
+        context = await service.get_season_context(user.id, tmdb_id, season_number)
+    finally:
+        await service.tmdb.close()
+
+    episodes = [serialize_episode(episode) for episode in context["episodes"]]
+    return {
+        "tmdb_id": tmdb_id,
+        "season_number": season_number,
+        "name": context["season_data"].get("name"),
+        "episodes_total": len(episodes),
+        "episodes_watched": sum(1 for episode in episodes if episode["watched"]),
+        "episodes": project_all(episodes, selected)
+    }
+
+@router.post("/series/{tmdb_id}/seasons/{season_number}/episodes/{episode_number}")
+async def update_episode(
+    tmdb_id: int,
+    season_number: int,
+    episode_number: int,
+    payload: EpisodeAction,
+    user: User = Depends(require_api_user),
+    service: TrackerService = Depends(get_service)
+):
+    if payload.action == "rate" and payload.rating is None:
+        raise HTTPException(status_code=422, detail="rating is required for action 'rate'")
+
+    activity = await run_in_threadpool(
+        service.update_episode_activity,
+        user.id, tmdb_id, season_number, episode_number, payload.action, payload.rating, payload.comment
+    )
+    return {
+        "tmdb_id": tmdb_id,
+        "season_number": season_number,
+        "episode_number": episode_number,
+        "watched": bool(activity and activity.status == "watched"),
+        "status": activity.status if activity else None,
+        "rating": activity.rating if activity else None,
+        "comment": activity.comment if activity else None,
+        "watched_at": activity.watched_at if activity else None,
+    }
@@ -0,0 +1,154 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+from apps.core.base_service import BaseService
+from apps.core.leases import LeaseLost, holds_lease
+from apps.tracker.models import Media, ChangesCheckpoint, ChangesRetry
+from apps.tracker.services import TrackerService
+
+# TMDB serves at most 14 days per changes request and keeps no history beyond that
+CHANGES_WINDOW_DAYS = 14
+
+# SQLite bound-parameter budget per IN (...) lookup
+LOOKUP_CHUNK = 500
+
+# Failed re-fetches are retried this many cycles (hours, by default) before the title is left to the next change
+CHANGES_MAX_ATTEMPTS = 10
+
+# (Media.id, tmdb_id, details payload or None when TMDB no longer has the title)
+TitleRefresh = Tuple[int, int, Optional[Dict[str, Any]]]
+
+class ChangesService(BaseService):
+
+    def get_window(self, media_type: str, today: Optional[date] = None) -> Optional[Tuple[date, date, int]]:
+        """
+        (start_date, end_date, page) the refresher should read next, or None when caught up. Only complete days
+        are read (up to yesterday), so each day of changes is processed once. A first run starts at yesterday;
+        a checkpoint older than TMDB's history restarts at the oldest day still available.
+        """
+        today = today or datetime.utcnow().date()
+        yesterday = today - timedelta(days=1)
+        oldest = today - timedelta(days=CHANGES_WINDOW_DAYS)
+        checkpoint = self.session.get(ChangesCheckpoint, media_type)
+        if checkpoint is None:
+            return (yesterday, yesterday, 1)
+
+        start, end, page = checkpoint.start_date, checkpoint.end_date, checkpoint.page
+        if start < oldest:
+            print(f"[WARN] {media_type} changes checkpoint {start} is past TMDB's history; resuming from {oldest}")
+            start, page = oldest, 1
+        if page == 1:
+            end = min(start + timedelta(days=CHANGES_WINDOW_DAYS - 1), yesterday)
+        if start > end:
+            return None
+        return (start, end, page)
+
+    def changed_media(self, media_type: str, tmdb_ids: Sequence[int]) -> List[Tuple[int, int]]:
+        """
+        (Media.id, tmdb_id) of the changed titles we have cached, via the (tmdb_id, media_type) index.
+        """
+        tmdb_ids = list(dict.fromkeys(tmdb_ids))
+        matched: List[Tuple[int, int]] = []
+        for start in range(0, len(tmdb_ids), LOOKUP_CHUNK):
+            matched += self.session.exec(
+                select(Media.id, Media.tmdb_id).where(
+                    Media.tmdb_id.in_(tmdb_ids[start:start + LOOKUP_CHUNK]), Media.media_type == media_type
+                )
+            ).all()
+        return [tuple(row) for row in matched]
+
+    def pending_retries(self, media_type: str, limit: int) -> List[Tuple[int, int]]:
+        """
+        (Media.id, tmdb_id) of titles whose re-fetch failed on an earlier cycle, oldest failure first.
+        """
+        rows = self.session.exec(
+            select(Media.id, Media.tmdb_id).join(
+                ChangesRetry, (ChangesRetry.tmdb_id == Media.tmdb_id) & (ChangesRetry.media_type == Media.media_type)
+            ).where(ChangesRetry.media_type == media_type).order_by(ChangesRetry.failed_at).limit(limit)
+        ).all()
+        return [tuple(row) for row in rows]
+
+    def _store_titles(self, media_type: str, refreshes: Sequence[TitleRefresh], failed: Sequence[int]) -> int:
+        """
+        Writes re-fetched titles, clears their retries and records the failed ones. The caller commits.
+        """
+        tracker = TrackerService(self.session)
+        changed = 0
+        for media_id, _, details in refreshes:
+            media = self.session.get(Media, media_id)
+            if media is None:
+                continue
+            if details is None:
+                media.refreshed_at = datetime.utcnow()
+                self.session.add(media)
+            elif tracker.refresh_media(media, details):
+                changed += 1
+
+        refreshed = [tmdb_id for _, tmdb_id, _ in refreshes]
+        for start in range(0, len(refreshed), LOOKUP_CHUNK):
+            self.session.exec(delete(ChangesRetry).where(
+                ChangesRetry.media_type == media_type, ChangesRetry.tmdb_id.in_(refreshed[start:start + LOOKUP_CHUNK])
+            ))
+        if failed:
+            now = datetime.utcnow()
+            statement = sqlite_insert(ChangesRetry).values([
+                {"media_type": media_type, "tmdb_id": tmdb_id, "attempts": 1, "failed_at": now} for tmdb_id in failed
+            ])
+            self.session.exec(statement.on_conflict_do_update(
+                index_elements=["media_type", "tmdb_id"],
+                set_={"attempts": ChangesRetry.attempts + 1, "failed_at": now}
+            ))
+            abandoned = self.session.exec(delete(ChangesRetry).where(
+                ChangesRetry.media_type == media_type, ChangesRetry.attempts > CHANGES_MAX_ATTEMPTS
+            )).rowcount
+            if abandoned:
+                print(f"[WARN] Gave up re-fetching {abandoned} changed {media_type} titles after {CHANGES_MAX_ATTEMPTS} attempts")
+
+        if changed:
+            tracker.bump_catalog_version()
+        return changed
+
+    def _check_lease(self, lease: Optional[str]) -> None:
+        if lease and not holds_lease(self.session, lease):
+            raise LeaseLost(f"{lease} lease lost; not writing changes progress")
+
+    def store_retries(
+        self, media_type: str, refreshes: Sequence[TitleRefresh], failed: Sequence[int], lease: Optional[str] = None
+    ) -> int:
+        """
+        Writes retried titles without moving the checkpoint. Returns the number of Media rows changed.
+        """
+        self._check_lease(lease)
+        changed = self._store_titles(media_type, refreshes, failed)
+        self.session.commit()
+        return changed
+
+    def store_page(
+        self, media_type: str, refreshes: Sequence[TitleRefresh], failed: Sequence[int],
+        window: Tuple[date, date, int], done: bool, lease: Optional[str] = None
+    ) -> int:
+        """
+        Writes one page of re-fetched titles, queues the `failed` tmdb_ids for retry and advances the checkpoint,
+        all in the same transaction. With `lease`, refuses to write unless this worker still holds it, so a
+        worker that lost the lease can't move the checkpoint under the new holder.
+        Returns the number of titles whose Media row changed.
+        """
+        self._check_lease(lease)
+        changed = self._store_titles(media_type, refreshes, failed)
+
+        start, end, page = window
+        checkpoint = self.session.get(ChangesCheckpoint, media_type) or ChangesCheckpoint(
+            media_type=media_type, start_date=start, end_date=end
+        )
+        if done:
+            # Next window starts the day after this one; its end is decided when it is read
+            checkpoint.start_date = checkpoint.end_date = end + timedelta(days=1)
+            checkpoint.page = 1
+        else:
+            checkpoint.start_date, checkpoint.end_date, checkpoint.page = start, end, page + 1
+        checkpoint.updated_at = datetime.utcnow()
+        self.session.add(checkpoint)
+        self.session.commit()
+        return changed
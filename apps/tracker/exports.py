@@ -0,0 +1,152 @@
+import csv
+import io
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Tuple
+import orjson
+from sqlalchemy import null, literal
+from sqlmodel import Session, select
+from apps.tracker.models import Media, UserMedia, EpisodeActivity
+from database import engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Optional: only CSV and JSON Lines exports without it
+    pa = None
+    pq = None
+
+# One row per library entry ("title") followed by one row per episode activity ("episode").
+# Rows are read in EXPORT_BATCH_SIZE keyset pages and written out as they arrive, so memory use does not
+# depend on the size of the history and no read transaction stays open while the client downloads.
+EXPORT_COLUMNS = [
+    "kind", "media_type", "tmdb_id", "title", "release_year", "status", "rating", "comment",
+    "season_number", "episode_number", "watched_at", "created_at", "updated_at",
+]
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+ARROW_FORMATS = {"parquet", "arrow"}
+
+def available_formats() -> List[str]:
+    return [fmt for fmt in EXPORT_FORMATS if pa is not None or fmt not in ARROW_FORMATS]
+
+def iter_history_batches(user_id: int, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Yields the user's history as lists of EXPORT_COLUMNS tuples. Each batch is a keyset page read in its own
+    short session, closed before the batch is yielded: the download waits on the client, and an open read
+    transaction would hold SQLite's shared lock and block every writer until the export finished.
+    """
+    library = select(
+        UserMedia.id, literal("title"), Media.media_type, Media.tmdb_id, Media.title, Media.release_year,
+        UserMedia.status, UserMedia.rating, UserMedia.comment,
+        null(), null(), null(), UserMedia.created_at, UserMedia.updated_at
+    ).join(Media, Media.id == UserMedia.media_id).where(
+        UserMedia.user_id == user_id
+    )
+
+    episodes = select(
+        EpisodeActivity.id, literal("episode"), Media.media_type, Media.tmdb_id, Media.title, Media.release_year,
+        EpisodeActivity.status, EpisodeActivity.rating, EpisodeActivity.comment,
+        EpisodeActivity.season_number, EpisodeActivity.episode_number, EpisodeActivity.watched_at, null(), null()
+    ).join(UserMedia, UserMedia.id == EpisodeActivity.user_media_id).join(
+        Media, Media.id == UserMedia.media_id
+    ).where(
+        UserMedia.user_id == user_id
+    )
+
+    for query, id_column in ((library, UserMedia.id), (episodes, EpisodeActivity.id)):
+        last_id = 0
+        while True:
+            with Session(engine) as session:
+                rows = session.exec(query.where(id_column > last_id).order_by(id_column).limit(batch_size)).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield [tuple(row)[1:] for row in rows]
+            if len(rows) < batch_size:
+                break
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def _text_row(row: Tuple[Any, ...]) -> List[Any]:
+    return [_isoformat(value) if isinstance(value, datetime) else value for value in row]
+
+def stream_csv(user_id: int) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in iter_history_batches(user_id):
+        writer.writerows(_text_row(row) for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def stream_jsonl(user_id: int) -> Iterator[bytes]:
+    for batch in iter_history_batches(user_id):
+        # orjson serializes datetimes as ISO 8601 itself
+        yield b"".join(orjson.dumps(dict(zip(EXPORT_COLUMNS, row))) + b"\n" for row in batch)
+
+class _DrainableSink(io.RawIOBase):
+    """
+    Write-only file object for pyarrow writers; the response drains what was written after every batch.
+    """
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def export_schema():
+    return pa.schema([
+        ("kind", pa.string()), ("media_type", pa.string()), ("tmdb_id", pa.int64()), ("title", pa.string()),
+        ("release_year", pa.int32()), ("status", pa.string()), ("rating", pa.float64()), ("comment", pa.string()),
+        ("season_number", pa.int32()), ("episode_number", pa.int32()), ("watched_at", pa.timestamp("us")),
+        ("created_at", pa.timestamp("us")), ("updated_at", pa.timestamp("us")),
+    ])
+
+def stream_arrow(user_id: int, fmt: str) -> Iterator[bytes]:
+    """
+    Parquet (one row group per batch) or an Arrow IPC stream. Each batch is encoded and sent before the next is read.
+    """
+    schema = export_schema()
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd") if fmt == "parquet" else pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in iter_history_batches(user_id):
+            columns = list(zip(*batch))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def stream_export(user_id: int, fmt: str) -> Iterator:
+    if fmt == "csv":
+        return stream_csv(user_id)
+    if fmt == "jsonl":
+        return stream_jsonl(user_id)
+    return stream_arrow(user_id, fmt)
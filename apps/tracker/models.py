@@ -1,9 +1,15 @@
-from typing import Optional, List
-from datetime import datetime
-from sqlmodel import SQLModel, Field, Relationship, UniqueConstraint
+from typing import Optional, List, NamedTuple
+from datetime import datetime, date
+from sqlmodel import SQLModel, Field, Relationship, UniqueConstraint, Index
 from apps.auth.models import User
 
 class Media(SQLModel, table=True):
+    __table_args__ = (
+        # Composite lookup used by every (tmdb_id, media_type) resolution and the batched badge query
+        Index("ix_media_tmdb_id_media_type", "tmdb_id", "media_type"),
+        # Airing refresher: the still-running shows, without scanning the whole catalog
+        Index("ix_media_media_type_tmdb_status", "media_type", "tmdb_status"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tmdb_id: int = Field(index=True) # Not unique globally because ID collision might happen between movie/tv, though unlikely. Safe to keep index. But actually TMDB IDs are unique per type.
     media_type: str = Field(index=True) # 'movie' or 'tv'
@@ -17,12 +23,25 @@ class Media(SQLModel, table=True):
     number_of_episodes: Optional[int] = None # (TV)
     number_of_seasons: Optional[int] = None # (TV)
     cast: Optional[str] = None # Comma-separated list of main actors
+    release_year: Optional[int] = Field(default=None, index=True) # From release_date / first_air_date
+
+    # Airing state (TV), kept current by the airing refresher
+    tmdb_status: Optional[str] = None # TMDB status: 'Returning Series', 'Ended', 'Canceled', ...
+    next_episode_air_date: Optional[date] = None
+    refreshed_at: Optional[datetime] = None # Last time the row was re-read from TMDB
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     user_medias: List["UserMedia"] = Relationship(back_populates="media")
 
 class UserMedia(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_usermedia_user_id_media_id", "user_id", "media_id"),
+        # Keyset pagination over a user's library, most recently updated first
+        Index("ix_usermedia_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        # Rating range filter on the dashboard
+        Index("ix_usermedia_user_id_rating", "user_id", "rating"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id", index=True)
     media_id: int = Field(foreign_key="media.id", index=True)
@@ -30,6 +49,7 @@ class UserMedia(SQLModel, table=True):
     status: str = Field(default="watching") # watching, awaiting_episodes, finished, abandoned, watched
     rating: Optional[float] = None # 0-10
     comment: Optional[str] = None
+    watched_at: Optional[datetime] = None # When a movie became watched; rating/comment edits keep it (NULL on older rows: updated_at)
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -41,9 +61,15 @@ class UserMedia(SQLModel, table=True):
 class EpisodeActivity(SQLModel, table=True):
     __table_args__ = (
         UniqueConstraint("user_media_id", "season_number", "episode_number", name="unique_episode_activity"),
+        # Covering index for the history timeline: keyset scan by (watched_at, id) without touching the table
+        Index(
+            "ix_episodeactivity_user_id_watched_at_id", "user_id", "watched_at", "id",
+            "status", "user_media_id", "season_number", "episode_number"
+        ),
     )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_media_id: int = Field(foreign_key="usermedia.id", index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id") # Denormalized from UserMedia for the timeline index
     
     season_number: int
     episode_number: int
@@ -54,3 +80,170 @@ class EpisodeActivity(SQLModel, table=True):
     watched_at: datetime = Field(default_factory=datetime.utcnow)
 
     user_media: Optional[UserMedia] = Relationship(back_populates="episode_activities")
+
+class CatalogEpisode(SQLModel, table=True):
+    """
+    Local copy of TMDB's season/episode listing, filled from every season payload the app fetches.
+    Lets "what's next" questions be answered in SQL instead of per-show TMDB calls.
+    """
+    media_id: int = Field(foreign_key="media.id", primary_key=True)
+    season_number: int = Field(primary_key=True)
+    episode_number: int = Field(primary_key=True)
+    name: Optional[str] = None
+    air_date: Optional[date] = None
+    runtime: Optional[int] = None
+    still_path: Optional[str] = None
+
+class UpcomingEpisode(SQLModel, table=True):
+    """
+    Announced episodes of tracked shows, from shortly before today onward. Rewritten per show by the
+    airing refresher; small enough that the calendar is a range scan on air_date.
+    """
+    __table_args__ = (
+        Index("ix_upcomingepisode_air_date_media_id", "air_date", "media_id"),
+    )
+    media_id: int = Field(foreign_key="media.id", primary_key=True)
+    season_number: int = Field(primary_key=True)
+    episode_number: int = Field(primary_key=True)
+    name: Optional[str] = None
+    air_date: date
+    still_path: Optional[str] = None
+
+class ChangesCheckpoint(SQLModel, table=True):
+    """
+    Progress of the TMDB changes-feed refresher per media type: the window of days being read and the next
+    page. Saved in the same transaction as each page's updates, so a restart resumes where it stopped.
+    """
+    media_type: str = Field(primary_key=True)
+    start_date: date
+    end_date: date
+    page: int = 1
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ChangesRetry(SQLModel, table=True):
+    """
+    Changed titles whose re-fetch failed. The checkpoint moves past their page anyway, so they are kept
+    here and retried at the start of the next cycles.
+    """
+    media_type: str = Field(primary_key=True)
+    tmdb_id: int = Field(primary_key=True)
+    attempts: int = 1
+    failed_at: datetime = Field(default_factory=datetime.utcnow)
+
+# --- Facets ---
+# Normalized copies of Media.genres / origin_country so the dashboard can filter and count with indexes
+# instead of LIKE scans. The denormalized string columns stay for display.
+
+class Genre(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(unique=True, index=True)
+
+class MediaGenre(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_mediagenre_genre_id_media_id", "genre_id", "media_id"),
+    )
+    media_id: int = Field(foreign_key="media.id", primary_key=True)
+    genre_id: int = Field(foreign_key="genre.id", primary_key=True)
+
+class Country(SQLModel, table=True):
+    code: str = Field(primary_key=True) # ISO 3166-1 alpha-2, as TMDB returns it
+
+class MediaCountry(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_mediacountry_country_code_media_id", "country_code", "media_id"),
+    )
+    media_id: int = Field(foreign_key="media.id", primary_key=True)
+    country_code: str = Field(foreign_key="country.code", primary_key=True)
+
+class Keyword(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tmdb_id: int = Field(unique=True, index=True)
+    name: str
+
+class MediaKeyword(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_mediakeyword_keyword_id_media_id", "keyword_id", "media_id"),
+    )
+    media_id: int = Field(foreign_key="media.id", primary_key=True)
+    keyword_id: int = Field(foreign_key="keyword.id", primary_key=True)
+
+# --- People ---
+
+class Person(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tmdb_id: int = Field(unique=True, index=True)
+    name: str
+    profile_path: Optional[str] = None
+
+class MediaCredit(SQLModel, table=True):
+    """
+    Cast membership from the TMDB credits payload (top CREDITS_PER_TITLE billed only).
+    """
+    __table_args__ = (
+        # "Titles with this person" lookups
+        Index("ix_mediacredit_person_id_media_id", "person_id", "media_id"),
+    )
+    media_id: int = Field(foreign_key="media.id", primary_key=True)
+    person_id: int = Field(foreign_key="person.id", primary_key=True)
+    character: Optional[str] = None
+    billing_order: int = 0
+
+# --- Activity aggregates ---
+# Pre-aggregated watch activity for the analytics page, kept in step with EpisodeActivity/UserMedia by the
+# write paths through ActivityLedger (apps/tracker/analytics.py). scripts/backfill_activity.py rebuilds them.
+
+class ActivityDay(SQLModel, table=True):
+    """
+    Watched episodes/movies and estimated watch minutes per user per (UTC) day.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    episodes: int = 0
+    movies: int = 0
+    minutes: int = 0
+
+class ActivityGenreMonth(SQLModel, table=True):
+    """
+    Watch minutes per user, month (first day of the month) and genre, for the genre mix over time.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    month: date = Field(primary_key=True)
+    genre_id: int = Field(foreign_key="genre.id", primary_key=True)
+    minutes: int = 0
+
+class DataVersion(SQLModel, table=True):
+    """
+    Monotonic change counters used for cache validation (ETags, fragment caches).
+    Keys: "user:{id}" (bumped by every tracker write for that user) and "catalog" (bumped by metadata refreshes).
+    """
+    key: str = Field(primary_key=True)
+    version: int = Field(default=0)
+
+class TrendingSnapshot(SQLModel, table=True):
+    """
+    Last good TMDB trending page per window. Written by the background worker, read by every worker.
+    """
+    media_type: str = Field(primary_key=True)
+    time_window: str = Field(primary_key=True)
+    results: str # JSON list of TMDB results
+    version: int = Field(default=1) # Bumped on every refresh; keys the rendered fragment
+    fetched_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DashboardRow(NamedTuple):
+    """
+    Projected (non-ORM) row for the dashboard listing: just the columns the template renders.
+    """
+    user_media_id: int
+    tmdb_id: int
+    media_type: str
+    title: str
+    poster_path: Optional[str]
+    genres: Optional[str]
+    origin_country: Optional[str]
+    runtime: Optional[int]
+    number_of_episodes: Optional[int]
+    number_of_seasons: Optional[int]
+    cast: Optional[str]
+    status: str
+    rating: Optional[float]
+    updated_at: datetime
@@ -1,16 +1,27 @@
 from fastapi import APIRouter, Depends, Request, Form, BackgroundTasks, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from typing import Any, Dict, Optional
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from apps.core.templating import templates
 from apps.core.tmdb import TMDBService
-from apps.tracker.services import TrackerService
+from apps.tracker.services import TrackerService, HISTORY_KIND_RANKS
+from apps.tracker.exports import EXPORT_FORMATS, available_formats, stream_export
+from apps.tracker.analytics import AnalyticsService
+from apps.tracker.airing import AiringService, UPCOMING_KEEP_DAYS
 from database import get_session
 from sqlmodel import Session
-from apps.auth.deps import get_current_user, require_user
+from apps.auth.deps import get_current_user, require_user, get_user_claim, require_user_claim, UserClaim
 from apps.auth.models import User
+from apps.core.cache import TTLCache
+from apps.core.conditional import make_etag, is_not_modified, not_modified, with_etag
+from apps.tracker.tasks import (
+    TRENDING_WINDOWS, get_trending_snapshot, get_search_page, prefetch_search_page
+)
 import json
+import re
+import uuid
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/tracker", tags=["tracker"])
-templates = Jinja2Templates(directory="templates")
 
 async def run_sync_task(user_id: int, tmdb_id: int, status: str, rating: float = None):
     """
@@ -34,52 +45,168 @@ async def run_sync_task(user_id: int, tmdb_id: int, status: str, rating: float =
 def get_service(session: Session = Depends(get_session)) -> TrackerService:
     return TrackerService(session)
 
+def _parse_number(value: Optional[str], kind=float):
+    try:
+        return kind(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+def get_library_filters(
+    genre: Optional[str] = None,
+    country: Optional[str] = None,
+    year: Optional[str] = None,
+    min_rating: Optional[str] = None,
+    max_rating: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Dashboard filter query params. Taken as strings so the filter form's empty "Any" options are simply ignored.
+    """
+    filters = {
+        "genre": genre or None,
+        "country": (country or "").upper() or None,
+        "year": _parse_number(year, int),
+        "min_rating": _parse_number(min_rating),
+        "max_rating": _parse_number(max_rating),
+    }
+    return {key: value for key, value in filters.items() if value is not None}
+
+def render_dashboard(request: Request, user: User, service: TrackerService, media_type_filter: str = None,
+                     page_title: str = "All Activity", filters: Optional[Dict[str, Any]] = None):
+    # Answer revalidations from the version counters before running any dashboard queries
+    etag = make_etag(
+        "dashboard", media_type_filter, sorted((filters or {}).items()), user.id,
+        service.get_user_version(user.id), service.get_catalog_version(), service.get_version("episodes"),
+        datetime.utcnow().date().isoformat() # Episodes airing today join the continue-watching rail
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    stats = service.get_dashboard_stats(user.id, media_type_filter=media_type_filter, filters=filters)
+    show_rail = media_type_filter != "movie" and not filters
+    response = templates.TemplateResponse("tracker/dashboard.html", {
+        "request": request, 
+        "stats": stats,
+        "user": user,
+        "page_title": page_title,
+        "continue_watching": service.get_continue_watching(user.id) if show_rail else []
+    })
+    return with_etag(response, etag)
+
 @router.get("/", response_class=HTMLResponse)
 def dashboard(
     request: Request,
     user: User = Depends(require_user),
-    service: TrackerService = Depends(get_service)
+    service: TrackerService = Depends(get_service),
+    filters: Dict[str, Any] = Depends(get_library_filters)
 ):
     try:
-        stats = service.get_dashboard_stats(user.id)
-        return templates.TemplateResponse("tracker/dashboard.html", {
-            "request": request, 
-            "stats": stats,
-            "user": user,
-            "page_title": "All Activity"
-        })
+        return render_dashboard(request, user, service, filters=filters)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return f"Error: {e}"
 
-@router.get("/movies", response_class=HTMLResponse)
 @router.get("/movies", response_class=HTMLResponse)
 def dashboard_movies(
     request: Request,
     user: User = Depends(require_user),
-    service: TrackerService = Depends(get_service)
+    service: TrackerService = Depends(get_service),
+    filters: Dict[str, Any] = Depends(get_library_filters)
 ):
-    stats = service.get_dashboard_stats(user.id, media_type_filter="movie")
-    return templates.TemplateResponse("tracker/dashboard.html", {
-        "request": request, 
-        "stats": stats,
-        "user": user,
-        "page_title": "Movies"
-    })
+    return render_dashboard(request, user, service, media_type_filter="movie", page_title="Movies", filters=filters)
 
 @router.get("/tv", response_class=HTMLResponse)
 def dashboard_tv(
+    request: Request,
+    user: User = Depends(require_user),
+    service: TrackerService = Depends(get_service),
+    filters: Dict[str, Any] = Depends(get_library_filters)
+):
+    return render_dashboard(request, user, service, media_type_filter="tv", page_title="TV Shows", filters=filters)
+
+@router.get("/analytics", response_class=HTMLResponse)
+def analytics(
     request: Request,
     user: User = Depends(require_user),
     service: TrackerService = Depends(get_service)
 ):
-    stats = service.get_dashboard_stats(user.id, media_type_filter="tv")
-    return templates.TemplateResponse("tracker/dashboard.html", {
-        "request": request, 
-        "stats": stats,
+    """
+    Watch-time charts, streaks and genre mix, read from the pre-aggregated daily buckets.
+    """
+    today = datetime.utcnow().date()
+    etag = make_etag(
+        "analytics", user.id, service.get_user_version(user.id), service.get_catalog_version(), today.isoformat()
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    summary = AnalyticsService(service.session).get_summary(user.id, today=today)
+    response = templates.TemplateResponse("tracker/analytics.html", {
+        "request": request,
         "user": user,
-        "page_title": "TV Shows"
+        "summary": summary
+    })
+    return with_etag(response, etag)
+
+CALENDAR_DAYS_AHEAD = 60
+
+@router.get("/calendar", response_class=HTMLResponse)
+def calendar(
+    request: Request,
+    user: UserClaim = Depends(require_user_claim),
+    service: TrackerService = Depends(get_service)
+):
+    """
+    Upcoming (and last week's) episodes of the user's shows, read from the table the airing refresher maintains.
+    """
+    today = datetime.utcnow().date()
+    etag = make_etag(
+        "calendar", user.id, service.get_user_version(user.id), service.get_catalog_version(),
+        service.get_version("episodes"), today.isoformat()
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    episodes = AiringService(service.session).get_calendar(
+        user.id, today - timedelta(days=UPCOMING_KEEP_DAYS), today + timedelta(days=CALENDAR_DAYS_AHEAD)
+    )
+    days = {}
+    for episode in episodes:
+        days.setdefault(episode["air_date"], []).append(episode)
+
+    response = templates.TemplateResponse("tracker/calendar.html", {
+        "request": request,
+        "days": days,
+        "today": today
+    })
+    return with_etag(response, etag)
+
+HISTORY_PAGE_SIZE = 50
+
+@router.get("/history", response_class=HTMLResponse)
+def history(
+    request: Request,
+    before: Optional[datetime] = None,
+    before_kind: Optional[str] = None,
+    before_id: Optional[int] = None,
+    user: UserClaim = Depends(require_user_claim),
+    service: TrackerService = Depends(get_service)
+):
+    """
+    Watch history timeline. The first request renders the page; infinite scroll then asks for the events
+    before the last one shown (before/before_kind/before_id) and gets just the next chunk of the list.
+    """
+    cursor = None
+    if before is not None and before_kind in HISTORY_KIND_RANKS and before_id is not None:
+        cursor = (before, before_kind, before_id)
+
+    page = service.get_history_page(user.id, HISTORY_PAGE_SIZE, cursor)
+    template = "tracker/partials_history_page.html" if cursor else "tracker/history.html"
+    return templates.TemplateResponse(template, {
+        "request": request,
+        "items": page["items"],
+        "next_cursor": page["next_cursor"],
+        "previous_day": cursor[0].date() if cursor else None
     })
 
 @router.get("/search", response_class=HTMLResponse)
@@ -87,26 +214,98 @@ async def search_page(request: Request):
     return templates.TemplateResponse("tracker/search.html", {"request": request})
 
 @router.get("/search/results", response_class=HTMLResponse)
-async def search_results(request: Request, q: str):
+async def search_results(
+    request: Request,
+    q: str,
+    page: int = 1,
+    tracker: TrackerService = Depends(get_service)
+):
     if not q:
         return ""
-        
-    print(f"DEBUG: Search query received: '{q}'")
-    service = TMDBService()
+
+    page = max(page, 1)
+    total_pages = 1
     try:
-        data = await service.search_multi(q)
-        # print(f"DEBUG: Raw TMDB Response: {data}")
-        results = data.get("results", [])
-        print(f"DEBUG: Found {len(results)} results for '{q}'")
+        data = await get_search_page(q, page)
+        # Copy results: cached pages are shared between users and we annotate them per user below
+        results = [dict(item) for item in data.get("results", [])]
+        total_pages = data.get("total_pages") or 1
     except Exception as e:
-        print(f"Search Error: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"[ERROR] Search failed (page {page}): {e}")
         results = []
-    finally:
-        await service.close()
+
+    # Warm page N+1 so the next infinite-scroll request is served from the cache. The budget is keyed on a
+    # random id in the signed session cookie (client addresses can be forged through X-Forwarded-For); a
+    # client that doesn't send the cookie back never gets past the first request, so it never prefetches.
+    search_id = request.session.get('search_id')
+    if search_id is None:
+        request.session['search_id'] = uuid.uuid4().hex
+    elif results:
+        prefetch_search_page(search_id, q, page + 1, total_pages)
+
+    # One batched lookup for "already in your list" badges instead of one per result
+    tracker.annotate_library_status(request.session.get('user_id'), results)
         
-    return templates.TemplateResponse("tracker/partials_search_results.html", {"request": request, "results": results})
+    return templates.TemplateResponse("tracker/partials_search_results.html", {
+        "request": request,
+        "results": results,
+        "q": q,
+        "page": page,
+        "total_pages": total_pages
+    })
+
+# --- Discover (Trending) ---
+
+# Rendered trending grids keyed by (media_type, time_window, snapshot version).
+# Badges are left as markers in the cached HTML and filled per user at request time.
+trending_fragment_cache = TTLCache(ttl=None, maxsize=len(TRENDING_WINDOWS) * 2)
+LIBRARY_MARKER = re.compile(r"<!--library:(movie|tv):(\d+)-->")
+
+def fill_library_badges(html: str, badges: dict) -> str:
+    badge_template = templates.env.get_template("tracker/partials_library_badge.html")
+
+    def replace(match):
+        library = badges.get((int(match.group(2)), match.group(1)))
+        return badge_template.render(library=library) if library else ""
+
+    return LIBRARY_MARKER.sub(replace, html)
+
+@router.get("/discover", response_class=HTMLResponse)
+async def discover_page(request: Request):
+    return templates.TemplateResponse("tracker/discover.html", {
+        "request": request,
+        "windows": TRENDING_WINDOWS
+    })
+
+@router.get("/discover/{media_type}/{time_window}", response_class=HTMLResponse)
+def discover_results(
+    request: Request,
+    media_type: str,
+    time_window: str,
+    tracker: TrackerService = Depends(get_service)
+):
+    if (media_type, time_window) not in TRENDING_WINDOWS:
+        return Response(status_code=404)
+
+    # Served only from the warmed cache; the background refresher is the only TMDB caller
+    snapshot = get_trending_snapshot(media_type, time_window)
+    if not snapshot:
+        return templates.TemplateResponse("tracker/partials_discover_warming.html", {"request": request})
+
+    fragment_key = (media_type, time_window, snapshot["version"])
+    html = trending_fragment_cache.get(fragment_key)
+    if html is None:
+        html = templates.env.get_template("tracker/partials_search_results.html").render(
+            results=snapshot["results"],
+            badge_markers=True
+        )
+        trending_fragment_cache.set(fragment_key, html)
+
+    badges = tracker.get_library_badges(
+        request.session.get('user_id'),
+        [(item.get("id"), item.get("media_type")) for item in snapshot["results"]]
+    )
+    return HTMLResponse(fill_library_badges(html, badges))
 
 @router.get("/details/{media_type}/{tmdb_id}", response_class=HTMLResponse)
 async def media_details(
@@ -130,7 +329,8 @@ async def media_details(
             "user_rating": context_data.get('user_rating'), # Pass rating explicitly
             "user_comment": context_data.get('user_comment'), # Ensure comment is passed too
             "in_list": context_data['in_list'],
-            "series_stats": context_data.get('series_stats') # Ensure series stats are passed too just in case
+            "series_stats": context_data.get('series_stats'), # Ensure series stats are passed too just in case
+            "catalog_version": service.get_catalog_version() # Keys the cached cast grid
         })
     except Exception as e:
         print(f"Error loading details: {e}")
@@ -141,6 +341,25 @@ async def media_details(
             "tmdb_id": tmdb_id
         })
 
+@router.get("/person/{person_tmdb_id}", response_class=HTMLResponse)
+def person_library(
+    request: Request,
+    person_tmdb_id: int,
+    user: Optional[UserClaim] = Depends(get_user_claim),
+    service: TrackerService = Depends(get_service)
+):
+    """
+    Modal opened from a cast card: the titles in the user's library featuring this person.
+    """
+    context = service.get_person_library(user.id if user else None, person_tmdb_id)
+    return templates.TemplateResponse("tracker/partials_person_modal.html", {
+        "request": request,
+        "person": context["person"],
+        "items": context["items"],
+        "person_tmdb_id": person_tmdb_id,
+        "logged_in": user is not None
+    })
+
 @router.post("/add")
 async def add_media(
     request: Request,
@@ -228,7 +447,7 @@ async def submit_review(
     rating: float = Form(...),
     comment: str = Form(""),
     background_tasks: BackgroundTasks = None,
-    user: User = Depends(require_user),
+    user: UserClaim = Depends(require_user_claim),
     service: TrackerService = Depends(get_service)
 ):
     # We need to find the Media ID from TMDB ID
@@ -279,7 +498,7 @@ async def remove_media(
     request: Request,
     media_type: str,
     tmdb_id: int,
-    user: User = Depends(require_user),
+    user: UserClaim = Depends(require_user_claim),
     service: TrackerService = Depends(get_service)
 ):
     success = service.remove_user_media(user.id, tmdb_id, media_type)
@@ -306,15 +525,27 @@ async def get_season_episodes(
     service: TrackerService = Depends(get_service)
 ):
     user_id = request.session.get('user_id')
+
+    # Season content depends on the user's episode activity and the cached TMDB catalog
+    catalog_version = service.get_catalog_version()
+    etag = make_etag(
+        "season", tmdb_id, season_number, user_id,
+        service.get_user_version(user_id), catalog_version
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
     context = await service.get_season_context(user_id, tmdb_id, season_number)
     
-    return templates.TemplateResponse("tracker/partials_season_episodes.html", {
+    response = templates.TemplateResponse("tracker/partials_season_episodes.html", {
         "request": request,
         "tmdb_id": tmdb_id,
         "season_number": season_number, # Explicitly pass season_number
         "season": context['season_data'],
-        "episodes": context['episodes']
+        "episodes": context['episodes'],
+        "catalog_version": catalog_version
     })
+    return with_etag(response, etag)
 
 @router.post("/api/episode/{tmdb_id}/{season_number}/{episode_number}")
 async def update_episode_activity(
@@ -325,7 +556,7 @@ async def update_episode_activity(
     action: str = Form(...), # watch, unwatch, rate, comment
     rating: float = Form(None),
     comment: str = Form(None),
-    user: User = Depends(require_user),
+    user: UserClaim = Depends(require_user_claim),
     service: TrackerService = Depends(get_service)
 ):
     activity = service.update_episode_activity(
@@ -369,7 +600,8 @@ async def update_episode_activity(
         "request": request,
         "tmdb_id": tmdb_id,
         "season_number": season_number,
-        "episode": target_ep
+        "episode": target_ep,
+        "catalog_version": service.get_catalog_version()
     })
 
 @router.post("/api/season/{tmdb_id}/{season_number}/watch-all")
@@ -378,7 +610,7 @@ async def mark_season_watched(
     tmdb_id: int,
     season_number: int,
     background_tasks: BackgroundTasks,
-    user: User = Depends(require_user),
+    user: UserClaim = Depends(require_user_claim),
     service: TrackerService = Depends(get_service)
 ):
     try:
@@ -393,14 +625,15 @@ async def mark_season_watched(
         "tmdb_id": tmdb_id,
         "season_number": season_number,
         "season": context['season_data'],
-        "episodes": context['episodes']
+        "episodes": context['episodes'],
+        "catalog_version": service.get_catalog_version()
     })
 
 @router.post("/api/series/{tmdb_id}/watch-all")
 async def mark_series_watched(
     request: Request,
     tmdb_id: int,
-    user: User = Depends(require_user),
+    user: UserClaim = Depends(require_user_claim),
     service: TrackerService = Depends(get_service)
 ):
     try:
@@ -411,3 +644,18 @@ async def mark_series_watched(
     response = Response(status_code=200)
     response.headers['HX-Refresh'] = "true"
     return response
+
+@router.get("/export/{fmt}")
+def export_history(fmt: str, user: UserClaim = Depends(require_user_claim)):
+    """
+    Streams the user's whole history as a download; rows are encoded batch by batch while the cursor advances.
+    """
+    if fmt not in available_formats():
+        return Response(status_code=404)
+
+    media_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"tib-watch-history-{datetime.utcnow():%Y%m%d}.{extension}"
+    return StreamingResponse(stream_export(user.id, fmt), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store"
+    })
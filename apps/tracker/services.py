@@ -1,16 +1,279 @@
-from typing import Optional, Dict, Any
-from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime, date
+from sqlalchemy import tuple_, literal, delete, union_all, cast, String, exists, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session, select
-from apps.tracker.models import Media, UserMedia, EpisodeActivity
+from apps.tracker.models import (
+    Media, UserMedia, EpisodeActivity, DataVersion, DashboardRow, Genre, MediaGenre, Country, MediaCountry,
+    Person, MediaCredit, Keyword, MediaKeyword, CatalogEpisode
+)
 from apps.auth.models import User
+from apps.tracker.analytics import ActivityLedger, MOVIE_WATCHED_STATUSES, watch_time, stamp_watch_time
 from apps.core.tmdb import TMDBService
+from apps.core.templating import clear_fragment_cache
+from apps.core.cache import TTLCache
 from starlette.concurrency import run_in_threadpool
 
+# Billed cast stored per title; the details page shows the top 10
+CREDITS_PER_TITLE = 20
+
+# History timeline tie-break between events with the same timestamp (higher sorts first, like newer)
+HISTORY_KIND_RANKS = {"movie": 0, "episode": 1}
+
+HistoryCursor = Tuple[datetime, str, int] # (watched_at, kind, id) of the last event shown
+
+# (season, episode) folded into one sortable number for MAX()/comparisons in SQL
+EPISODE_KEY_SPAN = 10000
+
+# Continue-watching rails keyed by (user_id, user version, episode catalog version): any episode write or
+# catalog change produces a new key, so stale entries are never read and simply age out
+continue_watching_cache = TTLCache(ttl=3600, maxsize=5000)
+
 class TrackerService:
     def __init__(self, session: Session):
         self.session = session
         self.tmdb = TMDBService()
 
+    # --- Cache Versions ---
+
+    def get_version(self, key: str) -> int:
+        row = self.session.get(DataVersion, key)
+        return row.version if row else 0
+
+    def get_user_version(self, user_id: Optional[int]) -> int:
+        return self.get_version(f"user:{user_id}") if user_id else 0
+
+    def get_catalog_version(self) -> int:
+        return self.get_version("catalog")
+
+    def bump_version(self, key: str) -> None:
+        """
+        Increments a version counter inside the current transaction; the caller commits.
+        """
+        statement = sqlite_insert(DataVersion).values(key=key, version=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=["key"], set_={"version": DataVersion.version + 1}
+        )
+        self.session.exec(statement)
+
+    def bump_user_version(self, user_id: int) -> None:
+        self.bump_version(f"user:{user_id}")
+
+    def bump_catalog_version(self) -> None:
+        """
+        Invalidates catalog-derived caches: season ETags and cached fragments (other workers miss on the new version key).
+        """
+        self.bump_version("catalog")
+        clear_fragment_cache()
+
+    def touch_user(self, user_id: int) -> None:
+        """
+        Invalidates the user's cached pages after a change outside the tracker (e.g. a new profile photo).
+        """
+        self.bump_user_version(user_id)
+        self.session.commit()
+
+    # --- Facets ---
+
+    @staticmethod
+    def extract_facets(media_data: Dict[str, Any]) -> Tuple[List[str], List[str], Optional[int]]:
+        """
+        Pulls (genre names, country codes, release year) out of a TMDB details payload.
+        Movies only carry production_countries, TV shows carry origin_country.
+        """
+        genres = [g["name"] for g in media_data.get("genres", []) if g.get("name")]
+        countries = media_data.get("origin_country") or [
+            c["iso_3166_1"] for c in media_data.get("production_countries", []) if c.get("iso_3166_1")
+        ]
+        date = media_data.get("release_date") or media_data.get("first_air_date") or ""
+        year = int(date[:4]) if date[:4].isdigit() else None
+        return genres, countries, year
+
+    def sync_media_facets(self, media_id: int, genres: List[str], countries: List[str]) -> None:
+        """
+        Replaces the normalized genre/country rows of a media item inside the current transaction; the caller commits.
+        """
+        genre_names = list(dict.fromkeys(name.strip() for name in genres if name and name.strip()))
+        country_codes = list(dict.fromkeys(code.strip().upper() for code in countries if code and code.strip()))
+
+        self.session.exec(delete(MediaGenre).where(MediaGenre.media_id == media_id))
+        self.session.exec(delete(MediaCountry).where(MediaCountry.media_id == media_id))
+
+        if genre_names:
+            self.session.exec(
+                sqlite_insert(Genre).values([{"name": name} for name in genre_names]).on_conflict_do_nothing()
+            )
+            genre_ids = self.session.exec(select(Genre.id).where(Genre.name.in_(genre_names))).all()
+            self.session.exec(
+                sqlite_insert(MediaGenre).values([{"media_id": media_id, "genre_id": genre_id} for genre_id in genre_ids])
+            )
+
+        if country_codes:
+            self.session.exec(
+                sqlite_insert(Country).values([{"code": code} for code in country_codes]).on_conflict_do_nothing()
+            )
+            self.session.exec(
+                sqlite_insert(MediaCountry).values([{"media_id": media_id, "country_code": code} for code in country_codes])
+            )
+
+    def sync_media_keywords(self, media_id: int, keywords: Optional[Dict[str, Any]]) -> None:
+        """
+        Replaces the stored keywords of a media item; the caller commits.
+        TMDB nests them under "keywords" for movies and "results" for TV.
+        """
+        keywords = keywords or {}
+        items = [k for k in keywords.get("keywords", keywords.get("results", [])) if k.get("id") and k.get("name")]
+        self.session.exec(delete(MediaKeyword).where(MediaKeyword.media_id == media_id))
+        if not items:
+            return
+
+        by_id = {k["id"]: k["name"] for k in items}
+        self.session.exec(
+            sqlite_insert(Keyword).values([{"tmdb_id": tmdb_id, "name": name} for tmdb_id, name in by_id.items()])
+            .on_conflict_do_nothing()
+        )
+        keyword_ids = self.session.exec(select(Keyword.id).where(Keyword.tmdb_id.in_(list(by_id)))).all()
+        self.session.exec(
+            sqlite_insert(MediaKeyword).values([{"media_id": media_id, "keyword_id": keyword_id} for keyword_id in keyword_ids])
+        )
+
+    def has_media_keywords(self, media_id: int) -> bool:
+        return self.session.exec(
+            select(MediaKeyword.keyword_id).where(MediaKeyword.media_id == media_id).limit(1)
+        ).first() is not None
+
+    @staticmethod
+    def apply_library_filters(query, filters: Optional[Dict[str, Any]]):
+        """
+        Narrows a query joined on UserMedia/Media by dashboard filters:
+        genre (name), country (code), year, min_rating, max_rating. Each one hits an index.
+        """
+        if not filters:
+            return query
+
+        if filters.get("genre"):
+            query = query.where(exists().where(
+                MediaGenre.media_id == Media.id,
+                MediaGenre.genre_id == select(Genre.id).where(Genre.name == filters["genre"]).scalar_subquery()
+            ))
+        if filters.get("country"):
+            query = query.where(exists().where(
+                MediaCountry.media_id == Media.id,
+                MediaCountry.country_code == filters["country"].upper()
+            ))
+        if filters.get("year") is not None:
+            query = query.where(Media.release_year == filters["year"])
+        if filters.get("min_rating") is not None:
+            query = query.where(UserMedia.rating >= filters["min_rating"])
+        if filters.get("max_rating") is not None:
+            query = query.where(UserMedia.rating <= filters["max_rating"])
+        return query
+
+    def get_library_facets(self, user_id: int, media_type_filter: Optional[str] = None) -> Dict[str, List[Tuple[str, int]]]:
+        """
+        Value counts for every facet of the user's library in one round trip:
+        the (facet, value) pairs of each facet are UNION ALL'd and counted with a single GROUP BY.
+        Returns {"genre": [(name, count), ...], "country": [...], "year": [...]}, most common first.
+        """
+        def library(*columns):
+            query = select(*columns).select_from(UserMedia).join(Media, UserMedia.media_id == Media.id).where(
+                UserMedia.user_id == user_id
+            )
+            if media_type_filter:
+                query = query.where(Media.media_type == media_type_filter)
+            return query
+
+        pairs = union_all(
+            library(literal("genre").label("facet"), Genre.name.label("value")).join(
+                MediaGenre, MediaGenre.media_id == Media.id
+            ).join(Genre, Genre.id == MediaGenre.genre_id),
+            library(literal("country").label("facet"), MediaCountry.country_code.label("value")).join(
+                MediaCountry, MediaCountry.media_id == Media.id
+            ),
+            library(literal("year").label("facet"), cast(Media.release_year, String).label("value")).where(
+                Media.release_year.is_not(None)
+            ),
+        ).subquery()
+
+        from sqlmodel import func
+        counts = self.session.exec(
+            select(pairs.c.facet, pairs.c.value, func.count()).group_by(pairs.c.facet, pairs.c.value)
+        ).all()
+
+        facets = {"genre": [], "country": [], "year": []}
+        for facet, value, count in counts:
+            facets[facet].append((value, count))
+        for facet, values in facets.items():
+            if facet == "year":
+                values.sort(key=lambda x: x[0], reverse=True)
+            else:
+                values.sort(key=lambda x: (-x[1], x[0]))
+        return facets
+
+    # --- People ---
+
+    def sync_media_credits(self, media_id: int, credits: Optional[Dict[str, Any]]) -> None:
+        """
+        Replaces the stored cast of a media item from a TMDB credits payload; the caller commits.
+        """
+        cast_list = [c for c in (credits or {}).get("cast", []) if c.get("id") and c.get("name")][:CREDITS_PER_TITLE]
+        self.session.exec(delete(MediaCredit).where(MediaCredit.media_id == media_id))
+        if not cast_list:
+            return
+
+        people = {c["id"]: c for c in cast_list}
+        statement = sqlite_insert(Person).values([
+            {"tmdb_id": tmdb_id, "name": c["name"], "profile_path": c.get("profile_path")}
+            for tmdb_id, c in people.items()
+        ])
+        # Keep names and photos current; TMDB edits them over time
+        statement = statement.on_conflict_do_update(
+            index_elements=["tmdb_id"],
+            set_={"name": statement.excluded.name, "profile_path": statement.excluded.profile_path}
+        )
+        self.session.exec(statement)
+
+        person_ids = dict(self.session.exec(
+            select(Person.tmdb_id, Person.id).where(Person.tmdb_id.in_(list(people)))
+        ).all())
+        # Someone credited twice (two characters) keeps their first billing
+        rows = {}
+        for order, c in enumerate(cast_list):
+            rows.setdefault(person_ids[c["id"]], {
+                "media_id": media_id, "person_id": person_ids[c["id"]],
+                "character": c.get("character"), "billing_order": c.get("order", order)
+            })
+        self.session.exec(sqlite_insert(MediaCredit).values(list(rows.values())))
+
+    def has_media_credits(self, media_id: int) -> bool:
+        return self.session.exec(
+            select(MediaCredit.person_id).where(MediaCredit.media_id == media_id).limit(1)
+        ).first() is not None
+
+    def get_person_library(self, user_id: int, person_tmdb_id: int) -> Dict[str, Any]:
+        """
+        The user's tracked titles featuring a person, most recently updated first.
+        Walks MediaCredit by (person_id, media_id) and UserMedia by (user_id, media_id).
+        """
+        person = self.session.exec(select(Person).where(Person.tmdb_id == person_tmdb_id)).first()
+        if not person or not user_id:
+            return {"person": person, "items": []}
+
+        rows = self.session.exec(
+            select(
+                Media.tmdb_id, Media.media_type, Media.title, Media.poster_path, Media.release_year,
+                MediaCredit.character, UserMedia.status, UserMedia.rating
+            ).select_from(MediaCredit).join(
+                Media, Media.id == MediaCredit.media_id
+            ).join(
+                UserMedia, (UserMedia.media_id == Media.id) & (UserMedia.user_id == user_id)
+            ).where(
+                MediaCredit.person_id == person.id
+            ).order_by(UserMedia.updated_at.desc())
+        ).all()
+
+        return {"person": person, "items": [dict(row._mapping) for row in rows]}
+
     async def get_details_context(self, user_id: int, media_type: str, tmdb_id: int) -> Dict[str, Any]:
         """
         Fetches full details from TMDB and checks the user's tracking status.
@@ -32,6 +295,18 @@ class TrackerService:
                 select(UserMedia).where(UserMedia.user_id == user_id, UserMedia.media_id == media.id)
             ).first()
 
+            # Titles cached before credits/keywords were stored pick them up from this payload
+            backfilled = False
+            if not self.has_media_credits(media.id) and tmdb_data.get("credits", {}).get("cast"):
+                self.sync_media_credits(media.id, tmdb_data["credits"])
+                backfilled = True
+            keywords = tmdb_data.get("keywords") or {}
+            if not self.has_media_keywords(media.id) and (keywords.get("keywords") or keywords.get("results")):
+                self.sync_media_keywords(media.id, tmdb_data["keywords"])
+                backfilled = True
+            if backfilled:
+                self.session.commit()
+
         # 3. Get Stats for TV
         series_stats = None
         if media_type == 'tv':
@@ -68,6 +343,9 @@ class TrackerService:
             ).first()
 
             if media:
+                if self.sync_season_catalog(media.id, season_data):
+                    self.session.commit()
+
                 user_media = self.session.exec(
                     select(UserMedia).where(UserMedia.user_id == user_id, UserMedia.media_id == media.id)
                 ).first()
@@ -105,6 +383,208 @@ class TrackerService:
             "episodes": processed_episodes
         }
 
+    # --- Episode catalog ---
+
+    @staticmethod
+    def _parse_air_date(value: Optional[str]) -> Optional[date]:
+        try:
+            return date.fromisoformat(value) if value else None
+        except ValueError:
+            return None
+
+    def get_media_id(self, tmdb_id: int, media_type: str) -> Optional[int]:
+        return self.session.exec(
+            select(Media.id).where(Media.tmdb_id == tmdb_id, Media.media_type == media_type)
+        ).first()
+
+    def sync_season_catalog(self, media_id: int, season_data: Dict[str, Any]) -> bool:
+        """
+        Stores the episode list of a TMDB season payload; the caller commits. Only writes (and bumps the
+        "episodes" version) when something changed, so re-reading a known season costs one SELECT.
+        """
+        episodes = [
+            {
+                "media_id": media_id,
+                "season_number": episode.get("season_number", season_data.get("season_number")),
+                "episode_number": episode.get("episode_number"),
+                "name": episode.get("name"),
+                "air_date": self._parse_air_date(episode.get("air_date")),
+                "runtime": episode.get("runtime"),
+                "still_path": episode.get("still_path"),
+            }
+            for episode in season_data.get("episodes") or []
+        ]
+        episodes = [row for row in episodes if row["season_number"] is not None and row["episode_number"] is not None]
+        if not episodes:
+            return False
+
+        existing = {
+            (row.season_number, row.episode_number): (row.name, row.air_date, row.runtime, row.still_path)
+            for row in self.session.exec(
+                select(CatalogEpisode).where(
+                    CatalogEpisode.media_id == media_id,
+                    CatalogEpisode.season_number.in_({row["season_number"] for row in episodes})
+                )
+            ).all()
+        }
+        changed = [
+            row for row in episodes
+            if existing.get((row["season_number"], row["episode_number"])) != (row["name"], row["air_date"], row["runtime"], row["still_path"])
+        ]
+        if not changed:
+            return False
+
+        statement = sqlite_insert(CatalogEpisode).values(changed)
+        self.session.exec(statement.on_conflict_do_update(
+            index_elements=["media_id", "season_number", "episode_number"],
+            set_={column: statement.excluded[column] for column in ("name", "air_date", "runtime", "still_path")}
+        ))
+        self.bump_version("episodes")
+        return True
+
+    def get_continue_watching(self, user_id: int, limit: int = 20, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Next unwatched, already aired episode (after the furthest one watched) of every show the user is watching,
+        most recently watched shows first. One query: the user's progress per show joined with the local
+        episode catalog, first candidate per show picked with ROW_NUMBER(). Shows without catalog rows are skipped.
+        """
+        key = (user_id, self.get_user_version(user_id), self.get_version("episodes"))
+        cached = continue_watching_cache.get(key)
+        if cached is not None:
+            return cached
+
+        today = today or datetime.utcnow().date()
+        progress = select(
+            UserMedia.id.label("user_media_id"),
+            UserMedia.media_id.label("media_id"),
+            func.max(EpisodeActivity.season_number * EPISODE_KEY_SPAN + EpisodeActivity.episode_number).label("last_key"),
+            func.max(EpisodeActivity.watched_at).label("last_watched_at"),
+        ).outerjoin(
+            EpisodeActivity,
+            (EpisodeActivity.user_media_id == UserMedia.id) & (EpisodeActivity.status == "watched")
+        ).where(
+            UserMedia.user_id == user_id, UserMedia.status == "watching"
+        ).group_by(UserMedia.id).cte("progress")
+
+        by_show = {"partition_by": progress.c.user_media_id}
+        candidates = select(
+            progress.c.media_id,
+            progress.c.last_watched_at,
+            CatalogEpisode.season_number,
+            CatalogEpisode.episode_number,
+            CatalogEpisode.name,
+            CatalogEpisode.air_date,
+            CatalogEpisode.still_path,
+            func.row_number().over(
+                order_by=(CatalogEpisode.season_number, CatalogEpisode.episode_number), **by_show
+            ).label("position"),
+            func.count().over(**by_show).label("remaining"),
+        ).join(CatalogEpisode, CatalogEpisode.media_id == progress.c.media_id).where(
+            CatalogEpisode.season_number > 0, # Specials don't block the main run
+            CatalogEpisode.season_number * EPISODE_KEY_SPAN + CatalogEpisode.episode_number > func.coalesce(progress.c.last_key, 0),
+            CatalogEpisode.air_date <= today
+        ).subquery()
+
+        rows = self.session.exec(
+            select(
+                Media.tmdb_id, Media.title, Media.poster_path,
+                candidates.c.season_number, candidates.c.episode_number, candidates.c.name,
+                candidates.c.air_date, candidates.c.still_path, candidates.c.remaining, candidates.c.last_watched_at
+            ).join(Media, Media.id == candidates.c.media_id).where(
+                candidates.c.position == 1
+            ).order_by(candidates.c.last_watched_at.desc().nulls_last(), Media.title).limit(limit)
+        ).all()
+
+        items = [dict(row._mapping) for row in rows]
+        continue_watching_cache.set(key, items)
+        return items
+
+    @classmethod
+    def media_fields(cls, media_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The cached Media columns of a TMDB details payload.
+        """
+        genres = ",".join([g['name'] for g in media_data.get('genres', [])])
+        origin = media_data.get('origin_country', [])
+        origin_str = origin[0] if origin else None
+        
+        title = media_data.get("title") or media_data.get("name")
+        
+        # Extract Cast
+        credits = media_data.get("credits", {})
+        cast_list = credits.get("cast", [])
+        cast_str = ",".join([c['name'] for c in cast_list[:5]]) if cast_list else None
+
+        _, _, release_year = cls.extract_facets(media_data)
+        next_episode = media_data.get("next_episode_to_air") or {}
+
+        return {
+            "title": title,
+            "poster_path": media_data.get("poster_path"),
+            "genres": genres,
+            "origin_country": origin_str,
+            "runtime": media_data.get("runtime"),
+            "number_of_episodes": media_data.get("number_of_episodes"),
+            "number_of_seasons": media_data.get("number_of_seasons"),
+            "cast": cast_str,
+            "release_year": release_year,
+            "tmdb_status": media_data.get("status"),
+            "next_episode_air_date": cls._parse_air_date(next_episode.get("air_date")),
+        }
+
+    def cache_media(self, media_data: Dict[str, Any], media_type: str) -> Media:
+        """
+        Creates the Media cache row (plus facets, credits and keywords) from a TMDB details payload.
+        Flushes to get an id; the caller commits.
+        """
+        media = Media(
+            tmdb_id=media_data.get("id"),
+            media_type=media_type,
+            refreshed_at=datetime.utcnow(),
+            **self.media_fields(media_data)
+        )
+        self.session.add(media)
+        self.session.flush()
+        self._sync_media_relations(media.id, media_data)
+        return media
+
+    def refresh_media(self, media: Media, media_data: Dict[str, Any]) -> bool:
+        """
+        Updates a cached Media row (plus facets, credits and keywords) from a newer TMDB details payload;
+        the caller commits. Returns True when a displayed column changed.
+        """
+        fields = self.media_fields(media_data)
+        genre_names = {name.strip() for name in self.extract_facets(media_data)[0] if name and name.strip()}
+        current_genres = set(self.session.exec(
+            select(Genre.name).join(MediaGenre, MediaGenre.genre_id == Genre.id).where(MediaGenre.media_id == media.id)
+        ).all())
+        # The activity aggregates were summed with the old runtime/genres: retract them first, re-add them after
+        ledger = None
+        if fields["runtime"] != media.runtime or genre_names != current_genres:
+            ledger = ActivityLedger(self.session)
+            ledger.remove_media(media.id)
+            ledger.apply()
+
+        changed = False
+        for field, value in fields.items():
+            if getattr(media, field) != value:
+                setattr(media, field, value)
+                changed = True
+        media.refreshed_at = datetime.utcnow()
+        self.session.add(media)
+        self._sync_media_relations(media.id, media_data)
+
+        if ledger:
+            ledger.add_media(media.id)
+            ledger.apply()
+        return changed
+
+    def _sync_media_relations(self, media_id: int, media_data: Dict[str, Any]) -> None:
+        genre_names, country_codes, _ = self.extract_facets(media_data)
+        self.sync_media_facets(media_id, genre_names, country_codes)
+        self.sync_media_credits(media_id, media_data.get("credits"))
+        self.sync_media_keywords(media_id, media_data.get("keywords"))
+
     def update_status(self, user: User, media_data: Dict[str, Any], status: str) -> UserMedia:
         """
         Create or Update Media and UserMedia entries.
@@ -118,31 +598,7 @@ class TrackerService:
         ).first()
 
         if not media:
-            # Create Media Cache
-            genres = ",".join([g['name'] for g in media_data.get('genres', [])])
-            origin = media_data.get('origin_country', [])
-            origin_str = origin[0] if origin else None
-            
-            title = media_data.get("title") or media_data.get("name")
-            
-            # Extract Cast
-            credits = media_data.get("credits", {})
-            cast_list = credits.get("cast", [])
-            cast_str = ",".join([c['name'] for c in cast_list[:5]]) if cast_list else None
-
-            media = Media(
-                tmdb_id=tmdb_id,
-                media_type=media_type,
-                title=title,
-                poster_path=media_data.get("poster_path"),
-                genres=genres,
-                origin_country=origin_str,
-                runtime=media_data.get("runtime"),
-                number_of_episodes=media_data.get("number_of_episodes"),
-                number_of_seasons=media_data.get("number_of_seasons"),
-                cast=cast_str
-            )
-            self.session.add(media)
+            media = self.cache_media(media_data, media_type)
             self.session.commit()
             self.session.refresh(media)
 
@@ -151,17 +607,26 @@ class TrackerService:
             select(UserMedia).where(UserMedia.user_id == user.id, UserMedia.media_id == media.id)
         ).first()
 
+        ledger = ActivityLedger(self.session)
+        now = datetime.utcnow()
         if not user_media:
             user_media = UserMedia(
                 user_id=user.id,
                 media_id=media.id,
                 status=status
             )
+            stamp_watch_time(user_media, None, now)
         else:
+            ledger.remove_title(user_media)
+            previous = watch_time(user_media)
             user_media.status = status
-            user_media.updated_at = datetime.utcnow()
+            user_media.updated_at = now
+            stamp_watch_time(user_media, previous, now)
         
         self.session.add(user_media)
+        ledger.add_title(user_media)
+        ledger.apply()
+        self.bump_user_version(user.id)
         self.session.commit()
         self.session.refresh(user_media)
         
@@ -172,15 +637,56 @@ class TrackerService:
             select(UserMedia).where(UserMedia.user_id == user_id, UserMedia.media_id == media_id)
         ).first()
 
+    def get_library_badges(self, user_id: int, keys: List[Tuple[int, str]]) -> Dict[Tuple[int, str], Dict[str, Any]]:
+        """
+        Resolves which (tmdb_id, media_type) pairs the user already tracks in a single query.
+        Returns {(tmdb_id, media_type): {"status": ..., "rating": ...}} for tracked pairs only.
+        """
+        keys = list({(tmdb_id, media_type) for tmdb_id, media_type in keys if tmdb_id and media_type in ('movie', 'tv')})
+        if not user_id or not keys:
+            return {}
+
+        query = select(Media.tmdb_id, Media.media_type, UserMedia.status, UserMedia.rating).join(
+            UserMedia, UserMedia.media_id == Media.id
+        ).where(
+            UserMedia.user_id == user_id,
+            tuple_(Media.tmdb_id, Media.media_type).in_(keys)
+        )
+
+        return {
+            (tmdb_id, media_type): {"status": status, "rating": rating}
+            for tmdb_id, media_type, status, rating in self.session.exec(query).all()
+        }
+
+    def annotate_library_status(self, user_id: int, results: List[Dict[str, Any]], default_media_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Adds a 'library' key ({"status", "rating"} or None) to each TMDB search/trending result.
+        """
+        keys = [(item.get("id"), item.get("media_type") or default_media_type) for item in results]
+        badges = self.get_library_badges(user_id, keys)
+
+        for item, key in zip(results, keys):
+            item["library"] = badges.get(key)
+
+        return results
+
     def update_review(self, user_id: int, media_id: int, status: str, rating: float, comment: str) -> UserMedia:
         user_media = self.get_user_media(user_id, media_id)
         if user_media:
+            ledger = ActivityLedger(self.session)
+            ledger.remove_title(user_media)
+            # Editing the rating or comment of a watched movie must not move its watch to today
+            previous = watch_time(user_media)
             user_media.status = status
             user_media.rating = rating
             user_media.comment = comment
             user_media.updated_at = datetime.utcnow()
+            stamp_watch_time(user_media, previous, user_media.updated_at)
             
             self.session.add(user_media)
+            ledger.add_title(user_media)
+            ledger.apply()
+            self.bump_user_version(user_id)
             self.session.commit()
             self.session.refresh(user_media)
             
@@ -210,11 +716,16 @@ class TrackerService:
             activities = self.session.exec(
                 select(EpisodeActivity).where(EpisodeActivity.user_media_id == user_media.id)
             ).all()
+            ledger = ActivityLedger(self.session)
             for activity in activities:
+                ledger.remove_episode(user_id, media.id, activity.status, activity.watched_at)
                 self.session.delete(activity)
             
             # Delete UserMedia
+            ledger.remove_title(user_media)
             self.session.delete(user_media)
+            ledger.apply()
+            self.bump_user_version(user_id)
             self.session.commit()
             return True
         
@@ -274,15 +785,22 @@ class TrackerService:
                     )
                 ).first()
 
+                ledger = ActivityLedger(self.session)
                 if action == 'unwatch':
                     if activity:
+                        ledger.remove_episode(user_id, media.id, activity.status, activity.watched_at)
                         self.session.delete(activity)
+                        ledger.apply()
+                        self.bump_user_version(user_id)
                         self.session.commit()
                     return None
 
-                if not activity:
+                if activity:
+                    ledger.remove_episode(user_id, media.id, activity.status, activity.watched_at)
+                else:
                     activity = EpisodeActivity(
                         user_media_id=user_media.id,
+                        user_id=user_id,
                         season_number=season_number,
                         episode_number=episode_number,
                         status="watched" 
@@ -298,6 +816,9 @@ class TrackerService:
                     activity.status = action
                 
                 self.session.add(activity)
+                ledger.add_episode(user_id, media.id, activity.status, activity.watched_at)
+                ledger.apply()
+                self.bump_user_version(user_id)
                 self.session.commit()
                 self.session.refresh(activity)
                 return activity
@@ -311,6 +832,11 @@ class TrackerService:
         
         raise Exception("Failed to update episode activity due to concurrency")
 
+    def _store_season_catalog(self, tmdb_id: int, season_data: Dict[str, Any]) -> None:
+        media_id = self.get_media_id(tmdb_id, 'tv')
+        if media_id and self.sync_season_catalog(media_id, season_data):
+            self.session.commit()
+
     async def sync_series_episodes_activity(self, user_id: int, tmdb_id: int, status: str, rating: float = None) -> None:
         """
         If status is 'watched' or 'finished', mark all episodes as watched.
@@ -346,6 +872,7 @@ class TrackerService:
                 continue
                 
             episodes = season_details.get('episodes', [])
+            self._store_season_catalog(tmdb_id, season_details)
             
             # 3. Mark Episodes
             for episode in episodes:
@@ -385,6 +912,7 @@ class TrackerService:
             return
 
         episodes = season_details.get('episodes', [])
+        self._store_season_catalog(tmdb_id, season_details)
         
         # 2. Mark Episodes
         for episode in episodes:
@@ -440,16 +968,153 @@ class TrackerService:
             "time_str": f"{total_hours}h"
         }
 
-    def get_dashboard_stats(self, user_id: int, media_type_filter: Optional[str] = None) -> Dict[str, Any]:
-        # 1. Fetch all user media with media details
+    def get_library_page(self, user_id: int, limit: int = 50, cursor: Optional[Tuple[datetime, int]] = None,
+                         media_type: Optional[str] = None, status: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Keyset-paginated library ordered by most recently updated.
+        `cursor` is the (updated_at, id) of the last row of the previous page.
+        """
+        from sqlmodel import func
+
         query = select(UserMedia, Media).join(Media).where(UserMedia.user_id == user_id)
-        
+        if media_type:
+            query = query.where(Media.media_type == media_type)
+        if status:
+            query = query.where(UserMedia.status == status)
+        if cursor:
+            query = query.where(tuple_(UserMedia.updated_at, UserMedia.id) < tuple_(
+                literal(cursor[0], UserMedia.updated_at.type), literal(cursor[1])
+            ))
+
+        rows = self.session.exec(
+            query.order_by(UserMedia.updated_at.desc(), UserMedia.id.desc()).limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Watched episode counts for this page only
+        page_ids = [user_media.id for user_media, _ in rows]
+        episode_counts = {}
+        if page_ids:
+            episode_counts = dict(self.session.exec(
+                select(EpisodeActivity.user_media_id, func.count(EpisodeActivity.id)).where(
+                    EpisodeActivity.user_media_id.in_(page_ids),
+                    EpisodeActivity.status == 'watched'
+                ).group_by(EpisodeActivity.user_media_id)
+            ).all())
+
+        items = [{
+            "id": user_media.id,
+            "tmdb_id": media.tmdb_id,
+            "media_type": media.media_type,
+            "title": media.title,
+            "poster_path": media.poster_path,
+            "genres": media.genres.split(",") if media.genres else [],
+            "origin_country": media.origin_country,
+            "runtime": media.runtime,
+            "number_of_episodes": media.number_of_episodes,
+            "number_of_seasons": media.number_of_seasons,
+            "cast": media.cast.split(",") if media.cast else [],
+            "status": user_media.status,
+            "rating": user_media.rating,
+            "comment": user_media.comment,
+            "episodes_watched": episode_counts.get(user_media.id, 0),
+            "created_at": user_media.created_at,
+            "updated_at": user_media.updated_at,
+        } for user_media, media in rows]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1][0]
+            next_cursor = (last.updated_at, last.id)
+
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get_history_page(self, user_id: int, limit: int = 50, cursor: Optional[HistoryCursor] = None) -> Dict[str, Any]:
+        """
+        Keyset-paginated watch history, newest first: watched episodes (EpisodeActivity.watched_at) merged with
+        watched movies (UserMedia.updated_at), ordered by (timestamp, kind, id). Each source is read in index order
+        and stops at limit + 1 rows, so every page costs the same whatever its depth.
+        """
+        def after_cursor(kind: str, timestamp, row_id) -> List[Any]:
+            if cursor is None:
+                return []
+            cursor_at, cursor_kind, cursor_id = cursor
+            rank, cursor_rank = HISTORY_KIND_RANKS[kind], HISTORY_KIND_RANKS[cursor_kind]
+            if rank < cursor_rank:
+                return [timestamp <= cursor_at]
+            if rank > cursor_rank:
+                return [timestamp < cursor_at]
+            return [tuple_(timestamp, row_id) < tuple_(literal(cursor_at, timestamp.type), literal(cursor_id))]
+
+        episodes = self.session.exec(
+            select(
+                EpisodeActivity.id, EpisodeActivity.watched_at, EpisodeActivity.season_number,
+                EpisodeActivity.episode_number, Media.tmdb_id, Media.title, Media.poster_path
+            ).join(UserMedia, UserMedia.id == EpisodeActivity.user_media_id).join(
+                Media, Media.id == UserMedia.media_id
+            ).where(
+                EpisodeActivity.user_id == user_id,
+                EpisodeActivity.status == "watched",
+                *after_cursor("episode", EpisodeActivity.watched_at, EpisodeActivity.id)
+            ).order_by(EpisodeActivity.watched_at.desc(), EpisodeActivity.id.desc()).limit(limit + 1)
+        ).all()
+
+        movies = self.session.exec(
+            select(
+                UserMedia.id, UserMedia.updated_at, UserMedia.rating, Media.tmdb_id, Media.title, Media.poster_path
+            ).join(Media, Media.id == UserMedia.media_id).where(
+                UserMedia.user_id == user_id,
+                UserMedia.status.in_(MOVIE_WATCHED_STATUSES),
+                Media.media_type == "movie",
+                *after_cursor("movie", UserMedia.updated_at, UserMedia.id)
+            ).order_by(UserMedia.updated_at.desc(), UserMedia.id.desc()).limit(limit + 1)
+        ).all()
+
+        events = [{
+            "kind": "episode", "id": row.id, "watched_at": row.watched_at, "media_type": "tv",
+            "tmdb_id": row.tmdb_id, "title": row.title, "poster_path": row.poster_path,
+            "season_number": row.season_number, "episode_number": row.episode_number,
+        } for row in episodes] + [{
+            "kind": "movie", "id": row.id, "watched_at": row.updated_at, "media_type": "movie",
+            "tmdb_id": row.tmdb_id, "title": row.title, "poster_path": row.poster_path, "rating": row.rating,
+        } for row in movies]
+        events.sort(key=lambda event: (event["watched_at"], HISTORY_KIND_RANKS[event["kind"]], event["id"]), reverse=True)
+
+        has_more = len(events) > limit
+        events = events[:limit]
+        next_cursor = None
+        if has_more and events:
+            last = events[-1]
+            next_cursor = (last["watched_at"], last["kind"], last["id"])
+
+        return {"items": events, "next_cursor": next_cursor}
+
+    def get_dashboard_rows(self, user_id: int, media_type_filter: Optional[str] = None,
+                           filters: Optional[Dict[str, Any]] = None) -> List[DashboardRow]:
+        """
+        Column-projected library listing: only the fields the dashboard renders, as lightweight tuples
+        (no ORM identity map, no comment text).
+        """
+        query = select(*[
+            UserMedia.id, Media.tmdb_id, Media.media_type, Media.title, Media.poster_path, Media.genres,
+            Media.origin_country, Media.runtime, Media.number_of_episodes, Media.number_of_seasons, Media.cast,
+            UserMedia.status, UserMedia.rating, UserMedia.updated_at
+        ]).join(Media, UserMedia.media_id == Media.id).where(UserMedia.user_id == user_id)
+
         if media_type_filter:
             query = query.where(Media.media_type == media_type_filter)
-            
-        results = self.session.exec(query).all()
+        query = self.apply_library_filters(query, filters)
+
+        # Most recent first, so each status group comes out already sorted
+        query = query.order_by(UserMedia.updated_at.desc())
+        return [DashboardRow(*row) for row in self.session.exec(query)]
+
+    def get_dashboard_stats(self, user_id: int, media_type_filter: Optional[str] = None,
+                            filters: Optional[Dict[str, Any]] = None, include_facets: bool = True) -> Dict[str, Any]:
+        # 1. Fetch all user media as projected rows
+        results = self.get_dashboard_rows(user_id, media_type_filter, filters)
         
-        # 2. Fetch all episode activities for this user to avoid N+1
         # 2. Fetch all episode activities for this user to avoid N+1
         from sqlmodel import func
         
@@ -468,58 +1133,41 @@ class TrackerService:
         # New structure for specific grouping
         movies_by_status = {}
         tv_by_status = {}
-
-        recent_activity = []
         
-        for user_media, media in results:
+        for row in results:
             # Stats Calculation
-            runtime = media.runtime or 0
+            runtime = row.runtime or 0
             
             # Estimate runtime if missing
             if runtime == 0:
-                if media.media_type == 'movie': runtime = 120
-                elif media.media_type == 'tv': runtime = 45
+                if row.media_type == 'movie': runtime = 120
+                elif row.media_type == 'tv': runtime = 45
 
-            if media.media_type == 'movie':
+            if row.media_type == 'movie':
                 # Count if watched OR watching (users might be imprecise)
-                if user_media.status in ['watched', 'managed', 'finished']:
+                if row.status in ['watched', 'managed', 'finished']:
                     movies_watched += 1
                     total_minutes += runtime
                 
                 # Grouping
-                if user_media.status not in movies_by_status: movies_by_status[user_media.status] = []
-                movies_by_status[user_media.status].append({
-                    "media": media,
-                    "user_media": user_media
-                })
-
-            elif media.media_type == 'tv':
-                if user_media.status in ['finished', 'watched']:
+                movies_by_status.setdefault(row.status, []).append(row)
+
+            elif row.media_type == 'tv':
+                if row.status in ['finished', 'watched']:
                     series_finished += 1
                 
                 # Use accurate count from activities
-                watched_count = activity_counts.get(user_media.id, 0)
+                watched_count = activity_counts.get(row.user_media_id, 0)
                 if watched_count > 0:
                     total_minutes += (runtime * watched_count)
-                elif user_media.status in ['finished', 'watched']:
+                elif row.status in ['finished', 'watched']:
                     # Fallback if no specific episodes marked but show is marked finished
-                    ep_count = media.number_of_episodes or 10
+                    ep_count = row.number_of_episodes or 10
                     total_minutes += (runtime * ep_count)
 
                 # Grouping
-                if user_media.status not in tv_by_status: tv_by_status[user_media.status] = []
-                tv_by_status[user_media.status].append({
-                    "media": media,
-                    "user_media": user_media
-                })
+                tv_by_status.setdefault(row.status, []).append(row)
             
-        # Sort lists by updated_at desc
-        for status_list in movies_by_status.values():
-            status_list.sort(key=lambda x: x['user_media'].updated_at, reverse=True)
-            
-        for status_list in tv_by_status.values():
-            status_list.sort(key=lambda x: x['user_media'].updated_at, reverse=True)
-        
         # Convert minutes to Hours/Days
         total_hours = int(total_minutes / 60)
         total_days = round(total_hours / 24, 1)
@@ -535,5 +1183,7 @@ class TrackerService:
             "movies_by_status": movies_by_status,
             "tv_by_status": tv_by_status,
             
-            "filter": media_type_filter
+            "filter": media_type_filter,
+            "facets": self.get_library_facets(user_id, media_type_filter) if include_facets else None,
+            "filters": filters or {}
         }
@@ -0,0 +1,344 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+from database import engine
+from apps.core.cache import TTLCache
+from apps.core.leases import BACKGROUND_JOBS_LEASE
+from apps.core.rate_limit import RateLimiter
+from apps.core.tmdb import TMDBService
+from apps.tracker.airing import AiringService, ShowRefresh
+from apps.tracker.changes import ChangesService, TitleRefresh
+from apps.tracker.models import TrendingSnapshot
+from config import settings
+
+# Budget for every background TMDB request. Background jobs only run in the worker holding the
+# background-jobs lease (apps/core/leases.py), so this one limiter covers the whole deployment.
+background_limiter = RateLimiter(settings.TMDB_BACKGROUND_REQUESTS_PER_SECOND)
+
+# (media_type, time_window) pairs served by the discover page
+TRENDING_WINDOWS = [
+    ("movie", "day"),
+    ("movie", "week"),
+    ("tv", "day"),
+    ("tv", "week"),
+]
+
+# Per-worker copy of the stored snapshots, so the discover page reads the database at most once a minute per window
+trending_cache = TTLCache(ttl=settings.TRENDING_SNAPSHOT_CACHE_SECONDS, maxsize=len(TRENDING_WINDOWS))
+
+def get_trending_snapshot(media_type: str, time_window: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the stored {"results", "fetched_at", "version"} for a window, or None while still warming up.
+    Never calls TMDB.
+    """
+    key = (media_type, time_window)
+    snapshot = trending_cache.get(key)
+    if snapshot is None:
+        with Session(engine) as session:
+            row = session.get(TrendingSnapshot, key)
+        if row is None:
+            return None
+        snapshot = {"results": json.loads(row.results), "fetched_at": row.fetched_at, "version": row.version}
+        trending_cache.set(key, snapshot)
+    return snapshot
+
+def _store_trending(media_type: str, time_window: str, results: List[Dict[str, Any]]) -> None:
+    statement = sqlite_insert(TrendingSnapshot).values(
+        media_type=media_type, time_window=time_window, results=json.dumps(results), fetched_at=datetime.utcnow()
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["media_type", "time_window"],
+        set_={
+            "results": statement.excluded.results,
+            "fetched_at": statement.excluded.fetched_at,
+            "version": TrendingSnapshot.version + 1,
+        }
+    )
+    with Session(engine) as session:
+        session.exec(statement)
+        session.commit()
+
+async def refresh_trending() -> None:
+    """
+    Fetches every trending window from TMDB and stores it for all workers. A failed window keeps its
+    last good snapshot.
+    """
+    service = TMDBService()
+    try:
+        for media_type, time_window in TRENDING_WINDOWS:
+            try:
+                await background_limiter.wait()
+                data = await service.get_trending(media_type, time_window)
+            except Exception as e:
+                print(f"[ERROR] Trending refresh failed for {media_type}/{time_window}: {e}")
+                continue
+
+            results = data.get("results", [])
+            for item in results:
+                item.setdefault("media_type", media_type)
+            await asyncio.to_thread(_store_trending, media_type, time_window, results)
+            trending_cache.delete((media_type, time_window))
+    finally:
+        await service.close()
+
+async def trending_refresher(interval: int = settings.TRENDING_REFRESH_SECONDS) -> None:
+    """
+    Background job (lease holder only, see main.py). Refreshes the snapshots immediately, then every `interval` seconds.
+    """
+    while True:
+        try:
+            await refresh_trending()
+        except Exception as e:
+            print(f"[ERROR] Trending refresher: {e}")
+        await asyncio.sleep(interval)
+
+
+# --- Metadata refreshers ---
+
+async def fetch_details(service: TMDBService, media_type: str, media_id: int, tmdb_id: int) -> Optional[TitleRefresh]:
+    """
+    Re-reads a title under the background rate limit. The payload is None when TMDB no longer has the title;
+    returns None when the request failed (the airing refresher picks the show up again on its next cycle,
+    the changes refresher queues it in ChangesRetry).
+    """
+    try:
+        await background_limiter.wait()
+        return (media_id, tmdb_id, await service.get_details(media_type, tmdb_id))
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return (media_id, tmdb_id, None)
+        print(f"[WARN] Refresh failed for {media_type} {tmdb_id}: {e}")
+    except Exception as e:
+        print(f"[WARN] Refresh failed for {media_type} {tmdb_id}: {e}")
+    return None
+
+# --- Airing shows ---
+
+async def fetch_show(service: TMDBService, media_id: int, tmdb_id: int) -> Optional[ShowRefresh]:
+    """
+    Re-reads a show and the season of its next episode.
+    """
+    result = await fetch_details(service, 'tv', media_id, tmdb_id)
+    if result is None:
+        return None
+    details = result[2]
+    if details is None:
+        return (media_id, tmdb_id, None, None)
+
+    season = None
+    season_number = (details.get("next_episode_to_air") or {}).get("season_number")
+    if season_number is not None:
+        try:
+            await background_limiter.wait()
+            season = await service.get_season_details(tmdb_id, season_number) or None
+        except Exception as e:
+            print(f"[WARN] Airing refresh could not load season {season_number} of TV {tmdb_id}: {e}")
+    return (media_id, tmdb_id, details, season)
+
+def _due_shows(limit: int):
+    with Session(engine) as session:
+        return AiringService(session).due_shows(limit)
+
+def _store_refreshes(refreshes):
+    with Session(engine) as session:
+        return AiringService(session).store_refreshes(refreshes)
+
+async def refresh_airing_shows(batch_size: int = settings.AIRING_REFRESH_BATCH_SIZE) -> int:
+    """
+    Refreshes one batch of due airing shows: fetched concurrently under the rate limit, then written
+    in a single transaction. Returns the number of shows fetched.
+    """
+    shows = await asyncio.to_thread(_due_shows, batch_size)
+    if not shows:
+        return 0
+
+    service = TMDBService()
+    try:
+        results = await asyncio.gather(*(fetch_show(service, media_id, tmdb_id) for media_id, tmdb_id in shows))
+    finally:
+        await service.close()
+
+    refreshes = [result for result in results if result is not None]
+    if refreshes:
+        await asyncio.to_thread(_store_refreshes, refreshes)
+    return len(refreshes)
+
+async def airing_refresher(interval: int = settings.AIRING_REFRESH_SECONDS) -> None:
+    """
+    Background job (lease holder only, see main.py). Keeps episode counts, next-episode dates and the
+    upcoming-episodes calendar of running shows current, one batch every `interval` seconds.
+    """
+    while True:
+        try:
+            refreshed = await refresh_airing_shows()
+            if refreshed:
+                print(f"[INFO] Refreshed {refreshed} airing shows")
+        except Exception as e:
+            print(f"[ERROR] Airing refresher: {e}")
+        await asyncio.sleep(interval)
+
+
+# --- TMDB changes feed ---
+
+CHANGES_MEDIA_TYPES = ("movie", "tv")
+# Failed titles retried per media type and cycle
+CHANGES_RETRY_BATCH_SIZE = 200
+
+def _changes_window(media_type: str):
+    with Session(engine) as session:
+        return ChangesService(session).get_window(media_type)
+
+def _changed_media(media_type: str, tmdb_ids):
+    with Session(engine) as session:
+        return ChangesService(session).changed_media(media_type, tmdb_ids)
+
+def _pending_retries(media_type: str):
+    with Session(engine) as session:
+        return ChangesService(session).pending_retries(media_type, CHANGES_RETRY_BATCH_SIZE)
+
+def _store_retries(media_type: str, refreshes, failed):
+    with Session(engine) as session:
+        return ChangesService(session).store_retries(media_type, refreshes, failed, lease=BACKGROUND_JOBS_LEASE)
+
+def _store_changes_page(media_type: str, refreshes, failed, window, done: bool):
+    with Session(engine) as session:
+        return ChangesService(session).store_page(
+            media_type, refreshes, failed, window, done, lease=BACKGROUND_JOBS_LEASE
+        )
+
+async def _fetch_changed(service: TMDBService, media_type: str, matched) -> Tuple[List[TitleRefresh], List[int]]:
+    """
+    Re-fetches (Media.id, tmdb_id) pairs concurrently; returns the refreshes and the tmdb_ids that failed.
+    """
+    results = await asyncio.gather(*(
+        fetch_details(service, media_type, media_id, tmdb_id) for media_id, tmdb_id in matched
+    ))
+    refreshes = [result for result in results if result is not None]
+    failed = [tmdb_id for (_, tmdb_id), result in zip(matched, results) if result is None]
+    return refreshes, failed
+
+async def refresh_changed_media(media_type: str) -> int:
+    """
+    Retries titles whose re-fetch failed earlier, then reads TMDB's changes feed for `media_type` from the
+    checkpoint onward, page by page: intersects each page with our Media rows, re-fetches the matches
+    concurrently and stores them together with the advanced checkpoint; failures go to ChangesRetry.
+    Returns the number of titles re-fetched.
+    """
+    refreshed = 0
+    service = TMDBService()
+    try:
+        retries = await asyncio.to_thread(_pending_retries, media_type)
+        if retries:
+            refreshes, failed = await _fetch_changed(service, media_type, retries)
+            await asyncio.to_thread(_store_retries, media_type, refreshes, failed)
+            refreshed += len(refreshes)
+
+        window = await asyncio.to_thread(_changes_window, media_type)
+        if window is None:
+            return refreshed
+
+        start, end, page = window
+        while True:
+            await background_limiter.wait()
+            data = await service.get_changes(media_type, start, end, page)
+            tmdb_ids = [item["id"] for item in data.get("results", []) if item.get("id")]
+            matched = await asyncio.to_thread(_changed_media, media_type, tmdb_ids)
+            refreshes, failed = await _fetch_changed(service, media_type, matched)
+            done = page >= (data.get("total_pages") or 1)
+            await asyncio.to_thread(_store_changes_page, media_type, refreshes, failed, (start, end, page), done)
+            refreshed += len(refreshes)
+            if done:
+                return refreshed
+            page += 1
+    finally:
+        await service.close()
+
+async def changes_refresher(interval: int = settings.CHANGES_REFRESH_SECONDS) -> None:
+    """
+    Background job (lease holder only, see main.py). Keeps cached metadata (runtime, poster, genres, cast)
+    in step with TMDB edits without re-reading titles that did not change.
+    """
+    while True:
+        for media_type in CHANGES_MEDIA_TYPES:
+            try:
+                refreshed = await refresh_changed_media(media_type)
+                if refreshed:
+                    print(f"[INFO] Refreshed {refreshed} changed {media_type} titles")
+            except Exception as e:
+                print(f"[ERROR] Changes refresher ({media_type}): {e}")
+        await asyncio.sleep(interval)
+
+
+# --- Search ---
+
+# TMDB search pages keyed by (normalized query, page)
+search_cache = TTLCache(ttl=settings.SEARCH_CACHE_SECONDS, maxsize=512)
+# Prefetches issued per session in the current minute
+prefetch_budget = TTLCache(ttl=60, maxsize=4096)
+# Running prefetches by search key; a request for the same page waits for it instead of calling TMDB again
+_prefetch_in_flight: Dict[Tuple[str, int], asyncio.Task] = {}
+
+def _search_key(query: str, page: int) -> Tuple[str, int]:
+    return (" ".join(query.lower().split()), page)
+
+async def _fetch_search_page(query: str, page: int, service: Optional[TMDBService] = None) -> Dict[str, Any]:
+    own_service = service is None
+    service = service or TMDBService()
+    try:
+        data = await service.search_multi(query, page)
+    finally:
+        if own_service:
+            await service.close()
+
+    search_cache.set(_search_key(query, page), data)
+    return data
+
+async def get_search_page(query: str, page: int = 1, service: Optional[TMDBService] = None) -> Dict[str, Any]:
+    """
+    Returns a TMDB /search/multi page, served from the cache when a previous request or prefetch stored it.
+    """
+    key = _search_key(query, page)
+    data = search_cache.get(key)
+    if data is not None:
+        return data
+
+    task = _prefetch_in_flight.get(key)
+    if task is not None:
+        # Shielded so a request that goes away doesn't cancel the prefetch; a failed prefetch returns None
+        data = await asyncio.shield(task)
+        if data is not None:
+            return data
+
+    return await _fetch_search_page(query, page, service)
+
+async def _prefetch(query: str, page: int) -> Optional[Dict[str, Any]]:
+    try:
+        return await _fetch_search_page(query, page)
+    except Exception as e:
+        print(f"[WARN] Search prefetch failed for '{query}' page {page}: {e}")
+        return None
+    finally:
+        _prefetch_in_flight.pop(_search_key(query, page), None)
+
+def prefetch_search_page(session_key: str, query: str, page: int, total_pages: int) -> bool:
+    """
+    Starts warming `page` so the next infinite-scroll request is served from the cache, unless it is cached,
+    already in flight, out of range or over this session's budget. Returns whether a prefetch was started.
+    """
+    key = _search_key(query, page)
+    if page > total_pages or page > settings.SEARCH_PREFETCH_MAX_PAGE:
+        return False
+    if key in search_cache or key in _prefetch_in_flight:
+        return False
+
+    if prefetch_budget.get(session_key, 0) >= settings.SEARCH_PREFETCH_PER_MINUTE:
+        return False
+
+    prefetch_budget.incr(session_key)
+    # Registered before this request returns, so the scroll request that follows always finds it
+    _prefetch_in_flight[key] = asyncio.create_task(_prefetch(query, page))
+    return True
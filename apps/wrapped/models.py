@@ -0,0 +1,12 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+class YearReview(SQLModel, table=True):
+    """
+    A user's year-in-review report, generated offline by the batch job (apps/wrapped/tasks.py) and served as-is.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    year: int = Field(primary_key=True)
+    document: str # JSON, see build_year_review()
+    user_version: int = 0 # Library version the report was computed from
+    computed_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,56 @@
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from sqlmodel import Session
+from apps.auth.deps import require_user
+from apps.auth.models import User
+from apps.core.templating import templates
+from apps.wrapped.services import YearReviewService
+from apps.wrapped.tasks import claim_year_review, run_year_review
+from database import get_session
+
+router = APIRouter(prefix="/wrapped", tags=["wrapped"])
+
+# Years a report can cover; the year's date range must stay within what `date` can represent
+MIN_YEAR, MAX_YEAR = 1900, 9998
+
+def get_service(session: Session = Depends(get_session)) -> YearReviewService:
+    return YearReviewService(session)
+
+@router.get("/")
+def latest_review(user: User = Depends(require_user), service: YearReviewService = Depends(get_service)):
+    # Last year's report until December, when the current year's is worth a look
+    today = datetime.utcnow().date()
+    years = service.get_years(user.id)
+    default = today.year if today.month == 12 else today.year - 1
+    year = default if default in years or not years else years[0]
+    return RedirectResponse(url=f"/wrapped/{year}", status_code=303)
+
+@router.get("/{year}", response_class=HTMLResponse)
+def year_review(
+    request: Request,
+    year: int,
+    background_tasks: BackgroundTasks,
+    user: User = Depends(require_user),
+    service: YearReviewService = Depends(get_service)
+):
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        return Response(status_code=404)
+
+    # Served from the stored document; the batch job keeps it current. A report nobody generated yet
+    # (e.g. a year the batch did not cover) is computed once in the background while the page polls.
+    review = service.get_review(user.id, year)
+    has_activity = review is not None or service.has_activity(user.id, year)
+    if review is None and has_activity:
+        token = claim_year_review(user.id, year)
+        if token:
+            background_tasks.add_task(run_year_review, user.id, year, token)
+
+    return templates.TemplateResponse("wrapped/index.html", {
+        "request": request,
+        "user": user,
+        "year": year,
+        "years": service.get_years(user.id),
+        "review": review,
+        "has_activity": has_activity
+    })
@@ -0,0 +1,226 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+import orjson
+from sqlalchemy import func
+from sqlmodel import select
+from apps.core.base_service import BaseService
+from apps.tracker.analytics import MOVIE_WATCHED_STATUSES, watch_minutes, watch_streaks
+from apps.tracker.models import (
+    Media, UserMedia, EpisodeActivity, Genre, Person, MediaCredit, ActivityDay, ActivityGenreMonth, DataVersion
+)
+from apps.wrapped.models import YearReview
+
+TOP_GENRES = 5
+TOP_ACTORS = 5
+TOP_TITLES = 5
+TOP_EPISODES = 5
+# Only leading roles count towards "top actors"
+ACTOR_BILLING_LIMIT = 5
+
+class YearReviewService(BaseService):
+
+    def build_year_review(self, user_id: int, year: int) -> Dict[str, Any]:
+        """
+        Computes the report document: totals, top genres, top actors, top titles, the most-binged show and
+        the highest-rated episodes of `year`. Reads the activity aggregates where they suffice and the raw
+        history only for the title-level sections.
+        """
+        first_day, last_day = date(year, 1, 1), date(year, 12, 31)
+        start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+        days = self.session.exec(
+            select(ActivityDay.day, ActivityDay.episodes, ActivityDay.movies, ActivityDay.minutes).where(
+                ActivityDay.user_id == user_id, ActivityDay.day >= first_day, ActivityDay.day <= last_day
+            ).order_by(ActivityDay.day)
+        ).all()
+        months: Dict[int, int] = defaultdict(int)
+        for day, _, _, minutes in days:
+            months[day.month] += minutes
+        busiest_month = max(months, key=months.get) if months else None
+
+        genre_rows = self.session.exec(
+            select(Genre.name, func.sum(ActivityGenreMonth.minutes).label("minutes")).join(
+                Genre, Genre.id == ActivityGenreMonth.genre_id
+            ).where(
+                ActivityGenreMonth.user_id == user_id,
+                ActivityGenreMonth.month >= first_day, ActivityGenreMonth.month <= last_day
+            ).group_by(Genre.name).order_by(func.sum(ActivityGenreMonth.minutes).desc()).limit(TOP_GENRES)
+        ).all()
+        total_minutes = sum(row[3] for row in days)
+
+        titles = self._watched_titles(user_id, start, end)
+        top_titles = sorted(titles.values(), key=lambda title: title["minutes"], reverse=True)[:TOP_TITLES]
+
+        return {
+            "year": year,
+            "totals": {
+                "minutes": total_minutes,
+                "hours": round(total_minutes / 60),
+                "episodes": sum(row[1] for row in days),
+                "movies": sum(row[2] for row in days),
+                "active_days": len(days),
+                "longest_streak": watch_streaks([row[0] for row in days], last_day)[0],
+                "busiest_month": date(year, busiest_month, 1).strftime("%B") if busiest_month else None,
+            },
+            "top_genres": [
+                {"name": name, "minutes": minutes, "share": round(100 * minutes / (total_minutes or 1))}
+                for name, minutes in genre_rows
+            ],
+            "top_actors": self._top_actors(titles),
+            "top_titles": top_titles,
+            "most_binged": self._most_binged(user_id, start, end),
+            "top_episodes": self._top_episodes(user_id, start, end),
+        }
+
+    def _watched_titles(self, user_id: int, start: datetime, end: datetime) -> Dict[int, Dict[str, Any]]:
+        """
+        {Media.id: title info + watch minutes} for every title with activity in [start, end).
+        """
+        counts: Dict[int, int] = dict(self.session.exec(
+            select(UserMedia.media_id, func.count(EpisodeActivity.id)).join(
+                UserMedia, UserMedia.id == EpisodeActivity.user_media_id
+            ).where(
+                UserMedia.user_id == user_id, EpisodeActivity.status == "watched",
+                EpisodeActivity.watched_at >= start, EpisodeActivity.watched_at < end
+            ).group_by(UserMedia.media_id)
+        ).all())
+        for media_id in self.session.exec(
+            select(UserMedia.media_id).join(Media, Media.id == UserMedia.media_id).where(
+                UserMedia.user_id == user_id, Media.media_type == "movie",
+                UserMedia.status.in_(MOVIE_WATCHED_STATUSES),
+                func.coalesce(UserMedia.watched_at, UserMedia.updated_at) >= start,
+                func.coalesce(UserMedia.watched_at, UserMedia.updated_at) < end
+            )
+        ).all():
+            counts[media_id] = counts.get(media_id, 0) + 1
+        if not counts:
+            return {}
+
+        rows = self.session.exec(
+            select(Media.id, Media.tmdb_id, Media.media_type, Media.title, Media.poster_path, Media.runtime).where(
+                Media.id.in_(list(counts))
+            )
+        ).all()
+        return {
+            media_id: {
+                "tmdb_id": tmdb_id, "media_type": media_type, "title": title, "poster_path": poster_path,
+                "count": counts[media_id], "minutes": counts[media_id] * watch_minutes(media_type, runtime),
+            }
+            for media_id, tmdb_id, media_type, title, poster_path, runtime in rows
+        }
+
+    def _top_actors(self, titles: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Actors ranked by the watch minutes of the titles they lead.
+        """
+        if not titles:
+            return []
+        actors: Dict[int, Dict[str, Any]] = {}
+        for media_id, person_tmdb_id, name, profile_path in self.session.exec(
+            select(MediaCredit.media_id, Person.tmdb_id, Person.name, Person.profile_path).join(
+                Person, Person.id == MediaCredit.person_id
+            ).where(MediaCredit.media_id.in_(list(titles)), MediaCredit.billing_order < ACTOR_BILLING_LIMIT)
+        ).all():
+            actor = actors.setdefault(person_tmdb_id, {
+                "tmdb_id": person_tmdb_id, "name": name, "profile_path": profile_path, "minutes": 0, "titles": 0
+            })
+            actor["minutes"] += titles[media_id]["minutes"]
+            actor["titles"] += 1
+        return sorted(actors.values(), key=lambda actor: (actor["minutes"], actor["titles"]), reverse=True)[:TOP_ACTORS]
+
+    def _most_binged(self, user_id: int, start: datetime, end: datetime) -> Optional[Dict[str, Any]]:
+        """
+        The show with the most episodes watched on a single day.
+        """
+        day = func.date(EpisodeActivity.watched_at)
+        episodes = func.count(EpisodeActivity.id)
+        row = self.session.exec(
+            select(Media.tmdb_id, Media.title, Media.poster_path, day.label("day"), episodes.label("episodes")).join(
+                UserMedia, UserMedia.id == EpisodeActivity.user_media_id
+            ).join(Media, Media.id == UserMedia.media_id).where(
+                UserMedia.user_id == user_id, EpisodeActivity.status == "watched",
+                EpisodeActivity.watched_at >= start, EpisodeActivity.watched_at < end
+            ).group_by(Media.id, day).order_by(episodes.desc(), day).limit(1)
+        ).first()
+        if row is None:
+            return None
+        return dict(row._mapping)
+
+    def _top_episodes(self, user_id: int, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        rows = self.session.exec(
+            select(
+                Media.tmdb_id, Media.title, EpisodeActivity.season_number, EpisodeActivity.episode_number,
+                EpisodeActivity.rating
+            ).join(UserMedia, UserMedia.id == EpisodeActivity.user_media_id).join(
+                Media, Media.id == UserMedia.media_id
+            ).where(
+                UserMedia.user_id == user_id, EpisodeActivity.rating.is_not(None),
+                EpisodeActivity.watched_at >= start, EpisodeActivity.watched_at < end
+            ).order_by(EpisodeActivity.rating.desc(), EpisodeActivity.watched_at).limit(TOP_EPISODES)
+        ).all()
+        return [dict(row._mapping) for row in rows]
+
+    # --- Stored reports ---
+
+    def get_review(self, user_id: int, year: int) -> Optional[Dict[str, Any]]:
+        review = self.session.get(YearReview, (user_id, year))
+        return orjson.loads(review.document) if review else None
+
+    def has_activity(self, user_id: int, year: int) -> bool:
+        return self.session.exec(
+            select(ActivityDay.day).where(
+                ActivityDay.user_id == user_id, ActivityDay.day >= date(year, 1, 1), ActivityDay.day <= date(year, 12, 31)
+            ).limit(1)
+        ).first() is not None
+
+    def get_years(self, user_id: int) -> List[int]:
+        """
+        Years with any activity, most recent first.
+        """
+        first, last = self.session.exec(
+            select(func.min(ActivityDay.day), func.max(ActivityDay.day)).where(ActivityDay.user_id == user_id)
+        ).one()
+        if first is None:
+            return []
+        first, last = date.fromisoformat(str(first)), date.fromisoformat(str(last))
+        return list(range(last.year, first.year - 1, -1))
+
+    def stale_user_ids(self, year: int) -> Dict[int, int]:
+        """
+        Users with activity in `year` whose report is missing or was computed from an older library version.
+        Returns {user_id: current library version}.
+        """
+        user_ids = self.session.exec(
+            select(ActivityDay.user_id).where(
+                ActivityDay.day >= date(year, 1, 1), ActivityDay.day <= date(year, 12, 31)
+            ).distinct()
+        ).all()
+        versions = {
+            int(key.split(":", 1)[1]): version
+            for key, version in self.session.exec(
+                select(DataVersion.key, DataVersion.version).where(DataVersion.key.like("user:%"))
+            ).all()
+        }
+        stored = dict(self.session.exec(
+            select(YearReview.user_id, YearReview.user_version).where(YearReview.year == year)
+        ).all())
+        return {
+            user_id: versions.get(user_id, 0)
+            for user_id in user_ids
+            if stored.get(user_id) != versions.get(user_id, 0)
+        }
+
+    def get_user_version(self, user_id: int) -> int:
+        row = self.session.get(DataVersion, f"user:{user_id}")
+        return row.version if row else 0
+
+    def store(self, user_id: int, year: int, document: bytes, user_version: int) -> None:
+        """
+        Saves a serialized report inside the current transaction; the caller commits.
+        """
+        review = self.session.get(YearReview, (user_id, year)) or YearReview(user_id=user_id, year=year, document="")
+        review.document = document.decode()
+        review.user_version = user_version
+        review.computed_at = datetime.utcnow()
+        self.session.add(review)
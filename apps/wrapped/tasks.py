@@ -0,0 +1,77 @@
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import orjson
+from sqlmodel import Session
+from database import engine
+from apps.core.leases import acquire_lease, release_lease
+from apps.wrapped.services import YearReviewService
+from config import settings
+
+# Users per worker task: large enough to amortize the process round trip, small enough to spread evenly
+USERS_PER_TASK = 25
+
+# How long a queued on-demand report blocks others for the same user and year if its worker dies before finishing
+REVIEW_CLAIM_SECONDS = 300
+
+def _init_worker() -> None:
+    # Forked workers must not reuse the parent's pooled SQLite connections
+    engine.dispose(close=False)
+
+def build_reviews(user_ids: Sequence[int], year: int) -> List[Tuple[int, bytes]]:
+    """
+    Computes the serialized reports of a chunk of users. Runs inside a worker process; read-only,
+    the parent stores the results so SQLite only ever sees one writer.
+    """
+    with Session(engine) as session:
+        service = YearReviewService(session)
+        return [(user_id, orjson.dumps(service.build_year_review(user_id, year))) for user_id in user_ids]
+
+def generate_year_reviews(year: int, user_ids: Optional[Sequence[int]] = None, workers: Optional[int] = None) -> int:
+    """
+    Precomputes and stores the `year` report of every user whose report is missing or stale (or of `user_ids`),
+    spreading the users over a process pool. Returns the number of reports written.
+    """
+    with Session(engine) as session:
+        service = YearReviewService(session)
+        if user_ids is None:
+            pending: Dict[int, int] = service.stale_user_ids(year)
+        else:
+            pending = {user_id: service.get_user_version(user_id) for user_id in user_ids}
+    if not pending:
+        return 0
+
+    users = list(pending)
+    chunks = [users[start:start + USERS_PER_TASK] for start in range(0, len(users), USERS_PER_TASK)]
+    workers = min(workers or settings.YEAR_REVIEW_WORKERS or os.cpu_count() or 1, len(chunks))
+
+    def store(results: List[Tuple[int, bytes]]) -> None:
+        with Session(engine) as session:
+            service = YearReviewService(session)
+            for user_id, document in results:
+                service.store(user_id, year, document, pending[user_id])
+            session.commit()
+
+    if workers <= 1:
+        for chunk in chunks:
+            store(build_reviews(chunk, year))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            for results in executor.map(build_reviews, chunks, [year] * len(chunks)):
+                store(results)
+    return len(users)
+
+def claim_year_review(user_id: int, year: int) -> Optional[str]:
+    """
+    Claims the on-demand build of a report nobody generated yet. Returns the claim token, or None when a request
+    on any worker already queued it, so the page polling while it runs doesn't queue another build.
+    """
+    token = uuid.uuid4().hex
+    return token if acquire_lease(f"wrapped:{user_id}:{year}", token, REVIEW_CLAIM_SECONDS) else None
+
+def run_year_review(user_id: int, year: int, token: str) -> None:
+    try:
+        generate_year_reviews(year, [user_id], 1)
+    finally:
+        release_lease(f"wrapped:{user_id}:{year}", token)
@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "TIB Watch"
     SECRET_KEY: str = os.getenv("SECRET_KEY", "watch_secret_key_123")
     ALGORITHM: str = "HS256"
+    BUILD_ID: Optional[str] = None # Release identifier for ETags (e.g. the git SHA); defaults to a hash of apps/, templates/ and static/
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///data/tib_watch.db")
@@ -17,6 +18,54 @@ class Settings(BaseSettings):
     TMDB_API_KEY: str = os.getenv("TMDB_API_KEY", "")
     TMDB_BASE_URL: str = "https://api.themoviedb.org/3"
     TMDB_IMAGE_URL: str = "https://image.tmdb.org/t/p/w500" # Common size
+    TMDB_IMAGE_BASE_URL: str = "https://image.tmdb.org/t/p" # Origin for the /img proxy; point at a local stand-in in tests
+    TMDB_RECORD_DIR: Optional[str] = None # Record mode: save TMDB responses (2xx and 404) here as fixtures for scripts/tmdb_standin.py
+
+    # Local storage (images, caches)
+    DATA_DIR: str = "data"
+    IMAGE_WORKERS: int = 2
+    PROFILE_IMAGE_MAX_BYTES: int = 8 * 1024 * 1024
+    IMAGE_ORIGIN_MAX_BYTES: int = 20 * 1024 * 1024 # Larger upstream files are refused instead of buffered
+    FRAGMENT_CACHE_SECONDS: int = 6 * 3600
+
+    # Background jobs
+    TRENDING_REFRESH_SECONDS: int = 900
+    TMDB_BACKGROUND_REQUESTS_PER_SECOND: float = 4 # Whole deployment: only the lease holder makes background TMDB requests
+    BACKGROUND_LEASE_SECONDS: int = 60 # One worker holds the background-jobs lease; another takes over this long after it dies
+    TRENDING_SNAPSHOT_CACHE_SECONDS: int = 60 # Workers re-read the stored trending snapshot this often
+
+    # Auth
+    USER_CACHE_SECONDS: int = 60
+    USER_SESSION_CLAIM: bool = True # Carry a minimal user claim in the signed session so partials skip the user lookup
+    USER_CLAIM_MAX_AGE: int = 15 * 60
+
+    # Search
+    SEARCH_CACHE_SECONDS: int = 300
+    SEARCH_PREFETCH_PER_MINUTE: int = 10 # Per session, so infinite scroll can't amplify upstream load
+    SEARCH_PREFETCH_MAX_PAGE: int = 10
+
+    # History import
+    IMPORT_MAX_BYTES: int = 50 * 1024 * 1024
+    IMPORT_BATCH_SIZE: int = 200 # Rows per transaction
+    IMPORT_CONCURRENCY: int = 8 # TMDB requests in flight per import
+    IMPORT_HEARTBEAT_SECONDS: int = 30 # Running imports touch their job this often
+    IMPORT_STALE_SECONDS: int = 180 # A job without a heartbeat for this long lost its process and is failed
+
+    # Recommendations
+    RECOMMENDATION_REFRESH_SECONDS: int = 600 # How often the job looks for users whose library changed
+    RECOMMENDATION_MAX_AGE_SECONDS: int = 24 * 3600 # Recompute everyone at least daily so new catalog titles show up
+    RECOMMENDATIONS_PER_USER: int = 50
+
+    # Year in review
+    YEAR_REVIEW_WORKERS: int = 0 # Processes for the batch job; 0 = one per CPU
+
+    # Airing shows
+    AIRING_REFRESH_SECONDS: int = 900 # How often the refresher looks for due shows
+    AIRING_REFRESH_BATCH_SIZE: int = 50 # Shows re-read per cycle, most urgent first
+    AIRING_REFRESH_MAX_AGE_SECONDS: int = 3 * 24 * 3600 # Re-read running shows at least this often (daily once the next episode aired)
+
+    # TMDB changes feed
+    CHANGES_REFRESH_SECONDS: int = 3600 # One request per media type when caught up
     
     # Auth0
     AUTH0_DOMAIN: Optional[str] = os.getenv("AUTH0_DOMAIN")
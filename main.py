@@ -1,8 +1,9 @@
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-from contextlib import asynccontextmanager
+from apps.core.templating import templates
+from contextlib import asynccontextmanager, suppress
+import asyncio
 import uvicorn
 import os
 from starlette.middleware.sessions import SessionMiddleware
@@ -11,11 +12,43 @@ from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from database import create_db_and_tables
 from apps.auth.router import router as auth_router
 from apps.tracker.router import router as tracker_router
+from apps.tracker.api_router import router as api_router
+from apps.images.router import router as images_router
+from apps.images.services import shutdown_executor
+from apps.core.compression import CompressionMiddleware
+from apps.core.body_limit import BodySizeLimitMiddleware, FORM_OVERHEAD_BYTES
+from apps.core.leases import run_as_leader, BACKGROUND_JOBS_LEASE
+from apps.core.static_assets import build_static_assets, PrecompressedStaticFiles, BUILD_DIR, ASSETS_URL
+from apps.tracker.tasks import trending_refresher, airing_refresher, changes_refresher
+from apps.recommendations.router import router as recommendations_router
+from apps.recommendations.tasks import recommendation_refresher
+from apps.imports.router import router as imports_router
+from apps.imports.services import import_reaper
+from apps.wrapped.router import router as wrapped_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    build_static_assets()
+    # Every worker starts this, but only the one holding the lease runs the jobs, so TMDB traffic and
+    # background writes don't multiply with --workers
+    background_jobs = asyncio.create_task(run_as_leader(BACKGROUND_JOBS_LEASE, [
+        # Keeps the discover page's trending snapshots current so user requests never wait on TMDB
+        trending_refresher,
+        # Recomputes stored recommendations for users whose library changed
+        recommendation_refresher,
+        # Keeps running shows (episode counts, upcoming episodes) current
+        airing_refresher,
+        # Re-reads cached titles TMDB reports as edited
+        changes_refresher,
+        # Fails imports whose worker died mid-run
+        import_reaper,
+    ]))
     yield
+    background_jobs.cancel()
+    with suppress(asyncio.CancelledError):
+        await background_jobs
+    shutdown_executor()
 
 app = FastAPI(title="TIB Watch", lifespan=lifespan)
 
@@ -24,14 +57,27 @@ app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=["*"])
 from config import settings
 # Use settings.SECRET_KEY to ensure consistency
 app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY, https_only=False, same_site="lax")
+# Reject oversized uploads before Starlette spools them to disk
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    "/auth/profile": settings.PROFILE_IMAGE_MAX_BYTES + FORM_OVERHEAD_BYTES,
+    "/imports/": settings.IMPORT_MAX_BYTES + FORM_OVERHEAD_BYTES,
+})
+# Outermost so every HTML/JSON response above the threshold is compressed
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 # Static & Templates
 app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# Fingerprinted, precompressed copies of static/ (built at startup), linked via static_url()
+app.mount(ASSETS_URL, PrecompressedStaticFiles(directory=BUILD_DIR, check_dir=False), name="assets")
 
 # Routers
 app.include_router(auth_router)
 app.include_router(tracker_router)
+app.include_router(api_router)
+app.include_router(images_router)
+app.include_router(recommendations_router)
+app.include_router(imports_router)
+app.include_router(wrapped_router)
 
 @app.get("/", response_class=HTMLResponse)
 def home(request: Request):
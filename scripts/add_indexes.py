@@ -0,0 +1,21 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel
+from database import engine
+import apps.tracker.models  # noqa: F401 - registers tracker tables on the metadata
+
+def add_indexes():
+    # create_all() only creates indexes for brand new tables, so existing databases
+    # need the composite indexes declared in __table_args__ created explicitly.
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+                print(f"Ensured index {index.name} on {table.name}")
+            except Exception as e:
+                print(f"Could not create index {index.name}: {e}")
+
+if __name__ == "__main__":
+    add_indexes()
@@ -0,0 +1,25 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, Session, select
+from database import engine
+from apps.tracker.models import UserMedia
+from apps.tracker.analytics import rebuild_user_activity
+
+# Builds ActivityDay/ActivityGenreMonth for history recorded before the aggregates existed.
+# Safe to re-run: each user's rows are recomputed from scratch (e.g. after Media.runtime or genres changed).
+
+def backfill():
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        user_ids = session.exec(select(UserMedia.user_id).distinct()).all()
+        print(f"Rebuilding watch activity for {len(user_ids)} users...")
+        for user_id in user_ids:
+            rebuild_user_activity(session, user_id)
+            session.commit()
+        print("Done.")
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,55 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, Session, select
+from database import engine
+from apps.tracker.models import Media, UserMedia, CatalogEpisode
+from apps.tracker.services import TrackerService
+
+# Fills CatalogEpisode for shows someone is watching, so the continue-watching rail has something to join
+# against before those seasons are next opened (opening a season stores it too).
+FETCH_CONCURRENCY = 5
+
+async def fetch_seasons(service: TrackerService, shows):
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch(media):
+        async with semaphore:
+            try:
+                details = await service.tmdb.get_details("tv", media.tmdb_id)
+                numbers = [season.get("season_number") for season in details.get("seasons", [])]
+                seasons = [await service.tmdb.get_season_details(media.tmdb_id, number) for number in numbers if number]
+                return media.id, seasons
+            except Exception as e:
+                print(f"[WARN] Could not fetch tv/{media.tmdb_id}: {e}")
+                return media.id, []
+
+    try:
+        return await asyncio.gather(*(fetch(media) for media in shows))
+    finally:
+        await service.tmdb.close()
+
+def backfill():
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        service = TrackerService(session)
+        cataloged = select(CatalogEpisode.media_id).distinct()
+        watching = select(UserMedia.media_id).where(UserMedia.status == "watching")
+        shows = session.exec(
+            select(Media).where(Media.media_type == "tv", Media.id.in_(watching), Media.id.not_in(cataloged))
+        ).all()
+        print(f"Fetching seasons for {len(shows)} shows...")
+
+        filled = 0
+        for media_id, seasons in asyncio.run(fetch_seasons(service, shows)):
+            for season in seasons:
+                service.sync_season_catalog(media_id, season)
+            filled += bool(seasons)
+        session.commit()
+        print(f"Stored episode lists for {filled} shows.")
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,58 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, Session, select
+from database import engine
+from apps.tracker.models import Media, MediaCredit, MediaKeyword
+from apps.tracker.services import TrackerService
+from scripts.add_indexes import add_indexes
+
+# Fills Person/MediaCredit and Keyword/MediaKeyword for titles cached before they were stored.
+# Media.cast only has names and keywords were never kept, so both are re-read from TMDB.
+# (Opening a title's details page also backfills it lazily.)
+FETCH_CONCURRENCY = 5
+
+async def fetch_details(service: TrackerService, media_items):
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch(media):
+        async with semaphore:
+            try:
+                return media.id, await service.tmdb.get_details(media.media_type, media.tmdb_id)
+            except Exception as e:
+                print(f"[WARN] Could not fetch {media.media_type}/{media.tmdb_id}: {e}")
+                return media.id, None
+
+    try:
+        return await asyncio.gather(*(fetch(media) for media in media_items))
+    finally:
+        await service.tmdb.close()
+
+def backfill():
+    SQLModel.metadata.create_all(engine)
+    add_indexes()
+
+    with Session(engine) as session:
+        service = TrackerService(session)
+        credited = select(MediaCredit.media_id).distinct()
+        keyworded = select(MediaKeyword.media_id).distinct()
+        missing = session.exec(
+            select(Media).where(Media.id.not_in(credited) | Media.id.not_in(keyworded))
+        ).all()
+        print(f"Fetching credits and keywords for {len(missing)} titles...")
+
+        results = asyncio.run(fetch_details(service, missing))
+        filled = 0
+        for media_id, details in results:
+            if not details:
+                continue
+            service.sync_media_credits(media_id, details.get("credits"))
+            service.sync_media_keywords(media_id, details.get("keywords"))
+            filled += 1
+        session.commit()
+        print(f"Stored credits and keywords for {filled} titles.")
+
+if __name__ == "__main__":
+    backfill()
@@ -0,0 +1,38 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, text
+from database import engine
+from scripts.add_indexes import add_indexes
+
+# Adds EpisodeActivity.user_id (denormalized from UserMedia for the history timeline index),
+# fills it for existing rows in id ranges so no single transaction locks the table for long,
+# then creates the timeline index.
+BATCH_SIZE = 50_000
+
+def migrate():
+    with engine.begin() as connection:
+        columns = [row.name for row in connection.execute(text("PRAGMA table_info(episodeactivity)"))]
+        if "user_id" not in columns:
+            print("Adding 'user_id' column to 'episodeactivity' table...")
+            connection.execute(text("ALTER TABLE episodeactivity ADD COLUMN user_id INTEGER REFERENCES user (id)"))
+
+    with engine.connect() as connection:
+        max_id = connection.execute(text("SELECT COALESCE(MAX(id), 0) FROM episodeactivity")).scalar()
+
+    filled = 0
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        with engine.begin() as connection:
+            filled += connection.execute(text(
+                "UPDATE episodeactivity SET user_id = "
+                "(SELECT usermedia.user_id FROM usermedia WHERE usermedia.id = episodeactivity.user_media_id) "
+                "WHERE user_id IS NULL AND id >= :start AND id < :end"
+            ), {"start": start, "end": start + BATCH_SIZE}).rowcount
+    print(f"Filled user_id on {filled} episode activities.")
+
+    SQLModel.metadata.create_all(engine)
+    add_indexes()
+
+if __name__ == "__main__":
+    migrate()
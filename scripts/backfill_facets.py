@@ -0,0 +1,75 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, Session, select, text
+from database import engine
+from apps.tracker.models import Media
+from apps.tracker.services import TrackerService
+from scripts.add_indexes import add_indexes
+
+# Normalizes genres/countries/release year for media cached before the facet tables existed.
+# By default it only splits the stored strings (origin_country there is just the first country);
+# pass --fetch to re-read full details from TMDB for every title missing a release year.
+FETCH_CONCURRENCY = 5
+
+def migrate():
+    with engine.begin() as connection:
+        columns = [row.name for row in connection.execute(text("PRAGMA table_info(media)"))]
+        if "release_year" not in columns:
+            print("Adding 'release_year' column to 'media' table...")
+            connection.execute(text("ALTER TABLE media ADD COLUMN release_year INTEGER"))
+
+    # New facet tables, then the indexes create_all() skips on existing tables
+    SQLModel.metadata.create_all(engine)
+    add_indexes()
+
+async def fetch_details(service: TrackerService, media_items):
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch(media):
+        async with semaphore:
+            try:
+                return media.id, await service.tmdb.get_details(media.media_type, media.tmdb_id)
+            except Exception as e:
+                print(f"[WARN] Could not fetch {media.media_type}/{media.tmdb_id}: {e}")
+                return media.id, None
+
+    try:
+        return dict(await asyncio.gather(*(fetch(media) for media in media_items)))
+    finally:
+        await service.tmdb.close()
+
+def backfill(fetch: bool = False):
+    migrate()
+
+    with Session(engine) as session:
+        service = TrackerService(session)
+        media_items = session.exec(select(Media)).all()
+
+        details = {}
+        if fetch:
+            missing = [media for media in media_items if media.release_year is None]
+            print(f"Fetching TMDB details for {len(missing)} titles...")
+            details = asyncio.run(fetch_details(service, missing))
+
+        for media in media_items:
+            data = details.get(media.id)
+            if data:
+                genres, countries, year = service.extract_facets(data)
+                if year:
+                    media.release_year = year
+                    session.add(media)
+            else:
+                genres = (media.genres or "").split(",")
+                countries = [media.origin_country] if media.origin_country else []
+            service.sync_media_facets(media.id, genres, countries)
+
+        # Dashboards are cached against the catalog version
+        service.bump_catalog_version()
+        session.commit()
+        print(f"Backfilled facets for {len(media_items)} titles.")
+
+if __name__ == "__main__":
+    backfill(fetch="--fetch" in sys.argv)
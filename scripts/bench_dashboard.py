@@ -0,0 +1,95 @@
+import sys
+import os
+import random
+import statistics
+import time
+import tracemalloc
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, Session, create_engine, select
+from apps.auth.models import User
+from apps.tracker.models import Media, UserMedia
+from apps.tracker.services import TrackerService
+
+# Compares the dashboard listing as full ORM entities (the previous implementation)
+# with the column-projected rows it now uses: time and peak Python memory per call.
+RUNS = 20
+STATUSES = ["watched", "watching", "plan_to_watch", "dropped"]
+
+def seed(session: Session, titles: int) -> int:
+    user = User(email="bench@example.com")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    session.add_all([
+        Media(
+            tmdb_id=i, media_type="movie" if i % 2 else "tv", title=f"Title {i}",
+            overview="Lorem ipsum dolor sit amet. " * 20, poster_path=f"/poster{i}.jpg",
+            genres="Drama,Comedy", cast="Actor A,Actor B,Actor C", runtime=100
+        )
+        for i in range(1, titles + 1)
+    ])
+    session.commit()
+
+    session.add_all([
+        UserMedia(
+            user_id=user.id, media_id=i, status=random.choice(STATUSES),
+            rating=7.5, comment="Some thoughts about this title. " * 10
+        )
+        for i in range(1, titles + 1)
+    ])
+    session.commit()
+    return user.id
+
+def orm_rows(service: TrackerService, user_id: int):
+    results = service.session.exec(
+        select(UserMedia, Media).join(Media).where(UserMedia.user_id == user_id)
+    ).all()
+    grouped = {}
+    for user_media, media in results:
+        grouped.setdefault(user_media.status, []).append({"media": media, "user_media": user_media})
+    for items in grouped.values():
+        items.sort(key=lambda x: x["user_media"].updated_at, reverse=True)
+    return grouped
+
+def projected_rows(service: TrackerService, user_id: int):
+    grouped = {}
+    for row in service.get_dashboard_rows(user_id):
+        grouped.setdefault(row.status, []).append(row)
+    return grouped
+
+def measure(engine, fn, user_id: int):
+    samples = []
+    for _ in range(RUNS):
+        # Fresh session each run, like a request: nothing cached in the identity map
+        with Session(engine) as session:
+            service = TrackerService(session)
+            start = time.perf_counter()
+            fn(service, user_id)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    with Session(engine) as session:
+        service = TrackerService(session)
+        tracemalloc.start()
+        fn(service, user_id)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return statistics.median(samples), peak / 1024
+
+def main():
+    random.seed(42)
+    print(f"{'Titles':<8} {'ORM (ms)':<10} {'ORM (KiB)':<11} {'Rows (ms)':<10} {'Rows (KiB)':<10}")
+    print("-" * 52)
+    for titles in (100, 1000, 5000):
+        engine = create_engine("sqlite://")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            user_id = seed(session, titles)
+
+        orm_ms, orm_kib = measure(engine, orm_rows, user_id)
+        rows_ms, rows_kib = measure(engine, projected_rows, user_id)
+        print(f"{titles:<8} {orm_ms:<10.2f} {orm_kib:<11.0f} {rows_ms:<10.2f} {rows_kib:<10.0f}")
+
+if __name__ == "__main__":
+    main()
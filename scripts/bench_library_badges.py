@@ -0,0 +1,78 @@
+import sys
+import os
+import random
+import statistics
+import time
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, Session, create_engine, select
+from apps.auth.models import User
+from apps.tracker.models import Media, UserMedia
+from apps.tracker.services import TrackerService
+
+# Benchmarks the batched "in your list" badge lookup against the naive
+# per-result lookup it replaces, on a throwaway in-memory database.
+TITLES = 20000
+TRACKED = 2000
+RUNS = 50
+
+def seed(session: Session) -> int:
+    user = User(email="bench@example.com")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    session.add_all([
+        Media(tmdb_id=i, media_type="movie" if i % 2 else "tv", title=f"Title {i}")
+        for i in range(1, TITLES + 1)
+    ])
+    session.commit()
+
+    session.add_all([
+        UserMedia(user_id=user.id, media_id=media_id, status="watched", rating=7.5)
+        for media_id in random.sample(range(1, TITLES + 1), TRACKED)
+    ])
+    session.commit()
+    return user.id
+
+def naive(session: Session, user_id: int, results):
+    for item in results:
+        media = session.exec(
+            select(Media).where(Media.tmdb_id == item["id"], Media.media_type == item["media_type"])
+        ).first()
+        user_media = None
+        if media:
+            user_media = session.exec(
+                select(UserMedia).where(UserMedia.user_id == user_id, UserMedia.media_id == media.id)
+            ).first()
+        item["library"] = {"status": user_media.status, "rating": user_media.rating} if user_media else None
+
+def timed(fn) -> float:
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    random.seed(42)
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        user_id = seed(session)
+        service = TrackerService(session)
+
+        print(f"{'Results':<10} {'Naive (ms)':<12} {'Batched (ms)':<12}")
+        print("-" * 36)
+        for size in (20, 50, 100):
+            tmdb_ids = random.sample(range(1, TITLES + 1), size)
+            results = [{"id": i, "media_type": "movie" if i % 2 else "tv"} for i in tmdb_ids]
+
+            naive_ms = timed(lambda: naive(session, user_id, [dict(r) for r in results]))
+            batched_ms = timed(lambda: service.annotate_library_status(user_id, [dict(r) for r in results]))
+            print(f"{size:<10} {naive_ms:<12.2f} {batched_ms:<12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import func
+from sqlmodel import Session, create_engine, select
+from apps.tracker.models import Media, UserMedia, EpisodeActivity
+from apps.tracker.services import TrackerService
+from scripts.generate_dataset import build_catalog, generate, scaled_sizes, season_payload
+
+# Times the tracker's hot read paths on generated datasets at several scales, for a typical (median)
+# user and the heaviest binge watcher. TMDB season payloads come from the generator's catalog in memory,
+# so get_season_context measures only the database work and the merge.
+#
+#   python scripts/bench_tracker.py --scales 1,10,100
+#
+# Datasets are generated once into --dir and reused; 100x takes several minutes and ~1 GB.
+RUNS = 20
+
+def pick_users(session: Session) -> Dict[str, Tuple[int, int]]:
+    """
+    {"median"/"heaviest": (user_id, tmdb_id of the user's most-watched show)} by watched episodes.
+    """
+    counts = session.exec(
+        select(EpisodeActivity.user_id, func.count()).group_by(EpisodeActivity.user_id).order_by(func.count())
+    ).all()
+    profiles = {}
+    for label, (user_id, _) in (("median", counts[len(counts) // 2]), ("heaviest", counts[-1])):
+        tmdb_id = session.exec(
+            select(Media.tmdb_id).join(UserMedia, UserMedia.media_id == Media.id).join(
+                EpisodeActivity, EpisodeActivity.user_media_id == UserMedia.id
+            ).where(UserMedia.user_id == user_id).group_by(Media.tmdb_id).order_by(func.count().desc()).limit(1)
+        ).one()
+        profiles[label] = (user_id, tmdb_id)
+    return profiles
+
+def measure(engine, call: Callable, seasons: Dict[int, object]) -> Tuple[float, float]:
+    """
+    (median, p95) milliseconds over RUNS calls, each on a fresh session like a request.
+    """
+    loop = asyncio.new_event_loop()
+    samples: List[float] = []
+    for _ in range(RUNS):
+        with Session(engine) as session:
+            service = TrackerService(session)
+
+            async def get_season_details(tv_id: int, season_number: int):
+                return season_payload(seasons[tv_id], season_number)
+            service.tmdb.get_season_details = get_season_details
+
+            start = time.perf_counter()
+            result = call(service)
+            if asyncio.iscoroutine(result):
+                loop.run_until_complete(result)
+            samples.append((time.perf_counter() - start) * 1000)
+            loop.run_until_complete(service.tmdb.close())
+    loop.close()
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of tracker read paths at several dataset scales.")
+    parser.add_argument("--scales", default="1,10,100")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dir", default="data/bench", help="Where generated datasets are kept between runs")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    print(f"{'Scale':<7} {'Episodes':>10}  {'User':<9} {'Method':<24} {'Median (ms)':>12} {'p95 (ms)':>10}")
+    print("-" * 78)
+    for scale in [float(value) for value in args.scales.split(",")]:
+        path = os.path.join(args.dir, f"tracker_{scale:g}x_seed{args.seed}.db")
+        if not os.path.exists(path):
+            print(f"[INFO] Generating {path}...")
+            generate(path, scale, args.seed, aggregates=False)
+
+        _, shows, movies = scaled_sizes(scale)
+        seasons = {title.tmdb_id: title for title in build_catalog(shows, movies, args.seed) if title.media_type == "tv"}
+        engine = create_engine(f"sqlite:///{path}")
+        with Session(engine) as session:
+            episodes = session.exec(select(func.count(EpisodeActivity.id))).one()
+            profiles = pick_users(session)
+
+        for label, (user_id, tmdb_id) in profiles.items():
+            calls = {
+                "get_dashboard_stats": lambda service: service.get_dashboard_stats(user_id),
+                "get_series_watch_stats": lambda service: service.get_series_watch_stats(user_id, tmdb_id),
+                "get_season_context": lambda service: service.get_season_context(user_id, tmdb_id, 1),
+            }
+            for name, call in calls.items():
+                median, p95 = measure(engine, call, seasons)
+                print(f"{scale:<7g} {episodes:>10}  {label:<9} {name:<24} {median:>12.2f} {p95:>10.2f}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
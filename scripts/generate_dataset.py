@@ -0,0 +1,380 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import argparse
+import json
+import random
+import time as clock
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from sqlalchemy import insert
+from sqlmodel import SQLModel, Session, create_engine
+from apps.auth.models import User
+from apps.tracker.models import (
+    Media, UserMedia, EpisodeActivity, CatalogEpisode, Genre, MediaGenre, Country, MediaCountry,
+    Person, MediaCredit, Keyword, MediaKeyword
+)
+from apps.tracker.analytics import rebuild_user_activity
+from apps.tracker.services import TrackerService
+
+# Reproducible synthetic database for scale testing: same --scale and --seed, same rows (timestamps are
+# relative to the generation day). Usage is heavy-tailed like the real thing: title popularity is Zipf-like,
+# and a Pareto "appetite" per user gives a few binge watchers with thousands of episodes while most users
+# track a handful of shows. Never touches the app's DATABASE_URL.
+#
+#   python scripts/generate_dataset.py data/bench_10x.db --scale 10
+
+# Sizes at --scale 1 (about 60k episode activities); everything grows linearly
+BASE_USERS = 100
+BASE_SHOWS = 300
+BASE_MOVIES = 600
+
+HISTORY_DAYS = 3 * 365
+INSERT_CHUNK = 50_000
+
+WORDS = [
+    "Silent", "Harbor", "Broken", "Crown", "Midnight", "Garden", "Iron", "River", "Lost", "Empire",
+    "Golden", "Signal", "Hidden", "North", "Glass", "Kingdom", "Winter", "Shadow", "Last", "City",
+]
+GENRES = [
+    {"id": 18, "name": "Drama"}, {"id": 35, "name": "Comedy"}, {"id": 80, "name": "Crime"},
+    {"id": 9648, "name": "Mystery"}, {"id": 10765, "name": "Sci-Fi & Fantasy"}, {"id": 28, "name": "Action"},
+    {"id": 16, "name": "Animation"}, {"id": 99, "name": "Documentary"},
+]
+COUNTRIES = ["US", "US", "US", "GB", "KR", "JP", "FR", "ES", "DE", "BR"]
+PEOPLE = 400
+KEYWORDS = 60
+SHOW_ID_BASE = 1000
+MOVIE_ID_BASE = 500000
+
+# --- Synthetic TMDB catalog ---
+# Payloads are derived from the TMDB id alone, so fixtures, the database and benchmarks always agree.
+
+@dataclass
+class Title:
+    tmdb_id: int
+    media_type: str
+    title: str
+    seasons: int = 0
+    episodes_per_season: int = 0
+    returning: bool = False
+
+    @property
+    def episodes(self) -> int:
+        return self.seasons * self.episodes_per_season
+
+def build_catalog(shows: int, movies: int, seed: int) -> List[Title]:
+    rng = random.Random(seed)
+    catalog = []
+    for index in range(shows):
+        catalog.append(Title(
+            SHOW_ID_BASE + index, "tv", " ".join(rng.sample(WORDS, 2)) + f" {index}",
+            seasons=min(1 + int(rng.expovariate(0.45)), 15),
+            episodes_per_season=rng.choice([6, 8, 10, 10, 12, 13, 22]),
+            returning=rng.random() < 0.25
+        ))
+    for index in range(movies):
+        catalog.append(Title(MOVIE_ID_BASE + index, "movie", "The " + " ".join(rng.sample(WORDS, 2)) + f" {index}"))
+    return catalog
+
+def details_payload(title: Title) -> Dict[str, Any]:
+    rng = random.Random(title.tmdb_id)
+    year = rng.randint(1995, 2024)
+    country = rng.choice(COUNTRIES)
+    keywords = [{"id": 7000 + k, "name": f"keyword {k}"} for k in rng.sample(range(KEYWORDS), 4)]
+    payload = {
+        "id": title.tmdb_id,
+        "overview": "A synthetic title generated for load testing. " * 3,
+        "poster_path": f"/{title.media_type}{title.tmdb_id}.jpg",
+        "backdrop_path": None,
+        "vote_average": round(rng.uniform(5, 9), 1),
+        "genres": rng.sample(GENRES, rng.randint(1, 3)),
+        "credits": {"cast": [
+            {"id": 90000 + person, "name": f"Actor {person}", "character": f"Role {order}", "profile_path": None}
+            for order, person in enumerate(rng.sample(range(PEOPLE), 8))
+        ]},
+    }
+    if title.media_type == "movie":
+        payload.update({
+            "title": title.title, "release_date": f"{year}-06-01", "runtime": rng.randint(85, 160),
+            "production_countries": [{"iso_3166_1": country}],
+            "keywords": {"keywords": keywords},
+        })
+    else:
+        payload.update({
+            "name": title.title, "first_air_date": f"{year}-01-15",
+            "status": "Returning Series" if title.returning else "Ended",
+            "origin_country": [country], "episode_run_time": [45],
+            "number_of_seasons": title.seasons, "number_of_episodes": title.episodes,
+            "seasons": [
+                {"season_number": n, "name": f"Season {n}", "episode_count": title.episodes_per_season, "air_date": f"{year + n - 1}-01-15"}
+                for n in range(1, title.seasons + 1)
+            ],
+            "next_episode_to_air": None,
+            "keywords": {"results": keywords},
+        })
+    return payload
+
+def season_payload(title: Title, season_number: int) -> Dict[str, Any]:
+    year = min(random.Random(title.tmdb_id).randint(1995, 2024) + season_number - 1, 2025)
+    return {
+        "season_number": season_number,
+        "name": f"Season {season_number}",
+        "episodes": [
+            {
+                "season_number": season_number, "episode_number": e, "name": f"Episode {e}",
+                "overview": "Things happen.", "air_date": f"{year}-{1 + (e - 1) // 4 % 12:02d}-{1 + 7 * ((e - 1) % 4):02d}",
+                "runtime": 45, "still_path": None, "vote_average": 7.5,
+            }
+            for e in range(1, title.episodes_per_season + 1)
+        ],
+    }
+
+# --- Database ---
+
+@dataclass
+class GeneratedUser:
+    user_id: int
+    email: str
+    shows: List[Title] = field(default_factory=list)
+    episodes: int = 0
+
+@dataclass
+class Dataset:
+    path: str
+    catalog: List[Title]
+    users: List[GeneratedUser]
+
+class BulkWriter:
+    """
+    Buffers rows per table and inserts them with executemany, INSERT_CHUNK rows at a time.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    def add(self, model, row: Dict[str, Any]) -> None:
+        rows = self.rows[model]
+        rows.append(row)
+        if len(rows) >= INSERT_CHUNK:
+            self.flush(model)
+
+    def flush(self, model=None) -> None:
+        for target in ([model] if model is not None else list(self.rows)):
+            rows = self.rows[target]
+            if rows:
+                self.connection.execute(insert(target.__table__), rows)
+                self.counts[target.__tablename__] += len(rows)
+                rows.clear()
+
+def _sample(rng: np.random.Generator, weights: np.ndarray, size: int) -> np.ndarray:
+    """
+    `size` distinct indexes drawn by weight. Oversamples with replacement and keeps first occurrences,
+    which is much cheaper than choice(replace=False, p=...) on large catalogs.
+    """
+    size = min(size, len(weights))
+    picks = np.empty(0, dtype=np.int64)
+    while len(picks) < size:
+        draws = np.concatenate([picks, rng.choice(len(weights), size=size * 2, p=weights)])
+        _, first = np.unique(draws, return_index=True)
+        picks = draws[np.sort(first)]
+    return picks[:size]
+
+def _zipf_weights(count: int, exponent: float = 0.9) -> np.ndarray:
+    weights = 1 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+def _rating(rng: np.random.Generator) -> float:
+    return float(np.clip(round(rng.normal(7.3, 1.4) * 2) / 2, 1, 10))
+
+def _write_catalog(writer: BulkWriter, catalog: List[Title], now: datetime) -> Dict[int, int]:
+    """
+    Media rows plus facets, credits, keywords and the episode catalog. Returns {catalog index: Media.id}.
+    """
+    genre_ids = {genre["name"]: index for index, genre in enumerate(GENRES, 1)}
+    for name, genre_id in genre_ids.items():
+        writer.add(Genre, {"id": genre_id, "name": name})
+    for code in sorted(set(COUNTRIES)):
+        writer.add(Country, {"code": code})
+    for person in range(PEOPLE):
+        writer.add(Person, {"id": person + 1, "tmdb_id": 90000 + person, "name": f"Actor {person}", "profile_path": None})
+    for keyword in range(KEYWORDS):
+        writer.add(Keyword, {"id": keyword + 1, "tmdb_id": 7000 + keyword, "name": f"keyword {keyword}"})
+
+    media_ids = {}
+    for index, title in enumerate(catalog):
+        media_id = media_ids[index] = index + 1
+        payload = details_payload(title)
+        writer.add(Media, {
+            "id": media_id, "tmdb_id": title.tmdb_id, "media_type": title.media_type,
+            "created_at": now, "refreshed_at": now, **TrackerService.media_fields(payload)
+        })
+        genres, countries, _ = TrackerService.extract_facets(payload)
+        for name in genres:
+            writer.add(MediaGenre, {"media_id": media_id, "genre_id": genre_ids[name]})
+        for code in countries:
+            writer.add(MediaCountry, {"media_id": media_id, "country_code": code})
+        for order, person in enumerate(payload["credits"]["cast"]):
+            writer.add(MediaCredit, {
+                "media_id": media_id, "person_id": person["id"] - 90000 + 1,
+                "character": person["character"], "billing_order": order
+            })
+        keywords = payload["keywords"].get("keywords") or payload["keywords"].get("results")
+        for keyword in keywords:
+            writer.add(MediaKeyword, {"media_id": media_id, "keyword_id": keyword["id"] - 7000 + 1})
+        for season_number in range(1, title.seasons + 1):
+            for episode in season_payload(title, season_number)["episodes"]:
+                writer.add(CatalogEpisode, {
+                    "media_id": media_id, "season_number": season_number, "episode_number": episode["episode_number"],
+                    "name": episode["name"], "air_date": date.fromisoformat(episode["air_date"]),
+                    "runtime": episode["runtime"], "still_path": None,
+                })
+    return media_ids
+
+def _watch_times(rng: np.random.Generator, episodes: int, appetite: float, now: datetime) -> List[datetime]:
+    """
+    Timestamps for watching `episodes` in order: sittings of several episodes (longer for bigger appetites)
+    separated by exponentially distributed gaps, placed somewhere in the last HISTORY_DAYS.
+    """
+    sizes = 1 + rng.poisson(appetite, size=episodes)
+    sitting = np.repeat(np.arange(episodes), sizes)[:episodes]
+    sittings = int(sitting[-1]) + 1
+    gaps = rng.exponential(4.0 / appetite, size=sittings)
+    gaps[0] = 0
+    days = np.cumsum(gaps)
+    if days[-1] > HISTORY_DAYS - 1:
+        days *= (HISTORY_DAYS - 1) / days[-1]
+    start = rng.uniform(0, HISTORY_DAYS - 1 - days[-1])
+    position = np.arange(episodes) - np.searchsorted(sitting, sitting)
+    # Evenings, one 45-minute episode after another
+    seconds = (start + days[sitting]) * 86400 + 19 * 3600 + position * 45 * 60 + rng.integers(0, 900, size=episodes)
+    origin = now - timedelta(days=HISTORY_DAYS)
+    return [origin + timedelta(seconds=float(offset)) for offset in seconds]
+
+def scaled_sizes(scale: float) -> Tuple[int, int, int]:
+    """
+    (users, shows, movies) at `scale`.
+    """
+    return tuple(max(1, round(base * scale)) for base in (BASE_USERS, BASE_SHOWS, BASE_MOVIES))
+
+def generate(path: str, scale: float = 1, seed: int = 42, aggregates: bool = True) -> Dataset:
+    """
+    Writes a fresh database at `path` and returns what was generated. Refuses to touch an existing file.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+
+    users, shows, movies = scaled_sizes(scale)
+    rng = np.random.default_rng(seed)
+    now = datetime.combine(date.today(), time.min)
+    catalog = build_catalog(shows, movies, seed)
+    show_indexes = [index for index, title in enumerate(catalog) if title.media_type == "tv"]
+    movie_indexes = [index for index, title in enumerate(catalog) if title.media_type == "movie"]
+    # Popularity follows catalog order after a seeded shuffle, so hits are spread across ids
+    show_weights = rng.permutation(_zipf_weights(len(show_indexes)))
+    movie_weights = rng.permutation(_zipf_weights(len(movie_indexes)))
+
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    generated: List[GeneratedUser] = []
+    with engine.connect() as connection:
+        # Throwaway file: no journal, no fsync
+        connection.exec_driver_sql("PRAGMA journal_mode=OFF")
+        connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        connection.commit()
+        with connection.begin():
+            writer = BulkWriter(connection)
+            media_ids = _write_catalog(writer, catalog, now)
+            user_media_id = 0
+            for index in range(users):
+                user = GeneratedUser(index + 1, f"user{index}@example.com")
+                writer.add(User, {
+                    "id": user.user_id, "email": user.email, "is_active": True,
+                    "created_at": now - timedelta(days=HISTORY_DAYS), "subscription_status": "free"
+                })
+                # Heavy tail: most users ~1-2, a few binge watchers far above
+                appetite = 1 + rng.pareto(1.5)
+
+                for pick in _sample(rng, show_weights, int(max(1, rng.lognormal(2.0, 0.7) * min(appetite, 6)))):
+                    title_index = show_indexes[pick]
+                    title = catalog[title_index]
+                    progress = int(title.episodes * min(1.0, rng.beta(0.7, 1.0) * appetite))
+                    if progress == 0:
+                        status = "plan_to_watch"
+                    elif progress == title.episodes:
+                        status = "awaiting_episodes" if title.returning else "finished"
+                    else:
+                        status = "abandoned" if rng.random() < 0.1 else "watching"
+
+                    user_media_id += 1
+                    watched_at = _watch_times(rng, progress, appetite, now) if progress else []
+                    updated_at = watched_at[-1] if watched_at else now - timedelta(days=float(rng.uniform(0, HISTORY_DAYS)))
+                    writer.add(UserMedia, {
+                        "id": user_media_id, "user_id": user.user_id, "media_id": media_ids[title_index],
+                        "status": status, "rating": _rating(rng) if progress and rng.random() < 0.4 else None,
+                        "comment": None, "created_at": watched_at[0] if watched_at else updated_at, "updated_at": updated_at,
+                        "watched_at": updated_at if status == "finished" else None,
+                    })
+                    for position, timestamp in enumerate(watched_at):
+                        writer.add(EpisodeActivity, {
+                            "user_media_id": user_media_id, "user_id": user.user_id,
+                            "season_number": position // title.episodes_per_season + 1,
+                            "episode_number": position % title.episodes_per_season + 1,
+                            "rating": _rating(rng) if rng.random() < 0.05 else None, "comment": None,
+                            "status": "watched", "watched_at": timestamp,
+                        })
+                    user.shows.append(title)
+                    user.episodes += progress
+
+                for pick in _sample(rng, movie_weights, int(rng.lognormal(2.7, 0.9))):
+                    watched = rng.random() < 0.7
+                    updated_at = now - timedelta(days=float(rng.uniform(0, HISTORY_DAYS)))
+                    user_media_id += 1
+                    writer.add(UserMedia, {
+                        "id": user_media_id, "user_id": user.user_id, "media_id": media_ids[movie_indexes[pick]],
+                        "status": "watched" if watched else "plan_to_watch",
+                        "rating": _rating(rng) if watched and rng.random() < 0.6 else None,
+                        "comment": None, "created_at": updated_at, "updated_at": updated_at,
+                        "watched_at": updated_at if watched else None,
+                    })
+                generated.append(user)
+            writer.flush()
+    print(f"[INFO] Wrote {dict(writer.counts)}")
+
+    if aggregates:
+        with Session(engine) as session:
+            for user in generated:
+                rebuild_user_activity(session, user.user_id)
+                if user.user_id % 100 == 0:
+                    session.commit()
+            session.commit()
+    engine.dispose()
+    return Dataset(path, catalog, generated)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic tracker database.")
+    parser.add_argument("path", help="SQLite file to create (must not exist)")
+    parser.add_argument("--scale", type=float, default=1, help=f"1 = {BASE_USERS} users, {BASE_SHOWS} shows, {BASE_MOVIES} movies")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-aggregates", action="store_true", help="Leave ActivityDay/ActivityGenreMonth empty")
+    args = parser.parse_args()
+
+    start = clock.perf_counter()
+    dataset = generate(args.path, args.scale, args.seed, aggregates=not args.skip_aggregates)
+    episodes = sorted(user.episodes for user in dataset.users)
+    print(f"[INFO] {len(dataset.users)} users, {len(dataset.catalog)} titles in {clock.perf_counter() - start:.1f}s")
+    print(json.dumps({
+        "episodes_per_user": {
+            "median": episodes[len(episodes) // 2],
+            "p99": episodes[min(len(episodes) - 1, int(len(episodes) * 0.99))],
+            "max": episodes[-1],
+        }
+    }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import sys
+import os
+import argparse
+import time
+from datetime import datetime
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel
+from database import engine
+from apps.wrapped.tasks import generate_year_reviews
+
+# Precomputes year-in-review reports for every user with activity in the given year.
+# Meant to run from cron in late December and after the new year; only missing or stale reports are rebuilt.
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate year-in-review reports")
+    parser.add_argument("--year", type=int, default=datetime.utcnow().year)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: YEAR_REVIEW_WORKERS or one per CPU)")
+    args = parser.parse_args()
+
+    SQLModel.metadata.create_all(engine)
+    start = time.perf_counter()
+    written = generate_year_reviews(args.year, workers=args.workers)
+    print(f"[INFO] Generated {written} {args.year} reports in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import httpx
+import itsdangerous
+
+if TYPE_CHECKING:
+    # Imported lazily at runtime: the app modules read settings on import, and main() sets them first
+    from scripts.generate_dataset import GeneratedUser, Title
+
+# End-to-end load test. Generates a throwaway database (scripts/generate_dataset.py), serves it with uvicorn
+# against the replaying TMDB stand-in (scripts/tmdb_standin.py) and drives scripted user flows from concurrent
+# virtual users:
+# dashboard, search typing, details, season tabs, episode toggles and season watch-all.
+# Reports p50/p95/p99 and requests/second per route; exits 1 when a route breaks its budget.
+#
+#   python scripts/load_test.py --users 10 --duration 60 --scale 1 --tmdb-latency-ms 40
+#
+# Runs are reproducible for a given --seed (flows, data and stand-in faults); timings of course are not.
+
+BUDGETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_budgets.json")
+
+# Relative frequency of each flow; a virtual user picks one per iteration
+FLOW_WEIGHTS = {
+    "dashboard": 3,
+    "search": 2,
+    "details": 3,
+    "season_tabs": 3,
+    "episode_toggle": 2,
+    "season_watch_all": 1,
+}
+
+# The details route renders its error page with a 200
+DETAILS_ERROR_MARKER = "We couldn't load the details"
+
+SEARCH_TERMS = 20
+
+# --- TMDB fixtures ---
+
+def search_prefixes(term: str) -> List[str]:
+    """
+    What a debounced search box sends while the term is typed: a few pauses, then the full term.
+    """
+    return list(dict.fromkeys([term[:3], term[:len(term) // 2], term]))
+
+def write_fixtures(directory: str, catalog: List["Title"]) -> List[str]:
+    """
+    Writes stand-in fixtures for every TMDB request the flows make. Returns the search terms covered.
+    """
+    from apps.core.tmdb_fixtures import canonical_query, save_fixture
+    from scripts.generate_dataset import details_payload, season_payload
+
+    def save(path: str, params: List[Tuple[str, str]], body: Dict[str, Any]) -> None:
+        save_fixture(directory, path, canonical_query(params), 200, json.dumps(body).encode())
+
+    for title in catalog:
+        save(f"/{title.media_type}/{title.tmdb_id}", [("append_to_response", "credits,keywords")], details_payload(title))
+        for season_number in range(1, title.seasons + 1):
+            save(f"/tv/{title.tmdb_id}/season/{season_number}", [], season_payload(title, season_number))
+
+    for media_type in ("movie", "tv"):
+        results = [
+            {"id": t.tmdb_id, "media_type": t.media_type, "title": t.title, "name": t.title, "poster_path": None}
+            for t in catalog if t.media_type == media_type
+        ][:20]
+        for window in ("day", "week"):
+            save(f"/trending/{media_type}/{window}", [], {"page": 1, "results": results, "total_pages": 1})
+        # The changes refresher's first window on startup: nothing changed
+        yesterday = (datetime.utcnow().date() - timedelta(days=1)).isoformat()
+        save(
+            f"/{media_type}/changes", [("start_date", yesterday), ("end_date", yesterday), ("page", "1")],
+            {"page": 1, "results": [], "total_pages": 1}
+        )
+
+    terms = [title.title.rsplit(" ", 1)[0] for title in catalog[::max(1, len(catalog) // SEARCH_TERMS)]]
+    for term in terms:
+        for prefix in search_prefixes(term):
+            matches = [
+                {"id": t.tmdb_id, "media_type": t.media_type, "title": t.title, "name": t.title, "poster_path": None}
+                for t in catalog if prefix.lower() in t.title.lower()
+            ][:20]
+            save("/search/multi", [("query", prefix), ("page", "1")], {"page": 1, "results": matches, "total_pages": 1})
+    return terms
+
+def session_cookie(secret_key: str, user: "GeneratedUser") -> str:
+    """
+    A session cookie as SessionMiddleware would sign it after login, claim included.
+    """
+    data = {"user_id": user.user_id, "user_claim": {"id": user.user_id, "email": user.email, "iat": int(time.time())}}
+    payload = base64.b64encode(json.dumps(data).encode())
+    return itsdangerous.TimestampSigner(str(secret_key)).sign(payload).decode()
+
+# --- Load generation ---
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[route] += 1
+            self.samples[route].append((time.perf_counter() - start) * 1000)
+            return None
+        self.samples[route].append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400 or (route == "details" and DETAILS_ERROR_MARKER in response.text):
+            self.errors[route] += 1
+        return response
+
+async def run_flow(flow: str, client: httpx.AsyncClient, recorder: Recorder, user: "GeneratedUser",
+                   catalog: List["Title"], terms: List[str], rng: random.Random) -> None:
+    show = rng.choice(user.shows)
+    if flow == "dashboard":
+        await recorder.request(client, "dashboard", "GET", "/tracker/")
+    elif flow == "search":
+        for prefix in search_prefixes(rng.choice(terms)):
+            await recorder.request(client, "search", "GET", "/tracker/search/results", params={"q": prefix})
+    elif flow == "details":
+        title = rng.choice(catalog)
+        await recorder.request(client, "details", "GET", f"/tracker/details/{title.media_type}/{title.tmdb_id}")
+    elif flow == "season_tabs":
+        await recorder.request(client, "details", "GET", f"/tracker/details/tv/{show.tmdb_id}")
+        for season_number in range(1, min(show.seasons, 3) + 1):
+            await recorder.request(client, "season", "GET", f"/tracker/partials/season/{show.tmdb_id}/{season_number}")
+    elif flow == "episode_toggle":
+        season_number = rng.randint(1, show.seasons)
+        await recorder.request(client, "season", "GET", f"/tracker/partials/season/{show.tmdb_id}/{season_number}")
+        for episode_number in rng.sample(range(1, show.episodes_per_season + 1), 3):
+            action = rng.choice(["watch", "watch", "unwatch"])
+            await recorder.request(
+                client, "episode_toggle", "POST",
+                f"/tracker/api/episode/{show.tmdb_id}/{season_number}/{episode_number}", data={"action": action}
+            )
+    elif flow == "season_watch_all":
+        season_number = rng.randint(1, show.seasons)
+        await recorder.request(client, "season_watch_all", "POST", f"/tracker/api/season/{show.tmdb_id}/{season_number}/watch-all")
+
+async def virtual_user_loop(base_url: str, cookie: str, user: "GeneratedUser", catalog: List["Title"], terms: List[str],
+                            recorder: Recorder, deadline: float, think_ms: float, seed: int) -> None:
+    rng = random.Random(seed)
+    flows, weights = list(FLOW_WEIGHTS), list(FLOW_WEIGHTS.values())
+    async with httpx.AsyncClient(base_url=base_url, cookies={"session": cookie}, timeout=30) as client:
+        while time.monotonic() < deadline:
+            await run_flow(rng.choices(flows, weights)[0], client, recorder, user, catalog, terms, rng)
+            if think_ms:
+                await asyncio.sleep(rng.uniform(0, think_ms) / 1000)
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    index = min(len(sorted_samples) - 1, max(0, round(p / 100 * len(sorted_samples) + 0.5) - 1))
+    return sorted_samples[index]
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Dict[str, float]]:
+    report = {}
+    for route, samples in sorted(recorder.samples.items()):
+        samples = sorted(samples)
+        report[route] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / elapsed, 1),
+            "p50_ms": round(percentile(samples, 50), 1),
+            "p95_ms": round(percentile(samples, 95), 1),
+            "p99_ms": round(percentile(samples, 99), 1),
+            "error_rate": round(recorder.errors[route] / len(samples), 4),
+        }
+    return report
+
+def check_budgets(report: Dict[str, Dict[str, float]], budgets: Dict[str, Any]) -> List[str]:
+    failures = []
+    max_error_rate = budgets.get("max_error_rate", 0)
+    for route, limits in budgets.get("routes", {}).items():
+        stats = report.get(route)
+        if stats is None:
+            failures.append(f"{route}: no requests recorded")
+            continue
+        for metric, limit in limits.items():
+            if stats[metric] > limit:
+                failures.append(f"{route}: {metric} {stats[metric]} > {limit}")
+        if stats["error_rate"] > max_error_rate:
+            failures.append(f"{route}: error_rate {stats['error_rate']} > {max_error_rate}")
+    return failures
+
+# --- Processes ---
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app against the replaying TMDB stand-in.")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load after warm-up")
+    parser.add_argument("--think-ms", type=float, default=200, help="Max pause between flows")
+    parser.add_argument("--scale", type=float, default=1, help="Dataset scale, see scripts/generate_dataset.py")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--standin-port", type=int, default=8101)
+    parser.add_argument("--tmdb-latency-ms", type=float, default=40)
+    parser.add_argument("--tmdb-jitter-ms", type=float, default=20)
+    parser.add_argument("--tmdb-error-rate", type=float, default=0)
+    parser.add_argument("--budgets", default=BUDGETS_FILE)
+    parser.add_argument("--workdir", default=None, help="Keep the database, fixtures and logs here")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="tib-load-")
+    fixtures = os.path.join(workdir, "tmdb")
+    # Configure before the app modules are imported: settings are read once, at import time
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        DATA_DIR=os.path.join(workdir, "data"),
+        TMDB_BASE_URL=f"http://127.0.0.1:{args.standin_port}",
+        TMDB_API_KEY="load-test",
+    )
+    os.environ.update(env)
+    from config import settings
+
+    from scripts.generate_dataset import generate
+
+    database = os.path.join(workdir, "load.db")
+    if os.path.exists(database):
+        os.remove(database)
+    print(f"[INFO] Generating a {args.scale:g}x dataset in {workdir}")
+    dataset = generate(database, args.scale, args.seed)
+    catalog = dataset.catalog
+    terms = write_fixtures(fixtures, catalog)
+    # Users with shows in their library, spread across the appetite distribution
+    candidates = [user for user in dataset.users if user.shows]
+    virtual_users = random.Random(args.seed).sample(candidates, min(args.users, len(candidates)))
+
+    logs = open(os.path.join(workdir, "servers.log"), "w")
+    standin = subprocess.Popen([
+        sys.executable, "scripts/tmdb_standin.py", fixtures, "--port", str(args.standin_port),
+        "--latency-ms", str(args.tmdb_latency_ms), "--jitter-ms", str(args.tmdb_jitter_ms),
+        "--error-rate", str(args.tmdb_error_rate), "--seed", str(args.seed),
+    ], env=env, stdout=logs, stderr=subprocess.STDOUT)
+    app = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ], env=env, stdout=logs, stderr=subprocess.STDOUT)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.standin_port}/__standin/stats", standin)
+        wait_until_up(f"{base_url}/static/", app)
+
+        async def run(duration: float) -> Tuple[Recorder, float]:
+            recorder = Recorder()
+            start = time.monotonic()
+            await asyncio.gather(*(
+                virtual_user_loop(
+                    base_url, session_cookie(settings.SECRET_KEY, user), user, catalog, terms,
+                    recorder, start + duration, args.think_ms, args.seed + index
+                )
+                for index, user in enumerate(virtual_users)
+            ))
+            return recorder, time.monotonic() - start
+
+        # Warm-up fills the app's caches and SQLite's page cache; only the second run is reported
+        asyncio.run(run(min(5, args.duration)))
+        recorder, elapsed = asyncio.run(run(args.duration))
+        standin_stats = httpx.get(f"http://127.0.0.1:{args.standin_port}/__standin/stats").json()
+    finally:
+        app.terminate()
+        standin.terminate()
+        app.wait()
+        standin.wait()
+        logs.close()
+
+    report = summarize(recorder, elapsed)
+    total = sum(stats["requests"] for stats in report.values())
+    print(f"\n{'route':<18}{'requests':>10}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for route, stats in report.items():
+        print(
+            f"{route:<18}{stats['requests']:>10}{stats['rps']:>8}{stats['p50_ms']:>10}"
+            f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['error_rate']:>9.2%}"
+        )
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} rps); TMDB stand-in: {standin_stats}")
+
+    with open(args.budgets) as f:
+        failures = check_budgets(report, json.load(f))
+    if failures:
+        print("\n[ERROR] Latency budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n[INFO] All routes within budget.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlmodel import SQLModel, text
+from database import engine
+from scripts.add_indexes import add_indexes
+
+# Adds the Media airing columns (tmdb_status, next_episode_air_date, refreshed_at) and the UpcomingEpisode table.
+# Existing shows start with NULL status/refreshed_at, which the airing refresher treats as due, so the
+# calendar fills in over the next refresh cycles.
+COLUMNS = {
+    "tmdb_status": "VARCHAR",
+    "next_episode_air_date": "DATE",
+    "refreshed_at": "DATETIME",
+}
+
+def migrate():
+    with engine.begin() as connection:
+        columns = [row.name for row in connection.execute(text("PRAGMA table_info(media)"))]
+        for name, column_type in COLUMNS.items():
+            if name not in columns:
+                print(f"Adding '{name}' column to 'media' table...")
+                connection.execute(text(f"ALTER TABLE media ADD COLUMN {name} {column_type}"))
+
+    SQLModel.metadata.create_all(engine)
+    add_indexes()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,24 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlmodel import text
+from database import engine
+
+# Adds ImportJob.worker_id / heartbeat_at. Jobs from before the migration have no heartbeat; the import
+# reaper falls back to their created_at, so any still marked queued/running are failed on its first pass.
+COLUMNS = {
+    "worker_id": "VARCHAR",
+    "heartbeat_at": "DATETIME",
+}
+
+def migrate():
+    with engine.begin() as connection:
+        columns = [row.name for row in connection.execute(text("PRAGMA table_info(importjob)"))]
+        for name, column_type in COLUMNS.items():
+            if name not in columns:
+                print(f"Adding '{name}' column to 'importjob' table...")
+                connection.execute(text(f"ALTER TABLE importjob ADD COLUMN {name} {column_type}"))
+
+if __name__ == "__main__":
+    migrate()
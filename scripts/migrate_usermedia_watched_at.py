@@ -0,0 +1,23 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+from sqlmodel import text
+from database import engine
+
+# Adds UserMedia.watched_at, the day a movie counts as watched in analytics and Wrapped. Existing watched
+# rows are backfilled from updated_at, which is what they were dated by before the column existed.
+def migrate():
+    with engine.begin() as connection:
+        columns = [row.name for row in connection.execute(text("PRAGMA table_info(usermedia)"))]
+        if "watched_at" not in columns:
+            print("Adding 'watched_at' column to 'usermedia' table...")
+            connection.execute(text("ALTER TABLE usermedia ADD COLUMN watched_at DATETIME"))
+        result = connection.execute(text(
+            "UPDATE usermedia SET watched_at = updated_at "
+            "WHERE watched_at IS NULL AND status IN ('watched', 'managed', 'finished')"
+        ))
+        print(f"Backfilled watched_at on {result.rowcount} rows")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,135 @@
+import sys
+import os
+sys.path.append(os.getcwd())
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Optional
+import orjson
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from apps.core.tmdb_fixtures import FixtureIndex, canonical_query, load_fixtures
+
+# Local TMDB replacement for offline tests and load runs. Replays fixtures recorded with TMDB_RECORD_DIR
+# and can add latency, server errors and 429s so the app's behaviour under a slow or throttling TMDB
+# is reproducible. Point the app at it with TMDB_BASE_URL=http://127.0.0.1:8766
+#
+#   TMDB_RECORD_DIR=fixtures/tmdb uvicorn main:app          # browse the app to record
+#   python scripts/tmdb_standin.py fixtures/tmdb --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+
+# TMDB's own error bodies, so callers see what they would in production
+NOT_FOUND = {"success": False, "status_code": 34, "status_message": "The resource you requested could not be found."}
+SERVER_ERROR = {"success": False, "status_code": 11, "status_message": "Internal error: Something went wrong, contact TMDb."}
+RATE_LIMITED = {"success": False, "status_code": 25, "status_message": "Your request count is over the allowed limit."}
+
+class StandIn:
+    """
+    Fixture replay plus fault injection. Randomness is seeded so a run can be repeated exactly.
+    """
+    def __init__(
+        self,
+        fixtures: FixtureIndex,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        throttle_rate: float = 0,
+        requests_per_second: float = 0,
+        seed: Optional[int] = None,
+    ):
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.requests_per_second = requests_per_second
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._tokens = requests_per_second
+        self._refilled_at = time.monotonic()
+
+    def _over_limit(self) -> bool:
+        # Token bucket holding one second's worth of requests
+        if not self.requests_per_second:
+            return False
+        now = time.monotonic()
+        self._tokens = min(self.requests_per_second, self._tokens + (now - self._refilled_at) * self.requests_per_second)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    async def handle(self, request: Request) -> Response:
+        self.stats["requests"] += 1
+        delay = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if self._over_limit() or self.random.random() < self.throttle_rate:
+            self.stats["throttled"] += 1
+            return JSONResponse(RATE_LIMITED, status_code=429, headers={"Retry-After": "1"})
+        if self.random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return JSONResponse(SERVER_ERROR, status_code=503)
+
+        path = request.url.path
+        if path.startswith("/3/"):
+            path = path[2:]
+        fixture = self.fixtures.get((path, canonical_query(request.query_params.multi_items())))
+        if fixture is None:
+            self.stats["missing"] += 1
+            return JSONResponse(NOT_FOUND, status_code=404)
+
+        self.stats["replayed"] += 1
+        status, body = fixture
+        return Response(body, status_code=status, media_type="application/json")
+
+    async def get_stats(self, request: Request) -> Response:
+        return Response(orjson.dumps({**self.stats, "fixtures": len(self.fixtures)}), media_type="application/json")
+
+def create_app(fixture_dir: str, **options) -> Starlette:
+    """
+    ASGI app replaying the fixtures in `fixture_dir`; options are StandIn's fault-injection settings.
+    Also usable in-process through httpx.ASGITransport.
+    """
+    standin = StandIn(load_fixtures(fixture_dir), **options)
+    app = Starlette(routes=[
+        Route("/__standin/stats", standin.get_stats),
+        Route("/{path:path}", standin.handle),
+    ])
+    app.state.standin = standin
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded TMDB responses with configurable faults.")
+    parser.add_argument("fixtures", help="Directory written by TMDB_RECORD_DIR")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Latency varies uniformly by +/- this much")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with a 503")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--requests-per-second", type=float, default=0, help="Answer 429 above this rate (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(
+        args.fixtures,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        requests_per_second=args.requests_per_second,
+        seed=args.seed,
+    )
+    print(f"[INFO] Replaying {len(app.state.standin.fixtures)} fixtures on http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()